@@ -0,0 +1,51 @@
+"""
+Общая обвязка бенчмарков.
+
+• setup_env() - обязательные переменные окружения для настроек приложения;
+  вызывается до импорта пакета app
+• time_per_call / time_per_call_async - среднее время вызова в микросекундах
+• parse_args - аргументы командной строки из значений по умолчанию
+"""
+
+import argparse
+import os
+import time
+from typing import Any, Awaitable, Callable
+
+# Значения-заглушки: сеть, БД и Redis бенчмаркам не нужны
+BENCHMARK_ENV = {
+    "BOT_TOKEN": "123456:benchmark",
+    "BOT_USERNAME": "benchmark_bot",
+    "DB_PASSWORD": "benchmark",
+    "SECRET_KEY": "benchmark",
+}
+
+def setup_env(**overrides: str) -> None:
+    """Задать переменные окружения, не перезаписывая уже заданные"""
+    for name, value in {**BENCHMARK_ENV, **overrides}.items():
+        os.environ.setdefault(name, value)
+
+def time_per_call(func: Callable[[], Any], calls: int) -> float:
+    """Среднее время вызова, мкс"""
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+async def time_per_call_async(func: Callable[[], Awaitable[Any]], calls: int) -> float:
+    """Среднее время вызова корутины, мкс"""
+    started = time.perf_counter()
+    for _ in range(calls):
+        await func()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+def parse_args(description: str, **options: Any) -> argparse.Namespace:
+    """
+    Аргументы бенчмарка: имя=значение по умолчанию или имя=(значение, подсказка).
+    Тип аргумента - тип значения, "_" в имени становится "-"
+    """
+    parser = argparse.ArgumentParser(description=description)
+    for name, option in options.items():
+        default, help_text = option if isinstance(option, tuple) else (option, None)
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default, help=help_text)
+    return parser.parse_args()
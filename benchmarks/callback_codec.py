@@ -0,0 +1,82 @@
+"""
+Бенчмарк формата callback_data.
+
+Сравнивает стандартный CallbackData aiogram ("check:manage:123:none:1")
+с компактным форматом из app.bot.keyboards.codec:
+
+• длина строки (лимит Telegram - 64 байта)
+• pack() и разбор строки
+• проверка фильтром чужого callback - так каждый callback проходит
+  фильтры всех обработчиков, зарегистрированных раньше нужного
+
+Сеть и БД не нужны.
+
+Запуск (пакет app должен быть в PYTHONPATH):
+    python -m benchmarks.callback_codec --calls 100000
+"""
+
+import asyncio
+
+from benchmarks._common import parse_args, setup_env, time_per_call, time_per_call_async
+
+setup_env()
+
+from aiogram import F
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, User as TelegramUser
+
+from app.bot.keyboards.checks import CheckCallback
+from app.bot.keyboards.codec import _decode
+from app.bot.keyboards.earn import EarnCallback
+
+class LegacyCheckCallback(CallbackData, prefix="check"):
+    action: str
+    check_id: int = 0
+    check_type: str = "none"
+    page: int = 1
+
+class LegacyEarnCallback(CallbackData, prefix="earn"):
+    action: str
+    task_type: str = "all"
+    task_id: int = 0
+    page: int = 1
+
+VALUES = {
+    "чек: управление": (LegacyCheckCallback, CheckCallback, {"action": "manage", "check_id": 123456}),
+    "задания: страница": (LegacyEarnCallback, EarnCallback, {"action": "list", "task_type": "channel_subscription", "page": 12}),
+}
+
+def _query(data: str) -> CallbackQuery:
+    user = TelegramUser(id=1, is_bot=False, first_name="bench")
+    return CallbackQuery(id="1", from_user=user, chat_instance="bench", data=data)
+
+async def main(calls: int) -> None:
+    print(f"Вызовов на вариант: {calls}\n")
+    print(f"{'callback':<22}{'формат':<10}{'байт':>6}{'pack, мкс':>11}{'разбор, мкс':>13}{'чужой фильтр, мкс':>19}")
+
+    for name, (legacy_cls, compact_cls, fields) in VALUES.items():
+        for label, cls, foreign_cls in (
+            ("прежний", legacy_cls, LegacyEarnCallback if legacy_cls is LegacyCheckCallback else LegacyCheckCallback),
+            ("компакт", compact_cls, EarnCallback if compact_cls is CheckCallback else CheckCallback),
+        ):
+            callback = cls(**fields)
+            packed = callback.pack()
+
+            if cls is compact_cls:
+                # Без кэша разбора: замер самого декодера
+                unpack = lambda: _decode.__wrapped__(cls, packed)
+            else:
+                unpack = lambda: cls.unpack(packed)
+
+            foreign_filter = foreign_cls.filter(F.action == "view")
+            query = _query(packed)
+            foreign_time = await time_per_call_async(lambda: foreign_filter(query), calls)
+
+            print(
+                f"{name:<22}{label:<10}{len(packed.encode()):>6}"
+                f"{time_per_call(callback.pack, calls):>11.2f}{time_per_call(unpack, calls):>13.2f}{foreign_time:>19.2f}"
+            )
+
+if __name__ == "__main__":
+    args = parse_args(__doc__, calls=100000)
+    asyncio.run(main(args.calls))
@@ -0,0 +1,81 @@
+"""
+Бенчмарк построения клавиатур.
+
+Для каждой клавиатуры сравнивает сборку "с нуля" (кэши фабрики очищаются
+перед каждым вызовом - как было до app.bot.keyboards.factory) и повторный
+вызов с прогретым кэшем: время и объем памяти, выделенной за один вызов.
+
+Сеть и БД не нужны: задания и чеки заменены простыми объектами.
+
+Запуск (пакет app должен быть в PYTHONPATH):
+    python -m benchmarks.keyboards --calls 20000
+"""
+
+import tracemalloc
+from decimal import Decimal
+from types import SimpleNamespace
+
+from benchmarks._common import parse_args, setup_env, time_per_call
+
+setup_env()
+
+from app.bot.keyboards import factory
+from app.bot.keyboards.admin import get_admin_menu_keyboard
+from app.bot.keyboards.checks import (
+    get_check_type_keyboard, get_checks_menu_keyboard, get_my_checks_keyboard
+)
+from app.bot.keyboards.earn import get_task_list_keyboard
+from app.bot.keyboards.main_menu import _main_menu_keyboard, get_main_menu_keyboard
+
+FROZEN = (_main_menu_keyboard, get_admin_menu_keyboard, get_checks_menu_keyboard, get_check_type_keyboard)
+
+def _clear_caches() -> None:
+    for keyboard in FROZEN:
+        keyboard.cache_clear()
+    factory._callback_button.cache_clear()
+    factory._nav_row.cache_clear()
+
+def _allocated(build, cold: bool) -> int:
+    """Пик выделенной памяти за один вызов, байт"""
+    build()
+    if cold:
+        _clear_caches()
+    tracemalloc.start()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def main(calls: int) -> None:
+    tasks = [
+        SimpleNamespace(id=task_id, reward_amount=Decimal("250"), remaining_executions=500 - task_id)
+        for task_id in range(1, 11)
+    ]
+    checks = [
+        SimpleNamespace(id=check_id, status="active", check_code=f"AB{check_id:06d}",
+                        current_activations=check_id, max_activations=100)
+        for check_id in range(1, 11)
+    ]
+
+    keyboards = {
+        "главное меню": lambda: get_main_menu_keyboard(None),
+        "админка": get_admin_menu_keyboard,
+        "меню чеков": get_checks_menu_keyboard,
+        "тип чека": get_check_type_keyboard,
+        "список заданий (10)": lambda: get_task_list_keyboard(tasks, "all", 2, True),
+        "мои чеки (10)": lambda: get_my_checks_keyboard(checks, 2, True),
+    }
+
+    print(f"Вызовов на вариант: {calls}\n")
+    print(f"{'клавиатура':<24}{'с нуля, мкс':>13}{'кэш, мкс':>11}{'с нуля, Б':>12}{'кэш, Б':>9}")
+
+    for name, build in keyboards.items():
+        cold_time = time_per_call(lambda: (_clear_caches(), build()), calls)
+        warm_time = time_per_call(build, calls)
+        cold_bytes = _allocated(build, cold=True)
+        warm_bytes = _allocated(build, cold=False)
+        print(f"{name:<24}{cold_time:>13.1f}{warm_time:>11.1f}{cold_bytes:>12}{warm_bytes:>9}")
+
+if __name__ == "__main__":
+    args = parse_args(__doc__, calls=20000)
+    main(args.calls)
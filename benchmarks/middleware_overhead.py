@@ -0,0 +1,115 @@
+"""
+Бенчмарк накладных расходов цепочки middlewares на одно обновление.
+
+Сравнивает прежнее поведение (каждому обработчику грузится пользователь
+и обновляется активность) с флагами требований маршрутов.
+Задержка БД имитируется, Redis не нужен (лимитер в памяти, антифрод выключен).
+
+Запуск (пакет app должен быть в PYTHONPATH):
+    python -m benchmarks.middleware_overhead --updates 2000 --db-latency 0.5
+"""
+
+import asyncio
+import functools
+
+from benchmarks._common import parse_args, setup_env, time_per_call_async
+
+setup_env(RATE_LIMIT_BACKEND="memory", ANTIFRAUD_ENABLED="false")
+
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import CallbackQuery, User as TelegramUser
+
+from app.bot.middlewares.auth import AuthMiddleware
+from app.bot.middlewares.database import DatabaseMiddleware
+from app.bot.middlewares.rate_limit import RateLimitMiddleware
+from app.services.rate_limiter import RateLimiter
+
+# Маршруты основных роутеров и их флаги
+ROUTES = {
+    "menu: главное меню": ("main:main_menu", {}),
+    "menu: раздел заработка": ("main:earn", {"user": "id"}),
+    "profile: профиль": ("profile:show", {}),
+    "admin: модерация": ("admin:moderation", {"user": "id"}),
+    "payments: подтверждение": ("payment:confirm", {"rate_limit": "money"}),
+}
+
+class _StoredUser:
+    is_banned = False
+    ban_reason = None
+
+    def __init__(self, telegram_id: int):
+        self.telegram_id = telegram_id
+
+class _UserService:
+    """Имитация UserService с задержкой запроса к БД"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.queries = 0
+
+    async def get_user(self, telegram_id: int):
+        self.queries += 1
+        await asyncio.sleep(self.latency)
+        return _StoredUser(telegram_id)
+
+    async def update_last_activity(self, telegram_id: int) -> None:
+        self.queries += 1
+        await asyncio.sleep(self.latency)
+
+class _Services:
+    def __init__(self, user_service: _UserService):
+        self.user_service = user_service
+        self._handler_data = {"user_service": user_service}
+
+    def handler_data(self):
+        return self._handler_data
+
+async def _noop_handler(event, data):
+    return None
+
+def _build_chain(user_service: _UserService):
+    middlewares = [
+        RateLimitMiddleware(RateLimiter(backend="memory")),
+        DatabaseMiddleware(_Services(user_service)),
+        AuthMiddleware(user_service),
+    ]
+
+    call = _noop_handler
+    for middleware in reversed(middlewares):
+        call = functools.partial(middleware, call)
+    return call
+
+async def _measure(callback_data: str, flags: dict, updates: int, latency: float) -> tuple[float, int]:
+    user_service = _UserService(latency)
+    chain = _build_chain(user_service)
+    handler = HandlerObject(callback=_noop_handler, flags=flags)
+
+    # Разные пользователи, чтобы не упираться в лимит запросов
+    events = iter([
+        CallbackQuery(
+            id=str(index),
+            from_user=TelegramUser(id=index, is_bot=False, first_name="bench"),
+            chat_instance="bench",
+            data=callback_data
+        )
+        for index in range(updates)
+    ])
+
+    per_update = await time_per_call_async(lambda: chain(next(events), {"handler": handler}), updates)
+    return per_update, user_service.queries
+
+async def main(updates: int, latency_ms: float) -> None:
+    latency = latency_ms / 1000
+
+    print(f"Обновлений на маршрут: {updates}, задержка БД: {latency_ms} мс\n")
+    print(f"{'маршрут':<28}{'до, мкс':>12}{'после, мкс':>14}{'запросов до':>14}{'после':>8}")
+
+    for name, (callback_data, flags) in ROUTES.items():
+        # "До": флаги игнорируются, каждому обработчику нужен пользователь из БД
+        before, queries_before = await _measure(callback_data, {}, updates, latency)
+        after, queries_after = await _measure(callback_data, flags, updates, latency)
+        print(f"{name:<28}{before:>12.1f}{after:>14.1f}{queries_before:>14}{queries_after:>8}")
+
+if __name__ == "__main__":
+    args = parse_args(__doc__, updates=2000, db_latency=(0.5, "Задержка запроса к БД, мс"))
+    asyncio.run(main(args.updates, args.db_latency))
@@ -0,0 +1,158 @@
+"""
+Бенчмарк отрисовки экранов с наибольшим трафиком.
+
+Сравнивает прежнюю сборку текста (f-строки, словари внутри функций,
+экранирование на каждом показе) с предкомпилированными шаблонами
+из app.bot.utils.templates на реалистичных страницах:
+
+• профиль пользователя
+• 10 карточек заданий (кэш карточек прогрет, как при повторных
+  показах популярных заданий)
+• список из 20 рефералов
+
+Сеть и БД не нужны: модели заменены простыми объектами с теми же полями.
+
+Запуск (пакет app должен быть в PYTHONPATH):
+    python -m benchmarks.render_pages --renders 20000
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from html import escape
+from types import SimpleNamespace
+
+from benchmarks._common import parse_args, setup_env, time_per_call
+
+setup_env()
+
+from app.bot.utils.formatters import NumberFormatter, TableFormatter
+from app.bot.utils.messages import (
+    TASK_TYPE_ICONS, TASK_TYPE_NAMES, get_profile_text, get_task_text
+)
+from app.config.settings import settings
+from app.database.models.task import TaskType
+
+LEVEL_CONFIG = {
+    "name": "🥈 Silver", "emoji": "🥈", "commission_rate": 0.05,
+    "task_multiplier": Decimal("1.2"), "referral_bonus": Decimal("1500"), "max_daily_tasks": 10
+}
+
+def _user(telegram_id: int) -> SimpleNamespace:
+    now = datetime.utcnow()
+    return SimpleNamespace(
+        telegram_id=telegram_id, username=f"user_{telegram_id}", level="silver",
+        balance=Decimal("15230.50"), available_balance=Decimal("14230.50"), frozen_balance=Decimal("1000"),
+        tasks_completed=87, tasks_created=4, total_referrals=12, premium_referrals=3,
+        total_earned=Decimal("40210"), created_at=now - timedelta(days=120), last_activity=now,
+        get_level_config=lambda: LEVEL_CONFIG
+    )
+
+def _task(task_id: int) -> SimpleNamespace:
+    now = datetime.utcnow()
+    return SimpleNamespace(
+        id=task_id, type=TaskType.CHANNEL_SUBSCRIPTION, title=f"Подписка на канал <Новости #{task_id}>",
+        description="Подпишитесь на канал & оставайтесь подписанным минимум 7 дней. " * 3,
+        target_url=f"https://t.me/news_channel_{task_id}", reward_amount=Decimal("250"),
+        completed_executions=task_id * 3, target_executions=500, min_user_level="silver",
+        expires_at=now + timedelta(hours=30), updated_at=now
+    )
+
+# ==================== ПРЕЖНЯЯ СБОРКА ====================
+
+def legacy_task_text(task, user) -> str:
+    type_icons = dict(TASK_TYPE_ICONS)
+    type_names = dict(TASK_TYPE_NAMES)
+    final_reward = task.reward_amount * user.get_level_config()['task_multiplier']
+
+    remaining = task.expires_at - datetime.utcnow()
+    hours = int(remaining.total_seconds() // 3600)
+    minutes = int((remaining.total_seconds() % 3600) // 60)
+    time_info = f"⏱️ Осталось: {hours}ч {minutes}м"
+
+    level_names = {"bronze": "🥉 Bronze", "silver": "🥈 Silver", "gold": "🥇 Gold", "premium": "💎 Premium"}
+    requirements_text = "\n\n📋 <b>ТРЕБОВАНИЯ:</b>\n" + "\n".join(
+        f"• {req}" for req in [f"Минимальный уровень: {level_names[task.min_user_level]}"]
+    )
+
+    return f"""{type_icons[task.type]} <b>{escape(task.title)}</b>
+
+📝 <b>Тип:</b> {type_names[task.type]}
+💰 <b>Награда:</b> {final_reward:,.0f} GRAM
+👥 <b>Выполнено:</b> {task.completed_executions}/{task.target_executions}
+{time_info}
+
+📄 <b>ОПИСАНИЕ:</b>
+{escape(task.description)}
+
+🔗 <b>Ссылка:</b> {escape(task.target_url)}{requirements_text}"""
+
+def legacy_referral_list(referrals, page: int = 1) -> str:
+    lines = [f"👥 <b>РЕФЕРАЛЫ</b> (стр. {page}):", ""]
+    for i, referral in enumerate(referrals, 1):
+        emojis = {"bronze": "🥉", "silver": "🥈", "gold": "🥇", "premium": "💎"}
+        username = f"@{referral.username}" if referral.username else f"ID{referral.telegram_id}"
+        lines.append(f"{i}. {emojis.get(referral.level, '❓')} {escape(username)}")
+        lines.append(f"   ├ Регистрация: {referral.created_at.strftime('%d.%m.%Y')}")
+        lines.append(f"   ├ Заданий: {referral.tasks_completed}")
+        lines.append(f"   └ Баланс: {NumberFormatter.format_gram(referral.balance)}")
+        lines.append("")
+    return "\n".join(lines[:-1])
+
+def legacy_profile_text(user) -> str:
+    level_config = user.get_level_config()
+    next_level_info = ""
+    if user.level == "bronze":
+        next_level_info = f"До Silver: {settings.LEVEL_THRESHOLDS['silver'] - user.balance:,.0f} GRAM"
+    elif user.level == "silver":
+        next_level_info = f"До Gold: {settings.LEVEL_THRESHOLDS['gold'] - user.balance:,.0f} GRAM"
+    text = f"👤 <b>МОЙ КАБИНЕТ</b>\n\n🆔 ID: <code>{user.telegram_id}</code>\n"
+    text += f"👨‍💼 @{escape(user.username or 'не указан')}\n📊 Уровень: <b>{level_config['name']}</b>\n\n"
+    text += f"💰 <b>БАЛАНС:</b>\n├ Доступно: <b>{user.available_balance:,.0f} GRAM</b>\n"
+    text += f"├ Заморожено: {user.frozen_balance:,.0f} GRAM\n└ {next_level_info}\n\n"
+    text += f"📈 <b>СТАТИСТИКА:</b>\n├ Выполнено заданий: {user.tasks_completed}\n"
+    text += f"├ Создано заданий: {user.tasks_created}  \n"
+    text += f"├ Рефералов: {user.total_referrals} ({user.premium_referrals} Premium)\n"
+    text += f"└ Заработано всего: {user.total_earned:,.0f} GRAM\n\n"
+    text += f"📅 <b>АККАУНТ:</b>\n├ Регистрация: {user.created_at.strftime('%d.%m.%Y')}\n"
+    text += f"├ Возраст: {(datetime.utcnow() - user.created_at).days} дн.\n"
+    text += f"└ Последняя активность: {user.last_activity.strftime('%d.%m %H:%M')}"
+    return text
+
+# ==================== ЗАМЕР ====================
+
+def _measure(render, renders: int) -> float:
+    # Первая отрисовка прогревает кэши
+    render()
+    return time_per_call(render, renders)
+
+def main(renders: int) -> None:
+    user = _user(1)
+    tasks = [_task(task_id) for task_id in range(1, 11)]
+    referrals = [_user(telegram_id) for telegram_id in range(100, 120)]
+
+    pages = {
+        "профиль": (
+            lambda: legacy_profile_text(user),
+            lambda: get_profile_text(user),
+        ),
+        "страница заданий (10)": (
+            lambda: [legacy_task_text(task, user) for task in tasks],
+            lambda: [get_task_text(task, user) for task in tasks],
+        ),
+        "рефералы (20)": (
+            lambda: legacy_referral_list(referrals),
+            lambda: TableFormatter.format_referral_list(referrals),
+        ),
+    }
+
+    print(f"Отрисовок на вариант: {renders}\n")
+    print(f"{'страница':<26}{'прежняя, мкс':>14}{'шаблоны, мкс':>14}")
+
+    for name, (legacy, current) in pages.items():
+        before = _measure(legacy, renders)
+        after = _measure(current, renders)
+        print(f"{name:<26}{before:>14.1f}{after:>14.1f}")
+
+if __name__ == "__main__":
+    args = parse_args(__doc__, renders=20000)
+    main(args.renders)
@@ -0,0 +1,93 @@
+"""
+Бенчмарк маршрутизации callback через роутер чеков.
+
+Сравнивает прежний роутер (каждый обработчик зарегистрирован трижды,
+без фильтра уровня роутера) с объединенным: один набор обработчиков и
+проверка кода CheckCallback на входе. Чужие callback (главное меню,
+профиль) проходят роутер чеков насквозь, поэтому их стоимость растет
+с числом зарегистрированных обработчиков.
+
+Обработчики пустые, сеть и БД не нужны.
+
+Запуск (пакет app должен быть в PYTHONPATH):
+    python -m benchmarks.router_dispatch --updates 20000
+"""
+
+import asyncio
+
+from benchmarks._common import parse_args, setup_env, time_per_call_async
+
+setup_env()
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.types import CallbackQuery, Update, User as TelegramUser
+
+from app.bot.keyboards.checks import CheckCallback
+from app.bot.keyboards.main_menu import MainMenuCallback
+from app.bot.keyboards.profile import ProfileCallback
+
+# Действия CheckCallback, которые обрабатывает роутер чеков
+ACTIONS = (
+    "cancel", "analytics", "activated", "copy_code", "menu", "create_menu",
+    "create", "my_checks", "manage", "activate",
+)
+
+CALLBACKS = {
+    "чек: первое действие": CheckCallback(action="cancel", check_id=1).pack(),
+    "чек: последнее действие": CheckCallback(action="activate").pack(),
+    "чужой: главное меню": MainMenuCallback(action="profile").pack(),
+    "чужой: профиль": ProfileCallback(action="balance").pack(),
+}
+
+async def _noop(callback: CallbackQuery) -> None:
+    return None
+
+def _build_router(copies: int, prefix_filter: bool) -> Router:
+    router = Router()
+    if prefix_filter:
+        router.callback_query.filter(CheckCallback.prefix_filter())
+    for _ in range(copies):
+        for action in ACTIONS:
+            router.callback_query.register(_noop, CheckCallback.filter(F.action == action))
+
+    # Роутер после чеков, как меню в register_all_handlers
+    fallback = Router()
+    fallback.callback_query.register(_noop)
+
+    parent = Router()
+    parent.include_router(router)
+    parent.include_router(fallback)
+    return parent
+
+async def _measure(bot: Bot, router: Router, callback_data: str, updates: int) -> float:
+    dp = Dispatcher()
+    dp.include_router(router)
+
+    user = TelegramUser(id=1, is_bot=False, first_name="bench")
+    events = iter([
+        Update(
+            update_id=index,
+            callback_query=CallbackQuery(id=str(index), from_user=user, chat_instance="bench", data=callback_data)
+        )
+        for index in range(updates)
+    ])
+
+    return await time_per_call_async(lambda: dp.feed_update(bot, next(events)), updates)
+
+async def main(updates: int) -> None:
+    bot = Bot("123456:benchmark")
+
+    print(f"Обновлений на вариант: {updates}\n")
+    print(f"{'callback':<28}{'3 копии, мкс':>14}{'1 копия + префикс, мкс':>26}")
+
+    try:
+        for name, callback_data in CALLBACKS.items():
+            before = await _measure(bot, _build_router(copies=3, prefix_filter=False), callback_data, updates)
+            after = await _measure(bot, _build_router(copies=1, prefix_filter=True), callback_data, updates)
+            print(f"{name:<28}{before:>14.1f}{after:>26.1f}")
+    finally:
+        await bot.session.close()
+
+if __name__ == "__main__":
+    args = parse_args(__doc__, updates=20000)
+    asyncio.run(main(args.updates))
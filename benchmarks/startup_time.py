@@ -0,0 +1,84 @@
+"""
+Бенчмарк времени запуска процесса: импорт приложения и сборка диспетчера.
+
+Каждый замер - отдельный интерпретатор с `-X importtime`, поэтому кэш модулей
+не влияет на результат. Сравниваются LAZY_ROUTERS=false и true, выводятся
+самые дорогие модули по суммарному времени импорта.
+Сеть, БД и Redis не нужны: соединения создаются лениво.
+
+Запуск (пакет app должен быть в PYTHONPATH):
+    python -m benchmarks.startup_time --runs 5 --top 15
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks._common import BENCHMARK_ENV
+
+# Импорт приложения и регистрация роутеров, как при запуске бота
+STARTUP_CODE = """
+import asyncio, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+asyncio.run(app.main.create_dispatcher())
+print(f"{imported - started:.6f} {time.perf_counter() - imported:.6f}")
+"""
+
+def _run(lazy: bool) -> tuple[float, float, dict[str, int]]:
+    env = {**os.environ, **BENCHMARK_ENV, "LAZY_ROUTERS": "true" if lazy else "false"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    # Строки вида "import time:   self [us] | cumulative | module"
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, total, module = line.split("|")
+        cumulative[module.strip()] = int(total)
+
+    import_seconds, dispatcher_seconds = map(float, result.stdout.split()[-2:])
+    return import_seconds, dispatcher_seconds, cumulative
+
+def main(runs: int, top: int) -> None:
+    print(f"Запусков на вариант: {runs}\n")
+    print(f"{'вариант':<20}{'импорт, мс':>14}{'диспетчер, мс':>16}{'модулей':>10}")
+
+    last_profile = {}
+    for lazy in (False, True):
+        imports, dispatchers, modules = [], [], 0
+        for _ in range(runs):
+            import_seconds, dispatcher_seconds, cumulative = _run(lazy)
+            imports.append(import_seconds * 1000)
+            dispatchers.append(dispatcher_seconds * 1000)
+            modules = len(cumulative)
+            last_profile = cumulative
+
+        name = "LAZY_ROUTERS=true" if lazy else "LAZY_ROUTERS=false"
+        print(f"{name:<20}{statistics.median(imports):>14.1f}{statistics.median(dispatchers):>16.1f}{modules:>10}")
+
+    # Самые дорогие модули верхнего уровня в быстром варианте
+    print("\nСамые дорогие импорты (LAZY_ROUTERS=true), мс:")
+    top_level = {
+        module: total for module, total in last_profile.items()
+        if module.startswith("app.") or "." not in module
+    }
+    for module, total in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {total / 1000:>8.1f}  {module}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    main(args.runs, args.top)
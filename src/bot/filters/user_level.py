@@ -4,7 +4,7 @@ from aiogram.filters import BaseFilter
 from aiogram.types import Message, CallbackQuery
 
 from app.database.models.user import UserLevel
-from app.services.user_service import UserService
+from app.services.container import ServiceContainer
 
 class UserLevelFilter(BaseFilter):
     """Фильтр для проверки уровня пользователя"""
@@ -12,10 +12,9 @@ class UserLevelFilter(BaseFilter):
     def __init__(self, level: UserLevel):
         self.level = level
         
-    async def __call__(self, update: Message | CallbackQuery) -> bool:
+    async def __call__(self, update: Message | CallbackQuery, services: ServiceContainer) -> bool:
         """Проверка уровня пользователя"""
-        user_service = UserService()
-        user = await user_service.get_user(update.from_user.id)
+        user = await services.user_service.get_user(update.from_user.id)
         
         if not user:
             return False
@@ -34,10 +33,9 @@ class MinLevelFilter(BaseFilter):
             UserLevel.PREMIUM
         ]
         
-    async def __call__(self, update: Message | CallbackQuery) -> bool:
+    async def __call__(self, update: Message | CallbackQuery, services: ServiceContainer) -> bool:
         """Проверка минимального уровня"""
-        user_service = UserService()
-        user = await user_service.get_user(update.from_user.id)
+        user = await services.user_service.get_user(update.from_user.id)
         
         if not user:
             return False
@@ -1,5 +1,9 @@
 from aiogram import Dispatcher
 
+from app.bot.middlewares.flags import USER_ID, set_router_flags
+from app.bot.handlers.lazy import LazyRouter
+from app.config.settings import settings as app_settings
+
 from app.bot.handlers import (
     start,
     menu,
@@ -7,13 +11,18 @@ from app.bot.handlers import (
     earn,
     advertise,
     referral,
-    payments,
-    settings,  # Добавляем настройки
-    admin,     # Добавляем админку
     checks,    # Добавляем чеки
+    inline,
     common,
 )
 
+def _section_router(module_path: str, **kwargs):
+    """Роутер редкого раздела: при LAZY_ROUTERS модуль загружается при первом обращении"""
+    router = LazyRouter(module_path, **kwargs)
+    if not app_settings.LAZY_ROUTERS:
+        router.load()
+    return router
+
 def register_all_handlers(dp: Dispatcher) -> None:
     """Регистрация всех обработчиков в правильном порядке"""
     
@@ -22,17 +31,22 @@ def register_all_handlers(dp: Dispatcher) -> None:
     # 1. Стартовые команды (высший приоритет)
     dp.include_router(start.router)
     
-    # 2. Админские команды (высокий приоритет, после старта)
-    dp.include_router(admin.router)
+    # 2. Админские команды (высокий приоритет, после старта).
+    # Админке достаточно ID - доступ проверяет AdminFilter
+    dp.include_router(_section_router("app.bot.handlers.admin", user=USER_ID))
     
     # 3. Основные модули (средний приоритет)
     dp.include_router(profile.router)
     dp.include_router(earn.router) 
     dp.include_router(advertise.router)
     dp.include_router(referral.router)
-    dp.include_router(payments.router)
+    dp.include_router(_section_router(
+        "app.bot.handlers.payments",
+        update_types=("message", "callback_query", "pre_checkout_query")
+    ))
     dp.include_router(checks.router)
-    dp.include_router(settings.router)  # Добавляем настройки
+    dp.include_router(inline.router)
+    dp.include_router(_section_router("app.bot.handlers.settings"))  # Добавляем настройки
     
     # 4. Главное меню (средний приоритет)
     dp.include_router(menu.router)
@@ -9,6 +9,7 @@ from app.services.user_service import UserService
 from app.services.task_service import TaskService
 from app.services.transaction_service import TransactionService
 from app.services.check_service import CheckService
+from app.services.notification_service import NotificationService
 from app.bot.keyboards.admin import (
     AdminCallback, get_admin_menu_keyboard, get_moderation_keyboard,
     get_task_moderation_keyboard, get_user_management_keyboard
@@ -990,6 +991,98 @@ async def system_cleanup(
         reply_markup=get_admin_menu_keyboard()
     )
 
+@router.callback_query(AdminCallback.filter(F.action == "broadcast"))
+async def start_broadcast(callback: CallbackQuery, state: FSMContext):
+    """Начать массовую рассылку"""
+    
+    await state.set_state(AdminStates.entering_broadcast_message)
+    
+    text = """📢 <b>МАССОВАЯ РАССЫЛКА</b>
+
+Отправьте текст сообщения для рассылки.
+
+💡 Сообщение получат активные пользователи с включенными уведомлениями.
+Рассылка идет через очередь с соблюдением лимитов Telegram.
+
+❌ <i>Для отмены отправьте /cancel</i>"""
+    
+    await callback.message.edit_text(text)
+    await callback.answer()
+
+# Команды (в том числе /cancel) и кнопка отмены уходят в общие обработчики, а не в рассылку
+@router.message(
+    AdminStates.entering_broadcast_message,
+    F.text,
+    ~F.text.startswith("/"),
+    F.text != "❌ Отмена"
+)
+async def preview_broadcast(message: Message, state: FSMContext):
+    """Предпросмотр рассылки перед отправкой"""
+    from aiogram.utils.keyboard import InlineKeyboardBuilder
+    from aiogram.types import InlineKeyboardButton
+    
+    await state.update_data(broadcast_text=message.html_text)
+    await state.set_state(AdminStates.confirming_broadcast)
+    
+    builder = InlineKeyboardBuilder()
+    builder.row(
+        InlineKeyboardButton(
+            text="✅ Отправить",
+            callback_data=AdminCallback(action="broadcast_send").pack()
+        ),
+        InlineKeyboardButton(
+            text="❌ Отмена",
+            callback_data=AdminCallback(action="broadcast_cancel").pack()
+        )
+    )
+    
+    await message.answer("👁 <b>ПРЕДПРОСМОТР РАССЫЛКИ</b>\n\nТак сообщение увидят пользователи:")
+    await message.answer(message.html_text, reply_markup=builder.as_markup())
+
+@router.callback_query(
+    AdminStates.confirming_broadcast,
+    AdminCallback.filter(F.action == "broadcast_send")
+)
+async def process_broadcast(
+    callback: CallbackQuery,
+    state: FSMContext,
+    notification_service: NotificationService
+):
+    """Поставить рассылку в очередь"""
+    
+    data = await state.get_data()
+    await state.clear()
+    
+    broadcast_text = data.get("broadcast_text")
+    if not broadcast_text:
+        await callback.answer("❌ Текст рассылки не найден", show_alert=True)
+        return
+    
+    recipients = await notification_service.enqueue_broadcast(broadcast_text, "admin")
+    queue_depth = await notification_service.get_queue_depth()
+    
+    text = f"""✅ <b>РАССЫЛКА ПОСТАВЛЕНА В ОЧЕРЕДЬ</b>
+
+👥 Получателей: {recipients:,}
+📬 Сообщений в очереди: {queue_depth:,}"""
+    
+    await callback.answer("✅ Рассылка запущена")
+    await callback.message.answer(
+        text,
+        reply_markup=get_admin_menu_keyboard()
+    )
+
+@router.callback_query(AdminCallback.filter(F.action == "broadcast_cancel"))
+async def cancel_broadcast(callback: CallbackQuery, state: FSMContext):
+    """Отменить рассылку после предпросмотра"""
+    await state.clear()
+    
+    await callback.answer("❌ Рассылка отменена")
+    await callback.message.answer(
+        "❌ Рассылка отменена",
+        reply_markup=get_admin_menu_keyboard()
+    )
+
 # Массовые действия
 @router.callback_query(AdminCallback.filter(F.action == "approve_auto"))
 async def mass_approve_auto_checks(
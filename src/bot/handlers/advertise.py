@@ -714,7 +714,7 @@ async def process_task_quantity(message: Message, state: FSMContext, user: User,
     
     await message.answer(text, reply_markup=builder.as_markup())
 
-@router.callback_query(F.data == "create_task_confirm")
+@router.callback_query(F.data == "create_task_confirm", flags={"rate_limit": "money"})
 async def create_task_confirm(
     callback: CallbackQuery,
     state: FSMContext,
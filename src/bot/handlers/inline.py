@@ -0,0 +1,88 @@
+import re
+import time
+from decimal import Decimal
+from html import escape
+
+from aiogram import Router
+from aiogram.types import (
+    CallbackQuery, InlineQuery, InlineQueryResultArticle, InlineQueryResultsButton,
+    InputTextMessageContent
+)
+
+from app.config.settings import settings
+from app.database.models.user import User
+from app.services.check_service import CheckService
+from app.bot.keyboards.checks import CheckClaimCallback, get_inline_check_keyboard
+
+router = Router()
+
+CODE_PATTERN = re.compile(r"[A-Z0-9]{8}")
+
+def _render_card(card: dict) -> InlineQueryResultArticle:
+    """Карточка чека для отправки в чат"""
+    amount = Decimal(card["amount"])
+
+    text = f"""💳 <b>ЧЕК НА {amount:,.0f} GRAM</b>
+
+👥 Активаций: {card['max_activations']}
+🆔 Код: <code>{card['code']}</code>"""
+
+    if card["description"]:
+        text += f"\n💬 {escape(card['description'])}"
+
+    if card["has_password"]:
+        text += f"\n\n🔒 Чек с паролем. Отправьте боту: <code>{card['code']} пароль</code>"
+    else:
+        text += "\n\n🎁 Нажмите кнопку ниже, чтобы получить GRAM"
+
+    description = f"{card['max_activations']} акт. • {card['code']}"
+    if card["has_password"]:
+        description += " • 🔒"
+
+    return InlineQueryResultArticle(
+        id=card["code"],
+        title=f"💳 Чек на {amount:,.0f} GRAM",
+        description=description,
+        input_message_content=InputTextMessageContent(message_text=text),
+        reply_markup=get_inline_check_keyboard(card["code"], card["has_password"])
+    )
+
+@router.inline_query()
+async def inline_share_checks(inline_query: InlineQuery, check_service: CheckService):
+    """@bot КОД - карточки активных чеков создателя (из кэша Redis, без БД)"""
+    cards = await check_service.get_inline_cards(inline_query.from_user.id)
+
+    # Истекшие чеки остаются в кэше до очистки - отфильтровываем здесь
+    now = time.time()
+    cards = [card for card in cards if not card["expires_at"] or card["expires_at"] > now]
+
+    match = CODE_PATTERN.search(inline_query.query.upper())
+    if match:
+        cards = [card for card in cards if card["code"] == match.group()]
+
+    await inline_query.answer(
+        [_render_card(card) for card in cards],
+        cache_time=settings.CHECK_INLINE_CACHE_TIME,
+        is_personal=True,
+        button=None if cards else InlineQueryResultsButton(text="💳 Создать чек", start_parameter="checks")
+    )
+
+@router.callback_query(CheckClaimCallback.filter(), flags={"rate_limit": "checks"})
+async def claim_inline_check(
+    callback: CallbackQuery,
+    callback_data: CheckClaimCallback,
+    user: User,
+    check_service: CheckService
+):
+    """Активация чека кнопкой под inline-карточкой"""
+    success, message_text, amount = await check_service.activate_check(
+        callback_data.code, user.telegram_id
+    )
+
+    if success:
+        await callback.answer(
+            f"🎉 Чек активирован!\n\n💰 Получено: {amount:,.0f} GRAM",
+            show_alert=True
+        )
+    else:
+        await callback.answer(message_text, show_alert=True)
@@ -0,0 +1,54 @@
+"""
+Отложенная загрузка роутеров.
+
+Модуль раздела импортируется при первом событии, дошедшем до его места
+в цепочке роутеров, а не при запуске процесса. Порядок роутеров сохраняется.
+"""
+
+import importlib
+from typing import Any, Iterable, Set
+
+import structlog
+from aiogram import Router
+from aiogram.types import TelegramObject
+
+from app.bot.middlewares.flags import set_router_flags
+
+logger = structlog.get_logger(__name__)
+
+class LazyRouter(Router):
+    """Роутер-заглушка, подключающий router модуля при первом обращении"""
+
+    def __init__(self, module_path: str, update_types: Iterable[str] = ("message", "callback_query"), **flags: Any):
+        super().__init__(name=module_path)
+        self.module_path = module_path
+        # Типы обновлений модуля нужны до загрузки (allowed_updates при polling)
+        self.update_types = set(update_types)
+        self.flags = flags
+        self._loaded = False
+
+    def load(self) -> None:
+        if self._loaded:
+            return
+
+        module = importlib.import_module(self.module_path)
+        router = module.router
+        if self.flags:
+            set_router_flags(router, **self.flags)
+
+        self.include_router(router)
+        self._loaded = True
+        logger.info("📦 Router loaded", module=self.module_path)
+
+    async def propagate_event(self, update_type: str, event: TelegramObject, **kwargs: Any) -> Any:
+        self.load()
+        return await super().propagate_event(update_type=update_type, event=event, **kwargs)
+
+def resolve_lazy_update_types(router: Router) -> Set[str]:
+    """Типы обновлений еще не загруженных роутеров"""
+    return {
+        update_type
+        for sub_router in router.chain_tail
+        if isinstance(sub_router, LazyRouter) and not sub_router._loaded
+        for update_type in sub_router.update_types
+    }
@@ -2,7 +2,7 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 
-from app.services.user_service import UserService
+from app.database.models.user import User
 from app.bot.keyboards.main_menu import get_main_menu_keyboard, MainMenuCallback
 from app.bot.utils.messages import get_main_menu_text
 
@@ -13,12 +13,11 @@ async def show_main_menu(
     callback: CallbackQuery, 
     callback_data: MainMenuCallback, 
     state: FSMContext,
-    user_service: UserService
+    user: User
 ):
     """Показать главное меню"""
     await state.clear()
     
-    user = await user_service.get_user(callback.from_user.id)
     menu_text = get_main_menu_text(user)
     
     await callback.message.edit_text(
@@ -28,11 +27,10 @@ async def show_main_menu(
     await callback.answer()
 
 @router.message(F.text.in_(["🏠 Главное меню", "/menu"]))
-async def main_menu_text(message: Message, state: FSMContext, user_service: UserService):
+async def main_menu_text(message: Message, state: FSMContext, user: User):
     """Главное меню по тексту кнопки"""
     await state.clear()
     
-    user = await user_service.get_user(message.from_user.id)
     menu_text = get_main_menu_text(user)
     
     await message.answer(
@@ -41,7 +39,7 @@ async def main_menu_text(message: Message, state: FSMContext, user_service: User
     )
 
 # Обработка основных разделов меню
-@router.callback_query(MainMenuCallback.filter(F.action == "earn"))
+@router.callback_query(MainMenuCallback.filter(F.action == "earn"), flags={"user": "id"})
 async def open_earn_section(callback: CallbackQuery):
     """Открыть раздел заработка"""
     from app.bot.keyboards.earn import get_earn_menu_keyboard
@@ -66,7 +64,7 @@ async def open_earn_section(callback: CallbackQuery):
     )
     await callback.answer()
 
-@router.callback_query(MainMenuCallback.filter(F.action == "advertise"))
+@router.callback_query(MainMenuCallback.filter(F.action == "advertise"), flags={"user": "id"})
 async def open_advertise_section(callback: CallbackQuery):
     """Открыть раздел рекламы"""
     from app.bot.keyboards.advertise import get_advertise_menu_keyboard
@@ -106,17 +104,17 @@ async def open_referral_section(callback: CallbackQuery, user: User):
     await callback.answer()
 
 # Заглушки для разделов в разработке
-@router.callback_query(MainMenuCallback.filter(F.action == "checks"))
+@router.callback_query(MainMenuCallback.filter(F.action == "checks"), flags={"user": "id"})
 async def checks_placeholder(callback: CallbackQuery):
     """Заглушка для системы чеков"""
     await callback.answer("💳 Система чеков в разработке...", show_alert=True)
 
-@router.callback_query(MainMenuCallback.filter(F.action == "subscription_check"))
+@router.callback_query(MainMenuCallback.filter(F.action == "subscription_check"), flags={"user": "id"})
 async def subscription_check_placeholder(callback: CallbackQuery):
     """Заглушка для проверки подписок"""
     await callback.answer("✅ Проверка подписок в разработке...", show_alert=True)
 
-@router.callback_query(MainMenuCallback.filter(F.action == "settings"))
+@router.callback_query(MainMenuCallback.filter(F.action == "settings"), flags={"user": "id"})
 async def settings_placeholder(callback: CallbackQuery):
     """Заглушка для настроек"""
-    await callback.answer("⚙️ Настройки в разработке...", show_alert=True
\ No newline at end of file
+    await callback.answer("⚙️ Настройки в разработке...", show_alert=True)
@@ -5,20 +5,24 @@ from aiogram.types import (
 )
 from aiogram.filters import Command
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from decimal import Decimal
 import uuid
 import hashlib
 import hmac
 
+import structlog
+
 from app.database.models.user import User
-from app.services.user_service import UserService
 from app.services.transaction_service import TransactionService
+from app.services.crypto_payment_service import CryptoPaymentService
+from app.services.dedupe_store import DedupeStore
 from app.bot.keyboards.profile import ProfileCallback, get_deposit_keyboard
 from app.bot.keyboards.payments import PaymentCallback, get_payment_confirmation_keyboard
 from app.bot.keyboards.main_menu import get_main_menu_keyboard
 from app.bot.utils.messages import get_deposit_text, get_success_message
 from app.config.settings import settings
 
+logger = structlog.get_logger(__name__)
+
 router = Router()
 
 # ==================== TELEGRAM STARS PAYMENT ====================
@@ -44,7 +48,7 @@ async def buy_stars_package(
     await callback.message.edit_text(text, reply_markup=keyboard)
     await callback.answer()
 
-@router.callback_query(PaymentCallback.filter(F.action == "confirm"))
+@router.callback_query(PaymentCallback.filter(F.action == "confirm"), flags={"rate_limit": "money"})
 async def confirm_stars_payment(
     callback: CallbackQuery,
     callback_data: PaymentCallback,
@@ -141,17 +145,22 @@ async def process_pre_checkout_query(pre_checkout_query: PreCheckoutQuery):
     except (ValueError, IndexError):
         await pre_checkout_query.answer(ok=False, error_message="Ошибка обработки платежа")
 
-@router.message(F.successful_payment)
+@router.message(F.successful_payment, flags={"rate_limit": False})
 async def process_successful_payment(
     message: Message,
     user: User,
     transaction_service: TransactionService,
-    user_service: UserService
+    dedupe_store: DedupeStore
 ):
     """Обработка успешного платежа"""
     payment = message.successful_payment
     payload = payment.invoice_payload
     
+    # Один платеж зачисляется один раз, даже если сообщение пришло повторно
+    if not await dedupe_store.claim("payment", payment.telegram_payment_charge_id):
+        logger.warning("⚠️ Duplicate successful payment skipped", charge_id=payment.telegram_payment_charge_id)
+        return
+    
     try:
         # Парсим payload
         parts = payload.split("_")
@@ -160,24 +169,29 @@ async def process_successful_payment(
         
         # Проверяем, что платеж от правильного пользователя
         if user_id != user.telegram_id:
+            # Повтор не исправит чужой payload - платеж закрывается без зачисления
+            await dedupe_store.complete("payment", payment.telegram_payment_charge_id)
             await message.answer("❌ Ошибка: платеж от другого пользователя")
             return
         
         # Получаем пакет
         package = settings.get_stars_package(package_name)
         if not package:
+            await dedupe_store.release("payment", payment.telegram_payment_charge_id)
             await message.answer("❌ Ошибка: пакет не найден")
             return
         
-        # Обрабатываем платеж
-        transaction = await transaction_service.process_telegram_stars_payment(
+        # Обрабатываем платеж (повторное зачисление исключено на уровне БД)
+        result = await transaction_service.process_telegram_stars_payment(
             user_id=user.telegram_id,
             stars_amount=payment.total_amount,
             stars_transaction_id=payment.telegram_payment_charge_id,
             package_name=package_name
         )
         
-        if transaction:
+        if result:
+            await dedupe_store.complete("payment", payment.telegram_payment_charge_id)
+            
             # Рассчитываем итоговую сумму
             base_gram, bonus_gram = settings.calculate_gram_from_stars(payment.total_amount, package_name)
             total_gram = base_gram + bonus_gram
@@ -190,18 +204,18 @@ async def process_successful_payment(
             if bonus_gram > 0:
                 success_text += f"\n🎁 Бонус: {bonus_gram:,.0f} GRAM"
             
-            # Обновляем информацию о пользователе
-            updated_user = await user_service.get_user(user.telegram_id)
-            success_text += f"\n\n💳 Ваш баланс: {updated_user.balance:,.0f} GRAM"
+            # Баланс после зачисления возвращает сам запрос зачисления
+            success_text += f"\n\n💳 Ваш баланс: {result['balance']:,.0f} GRAM"
             
             success_text += "\n\n✨ Спасибо за пополнение! Теперь вы можете создавать задания или продолжить заработок."
             
             await message.answer(
                 success_text,
-                reply_markup=get_main_menu_keyboard(updated_user)
+                reply_markup=get_main_menu_keyboard(user)
             )
             
         else:
+            await dedupe_store.release("payment", payment.telegram_payment_charge_id)
             await message.answer(
                 "❌ Ошибка при обработке платежа. Обратитесь в поддержку.",
                 reply_markup=get_main_menu_keyboard(user)
@@ -209,6 +223,7 @@ async def process_successful_payment(
             
     except Exception as e:
         print(f"Payment processing error: {e}")
+        await dedupe_store.release("payment", payment.telegram_payment_charge_id)
         await message.answer(
             "❌ Ошибка при обработке платежа. Обратитесь в поддержку.",
             reply_markup=get_main_menu_keyboard(user)
@@ -285,11 +300,12 @@ async def show_crypto_packages(callback: CallbackQuery):
     await callback.message.edit_text(text, reply_markup=builder.as_markup())
     await callback.answer()
 
-@router.callback_query(PaymentCallback.filter(F.action == "crypto"))
+@router.callback_query(PaymentCallback.filter(F.action == "crypto"), flags={"rate_limit": "money"})
 async def create_crypto_invoice(
     callback: CallbackQuery,
     callback_data: PaymentCallback,
-    user: User
+    user: User,
+    crypto_payments: CryptoPaymentService
 ):
     """Создать инвойс в CryptoBot"""
     package_name = callback_data.package
@@ -299,39 +315,29 @@ async def create_crypto_invoice(
         await callback.answer("❌ Пакет не найден", show_alert=True)
         return
     
-    # Генерируем уникальный payload
-    payload = f"crypto_{package_name}_{user.telegram_id}_{uuid.uuid4().hex[:8]}"
+    if not crypto_payments.enabled:
+        await callback.answer("❌ Оплата криптовалютой временно недоступна", show_alert=True)
+        return
     
     # Создаем инвойс через CryptoBot API
-    crypto_invoice_data = {
-        "currency_type": "crypto",
-        "asset": package["currency"],
-        "amount": str(package["amount"]),
-        "description": f"Пополнение PR GRAM Bot - {package['gram']:,} GRAM",
-        "payload": payload,
-        "return_url": f"https://t.me/{settings.BOT_USERNAME}",
-        "paid_btn_name": "callback",
-        "paid_btn_url": f"https://t.me/{settings.BOT_USERNAME}?start=payment_success"
-    }
-    
-    # В реальном проекте здесь будет API запрос к CryptoBot
-    # Пока что создаем кнопку для перехода в CryptoBot
+    invoice = await crypto_payments.create_invoice(user.telegram_id, package)
+    if not invoice:
+        await callback.answer("❌ Не удалось создать счет. Попробуйте позже.", show_alert=True)
+        return
     
     builder = InlineKeyboardBuilder()
     
-    # Кнопка оплаты (в реальности будет URL от CryptoBot API)
-    crypto_payment_url = f"https://t.me/CryptoBot?start=pay_{payload}"
     builder.row(
         InlineKeyboardButton(
             text=f"💎 Оплатить {package['amount']} {package['currency']}",
-            url=crypto_payment_url
+            url=invoice.get("bot_invoice_url") or invoice.get("pay_url")
         )
     )
     
     builder.row(
         InlineKeyboardButton(
             text="🔄 Проверить оплату",
-            callback_data=PaymentCallback(action="check_crypto", package=payload).pack()
+            callback_data=PaymentCallback(action="check_crypto", package=str(invoice["invoice_id"])).pack()
         )
     )
     
@@ -351,92 +357,57 @@ async def create_crypto_invoice(
 📱 <b>Как оплатить:</b>
 1. Нажмите "Оплатить" ниже
 2. Следуйте инструкциям CryptoBot
-3. После оплаты нажмите "Проверить оплату"
+3. GRAM зачислятся автоматически, бот пришлет уведомление
 
 ⚡ <i>Зачисление в течение 5-10 минут</i>"""
     
     await callback.message.edit_text(text, reply_markup=builder.as_markup())
     await callback.answer()
 
-@router.callback_query(PaymentCallback.filter(F.action == "check_crypto"))
+@router.callback_query(PaymentCallback.filter(F.action == "check_crypto"), flags={"rate_limit": "money"})
 async def check_crypto_payment(
     callback: CallbackQuery,
     callback_data: PaymentCallback,
     user: User,
-    transaction_service: TransactionService,
-    user_service: UserService
+    crypto_payments: CryptoPaymentService
 ):
-    """Проверить статус криптоплатежа"""
-    payload = callback_data.package
+    """
+    Проверить статус криптоплатежа.
+    Статус читается из Redis: оплату подтверждают webhook и фоновый опрос,
+    нажатие только просит опросить CryptoBot раньше срока
+    """
+    try:
+        invoice_id = int(callback_data.package)
+    except ValueError:
+        await callback.answer("❌ Ошибка проверки платежа", show_alert=True)
+        return
     
-    # В реальном проекте здесь будет проверка через CryptoBot API
-    # Пока что эмулируем успешную оплату для тестирования
+    state = await crypto_payments.get_invoice_state(invoice_id)
+    if not state or int(state["user_id"]) != user.telegram_id:
+        await callback.answer("❌ Счет не найден", show_alert=True)
+        return
     
-    # Парсим payload для получения пакета
-    try:
-        parts = payload.split("_")
-        package_name = f"{parts[1]}_{parts[2]}"  # crypto_basic, crypto_standard, etc.
-        user_id = int(parts[3])
-        
-        if user_id != user.telegram_id:
-            await callback.answer("❌ Ошибка проверки платежа", show_alert=True)
-            return
-        
-        package = CRYPTOBOT_PACKAGES.get(package_name)
-        if not package:
-            await callback.answer("❌ Пакет не найден", show_alert=True)
-            return
-        
-        # Проверяем, не обработан ли уже этот платеж
-        existing = await transaction_service.get_transaction_by_stars_id(payload)
-        if existing:
-            await callback.answer("✅ Платеж уже обработан", show_alert=True)
-            return
-        
-        # Здесь в реальности будет API запрос к CryptoBot для проверки статуса
-        # Пока что для тестирования сразу засчитываем как оплаченный
-        
-        # Создаем транзакцию
-        transaction = await transaction_service.create_transaction(
-            user_id=user.telegram_id,
-            amount=Decimal(str(package["gram"])),
-            transaction_type="deposit_crypto",
-            description=f"Пополнение через CryptoBot: {package['amount']} {package['currency']} → {package['gram']:,} GRAM",
-            reference_id=payload,
-            reference_type="cryptobot",
-            stars_transaction_id=payload  # Используем как уникальный ID
-        )
-        
-        if transaction:
-            # Обновляем баланс пользователя
-            await user_service.update_balance(
-                user.telegram_id,
-                Decimal(str(package["gram"])),
-                "deposit_crypto",
-                f"Пополнение через CryptoBot: {package['gram']:,} GRAM"
-            )
-            
-            updated_user = await user_service.get_user(user.telegram_id)
-            
-            success_text = f"""🎉 <b>КРИПТОПЛАТЕЖ ОБРАБОТАН!</b>
+    if state["status"] == "paid":
+        success_text = f"""🎉 <b>КРИПТОПЛАТЕЖ ОБРАБОТАН!</b>
 
-💎 Оплачено: {package['amount']} {package['currency']}
-💰 Зачислено: {package['gram']:,} GRAM
-💳 Ваш баланс: {updated_user.balance:,.0f} GRAM
+💰 Зачислено: {int(state['gram']):,} GRAM
+💳 Ваш баланс: {user.balance:,.0f} GRAM
 
 ✨ Спасибо за пополнение!"""
-            
-            await callback.message.edit_text(
-                success_text,
-                reply_markup=get_main_menu_keyboard(updated_user)
-            )
-            await callback.answer("🎉 Платеж успешно обработан!")
-        else:
-            await callback.answer("❌ Ошибка при обработке платежа", show_alert=True)
-            
-    except Exception as e:
-        print(f"Crypto payment check error: {e}")
-        await callback.answer("❌ Ошибка проверки платежа", show_alert=True)
+        
+        await callback.message.edit_text(
+            success_text,
+            reply_markup=get_main_menu_keyboard(user)
+        )
+        await callback.answer("🎉 Платеж успешно обработан!")
+    elif state["status"] == "expired":
+        await callback.answer("⏰ Срок действия счета истек. Создайте новый.", show_alert=True)
+    else:
+        await crypto_payments.request_check()
+        await callback.answer(
+            "⏳ Оплата еще не поступила.\n\nПосле оплаты GRAM зачислятся автоматически и бот пришлет уведомление.",
+            show_alert=True
+        )
 
 # ==================== БАЛАНСЫ И КОМАНДЫ ====================
 
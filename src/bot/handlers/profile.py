@@ -2,7 +2,10 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.filters import Command
 
+from app.database.models.user import User
 from app.services.user_service import UserService
+from app.services.task_service import TaskService
+from app.services.transaction_service import TransactionService
 from app.bot.keyboards.main_menu import MainMenuCallback, get_back_to_menu_keyboard
 from app.bot.keyboards.profile import get_profile_keyboard, ProfileCallback, get_deposit_keyboard
 from app.bot.utils.messages import get_profile_text, get_balance_details_text, get_deposit_text
@@ -98,11 +101,8 @@ async def show_deposit_menu(callback: CallbackQuery):
     await callback.answer()
 
 @router.callback_query(ProfileCallback.filter(F.action == "my_tasks"))
-async def show_my_tasks(callback: CallbackQuery, user: User, task_service):
+async def show_my_tasks(callback: CallbackQuery, user: User, task_service: TaskService):
     """Показать мои задания"""
-    from app.services.task_service import TaskService
-    
-    task_service = TaskService()
     tasks = await task_service.get_user_tasks(user.telegram_id, limit=10)
     
     if not tasks:
@@ -127,11 +127,8 @@ async def show_my_tasks(callback: CallbackQuery, user: User, task_service):
     await callback.answer()
 
 @router.callback_query(ProfileCallback.filter(F.action == "executed_tasks"))
-async def show_executed_tasks(callback: CallbackQuery, user: User):
+async def show_executed_tasks(callback: CallbackQuery, user: User, task_service: TaskService):
     """Показать выполненные задания"""
-    from app.services.task_service import TaskService
-    
-    task_service = TaskService()
     executions = await task_service.get_user_executions(user.telegram_id, limit=10)
     
     if not executions:
@@ -197,11 +194,8 @@ async def show_referrals(callback: CallbackQuery, user: User, user_service: User
     await callback.answer()
 
 @router.callback_query(ProfileCallback.filter(F.action == "transactions"))
-async def show_transactions(callback: CallbackQuery, user: User, transaction_service):
+async def show_transactions(callback: CallbackQuery, user: User, transaction_service: TransactionService):
     """Показать историю транзакций"""
-    from app.services.transaction_service import TransactionService
-    
-    transaction_service = TransactionService()
     transactions = await transaction_service.get_user_transactions(user.telegram_id, limit=10)
     
     if not transactions:
@@ -6,20 +6,25 @@ from decimal import Decimal
 
 from app.database.models.user import User
 from app.services.settings_service import SettingsService
+from app.bot.keyboards.factory import frozen_keyboard
 from app.bot.keyboards.main_menu import MainMenuCallback, get_main_menu_keyboard
 
 router = Router()
 
 # Callback данные для настроек
-from aiogram.filters.callback_data import CallbackData
+from app.bot.keyboards.codec import CompactCallbackData
 
-class SettingsCallback(CallbackData, prefix="settings"):
+class SettingsCallback(CompactCallbackData, prefix="settings", code="~"):
     action: str
     setting: str = "none"
     value: str = "none"
 
 async def get_settings_keyboard(user_id: int, settings_service: SettingsService):
-    """Клавиатура настроек"""
+    """Клавиатура настроек (одинакова для всех пользователей)"""
+    return _settings_keyboard()
+
+@frozen_keyboard
+def _settings_keyboard():
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     from aiogram.types import InlineKeyboardButton
     
@@ -73,61 +78,71 @@ async def get_settings_keyboard(user_id: int, settings_service: SettingsService)
 
 async def get_notifications_keyboard(user_id: int, settings_service: SettingsService):
     """Клавиатура настроек уведомлений"""
+    settings = await settings_service.get_user_settings(user_id)
+    
+    # Вариантов клавиатуры - по числу сочетаний флагов, каждый строится один раз
+    return _notifications_keyboard(
+        bool(settings.task_notifications),
+        bool(settings.payment_notifications),
+        bool(settings.referral_notifications),
+        bool(settings.admin_notifications)
+    )
+
+@frozen_keyboard
+def _notifications_keyboard(tasks: bool, payments: bool, referrals: bool, admin: bool):
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     from aiogram.types import InlineKeyboardButton
     
-    settings = await settings_service.get_user_settings(user_id)
-    
     builder = InlineKeyboardBuilder()
     
     # Уведомления о заданиях
-    task_status = "✅ ВКЛ" if settings.task_notifications else "❌ ВЫКЛ"
+    task_status = "✅ ВКЛ" if tasks else "❌ ВЫКЛ"
     builder.row(
         InlineKeyboardButton(
             text=f"🎯 Задания: {task_status}",
             callback_data=SettingsCallback(
                 action="toggle", 
                 setting="tasks", 
-                value="off" if settings.task_notifications else "on"
+                value="off" if tasks else "on"
             ).pack()
         )
     )
     
     # Уведомления о платежах
-    payment_status = "✅ ВКЛ" if settings.payment_notifications else "❌ ВЫКЛ"
+    payment_status = "✅ ВКЛ" if payments else "❌ ВЫКЛ"
     builder.row(
         InlineKeyboardButton(
             text=f"💰 Платежи: {payment_status}",
             callback_data=SettingsCallback(
                 action="toggle",
                 setting="payments",
-                value="off" if settings.payment_notifications else "on"
+                value="off" if payments else "on"
             ).pack()
         )
     )
     
     # Уведомления о рефералах
-    referral_status = "✅ ВКЛ" if settings.referral_notifications else "❌ ВЫКЛ"
+    referral_status = "✅ ВКЛ" if referrals else "❌ ВЫКЛ"
     builder.row(
         InlineKeyboardButton(
             text=f"👥 Рефералы: {referral_status}",
             callback_data=SettingsCallback(
                 action="toggle",
                 setting="referrals",
-                value="off" if settings.referral_notifications else "on"
+                value="off" if referrals else "on"
             ).pack()
         )
     )
     
     # Админские уведомления
-    admin_status = "✅ ВКЛ" if settings.admin_notifications else "❌ ВЫКЛ"
+    admin_status = "✅ ВКЛ" if admin else "❌ ВЫКЛ"
     builder.row(
         InlineKeyboardButton(
             text=f"👨‍💼 Админ: {admin_status}",
             callback_data=SettingsCallback(
                 action="toggle",
                 setting="admin",
-                value="off" if settings.admin_notifications else "on"
+                value="off" if admin else "on"
             ).pack()
         )
     )
@@ -143,61 +158,70 @@ async def get_notifications_keyboard(user_id: int, settings_service: SettingsSer
 
 async def get_privacy_keyboard(user_id: int, settings_service: SettingsService):
     """Клавиатура настроек приватности"""
+    settings = await settings_service.get_user_settings(user_id)
+    
+    return _privacy_keyboard(
+        bool(settings.hide_profile),
+        bool(settings.hide_stats),
+        bool(settings.hide_from_leaderboard),
+        bool(settings.allow_referral_mentions)
+    )
+
+@frozen_keyboard
+def _privacy_keyboard(hide_profile: bool, hide_stats: bool, hide_from_leaderboard: bool, allow_referral_mentions: bool):
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     from aiogram.types import InlineKeyboardButton
     
-    settings = await settings_service.get_user_settings(user_id)
-    
     builder = InlineKeyboardBuilder()
     
     # Скрыть профиль
-    profile_status = "✅ ВКЛ" if settings.hide_profile else "❌ ВЫКЛ"
+    profile_status = "✅ ВКЛ" if hide_profile else "❌ ВЫКЛ"
     builder.row(
         InlineKeyboardButton(
             text=f"👤 Скрыть профиль: {profile_status}",
             callback_data=SettingsCallback(
                 action="toggle_privacy",
                 setting="hide_profile", 
-                value="off" if settings.hide_profile else "on"
+                value="off" if hide_profile else "on"
             ).pack()
         )
     )
     
     # Скрыть статистику
-    stats_status = "✅ ВКЛ" if settings.hide_stats else "❌ ВЫКЛ"
+    stats_status = "✅ ВКЛ" if hide_stats else "❌ ВЫКЛ"
     builder.row(
         InlineKeyboardButton(
             text=f"📊 Скрыть статистику: {stats_status}",
             callback_data=SettingsCallback(
                 action="toggle_privacy",
                 setting="hide_stats",
-                value="off" if settings.hide_stats else "on"
+                value="off" if hide_stats else "on"
             ).pack()
         )
     )
     
     # Скрыть из рейтинга
-    leaderboard_status = "✅ ВКЛ" if settings.hide_from_leaderboard else "❌ ВЫКЛ"
+    leaderboard_status = "✅ ВКЛ" if hide_from_leaderboard else "❌ ВЫКЛ"
     builder.row(
         InlineKeyboardButton(
             text=f"🏆 Скрыть из рейтинга: {leaderboard_status}",
             callback_data=SettingsCallback(
                 action="toggle_privacy",
                 setting="hide_from_leaderboard",
-                value="off" if settings.hide_from_leaderboard else "on"
+                value="off" if hide_from_leaderboard else "on"
             ).pack()
         )
     )
     
     # Реферальные упоминания
-    mentions_status = "✅ ВКЛ" if settings.allow_referral_mentions else "❌ ВЫКЛ"
+    mentions_status = "✅ ВКЛ" if allow_referral_mentions else "❌ ВЫКЛ"
     builder.row(
         InlineKeyboardButton(
             text=f"🔗 Реферальные упоминания: {mentions_status}",
             callback_data=SettingsCallback(
                 action="toggle_privacy",
                 setting="allow_referral_mentions",
-                value="off" if settings.allow_referral_mentions else "on"
+                value="off" if allow_referral_mentions else "on"
             ).pack()
         )
     )
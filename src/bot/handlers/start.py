@@ -3,6 +3,7 @@ from aiogram.types import Message
 from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
 
+from app.database.models.user import User
 from app.services.user_service import UserService
 from app.bot.keyboards.main_menu import get_main_menu_keyboard
 from app.bot.utils.messages import get_welcome_text, HELP_MESSAGE, get_main_menu_text
@@ -43,19 +44,16 @@ async def cmd_start(message: Message, state: FSMContext, user_service: UserServi
     )
 
 @router.message(Command("help"))
-async def cmd_help(message: Message, user_service: UserService):
+async def cmd_help(message: Message, user: User):
     """Обработка команды /help"""
-    user = await user_service.get_user(message.from_user.id)
-    
     await message.answer(
         HELP_MESSAGE,
         reply_markup=get_main_menu_keyboard(user)
     )
 
 @router.message(Command("menu"))
-async def cmd_menu(message: Message, user_service: UserService):
+async def cmd_menu(message: Message, user: User):
     """Обработка команды /menu"""
-    user = await user_service.get_user(message.from_user.id)
     menu_text = get_main_menu_text(user)
     
     await message.answer(
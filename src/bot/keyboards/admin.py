@@ -1,13 +1,17 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.filters.callback_data import CallbackData
 
-class AdminCallback(CallbackData, prefix="admin"):
+from app.bot.keyboards.codec import CompactCallbackData
+from app.bot.keyboards.factory import frozen_keyboard
+from app.bot.keyboards.main_menu import MainMenuCallback
+
+class AdminCallback(CompactCallbackData, prefix="admin", code="@"):
     """Callback данные для админки"""
     action: str
     target_id: int = 0
     page: int = 1
 
+@frozen_keyboard
 def get_admin_menu_keyboard() -> InlineKeyboardMarkup:
     """Главное меню админки"""
     builder = InlineKeyboardBuilder()
@@ -58,6 +62,7 @@ def get_admin_menu_keyboard() -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+@frozen_keyboard
 def get_moderation_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура модерации"""
     builder = InlineKeyboardBuilder()
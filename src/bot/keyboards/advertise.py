@@ -1,18 +1,20 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.filters.callback_data import CallbackData
 
 from app.database.models.task import Task, TaskType, TaskStatus
 from app.database.models.user import User
+from app.bot.keyboards.codec import CompactCallbackData
+from app.bot.keyboards.factory import build_markup, callback_button, frozen_keyboard, nav_row
 from app.bot.keyboards.main_menu import MainMenuCallback
 
-class AdvertiseCallback(CallbackData, prefix="adv"):
+class AdvertiseCallback(CompactCallbackData, prefix="adv", code="%"):
     """Callback данные для рекламы"""
     action: str
     task_type: str = "none"
     task_id: int = 0
     page: int = 1
 
+@frozen_keyboard
 def get_advertise_menu_keyboard() -> InlineKeyboardMarkup:
     """Главное меню рекламы"""
     builder = InlineKeyboardBuilder()
@@ -71,72 +73,37 @@ def get_advertise_menu_keyboard() -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+# Иконки статусов заданий в списке
+TASK_STATUS_ICONS = {
+    TaskStatus.ACTIVE: "🟢",
+    TaskStatus.PAUSED: "⏸️",
+    TaskStatus.COMPLETED: "✅",
+    TaskStatus.CANCELLED: "❌",
+    TaskStatus.EXPIRED: "⏰"
+}
+
 def get_my_tasks_keyboard(
     tasks: list[Task], 
     page: int = 1,
     has_next: bool = False
 ) -> InlineKeyboardMarkup:
     """Клавиатура моих заданий"""
-    builder = InlineKeyboardBuilder()
-    
-    # Задания
-    for task in tasks:
-        # Иконка статуса
-        status_icons = {
-            TaskStatus.ACTIVE: "🟢",
-            TaskStatus.PAUSED: "⏸️",
-            TaskStatus.COMPLETED: "✅",
-            TaskStatus.CANCELLED: "❌",
-            TaskStatus.EXPIRED: "⏰"
-        }
-        
-        status_icon = status_icons.get(task.status, "❓")
-        progress = f"{task.completed_executions}/{task.target_executions}"
-        
-        button_text = f"{status_icon} {task.title[:20]}... | {progress}"
-        
-        builder.row(
-            InlineKeyboardButton(
-                text=button_text,
-                callback_data=AdvertiseCallback(action="manage", task_id=task.id).pack()
-            )
-        )
-    
-    # Навигация
-    nav_buttons = []
-    
-    if page > 1:
-        nav_buttons.append(
-            InlineKeyboardButton(
-                text="⬅️ Назад",
-                callback_data=AdvertiseCallback(action="my_tasks", page=page-1).pack()
-            )
-        )
-    
-    if has_next:
-        nav_buttons.append(
-            InlineKeyboardButton(
-                text="➡️ Вперед", 
-                callback_data=AdvertiseCallback(action="my_tasks", page=page+1).pack()
-            )
-        )
-    
-    if nav_buttons:
-        builder.row(*nav_buttons)
+    rows = [
+        (callback_button(
+            f"{TASK_STATUS_ICONS.get(task.status, '❓')} {task.title[:20]}... | "
+            f"{task.completed_executions}/{task.target_executions}",
+            AdvertiseCallback, action="manage", task_id=task.id
+        ),)
+        for task in tasks
+    ]
     
-    # Кнопки управления
-    builder.row(
-        InlineKeyboardButton(
-            text="➕ Создать новое",
-            callback_data=AdvertiseCallback(action="menu").pack()
-        ),
-        InlineKeyboardButton(
-            text="🔄 Обновить",
-            callback_data=AdvertiseCallback(action="my_tasks", page=page).pack()
-        )
-    )
+    rows.append(nav_row(AdvertiseCallback, page, has_next, action="my_tasks"))
+    rows.append((
+        callback_button("➕ Создать новое", AdvertiseCallback, action="menu"),
+        callback_button("🔄 Обновить", AdvertiseCallback, action="my_tasks", page=page)
+    ))
     
-    return builder.as_markup()
+    return build_markup(rows)
 
 def get_task_management_keyboard(task: Task) -> InlineKeyboardMarkup:
     """Клавиатура управления заданием"""
@@ -185,6 +152,7 @@ def get_task_management_keyboard(task: Task) -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+@frozen_keyboard
 def get_task_type_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора типа задания"""
     builder = InlineKeyboardBuilder()
@@ -1,18 +1,25 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.filters.callback_data import CallbackData
 
 from app.database.models.check import Check, CheckType
 from app.database.models.user import User
+from app.bot.keyboards.codec import CompactCallbackData
+from app.bot.keyboards.factory import build_markup, callback_button, frozen_keyboard, nav_row
 from app.bot.keyboards.main_menu import MainMenuCallback
+from app.config.settings import settings
 
-class CheckCallback(CallbackData, prefix="check"):
+class CheckCallback(CompactCallbackData, prefix="check", code="&"):
     """Callback данные для чеков"""
     action: str
     check_id: int = 0
     check_type: str = "none"
     page: int = 1
 
+class CheckClaimCallback(CompactCallbackData, prefix="claim", code="*"):
+    """Активация чека кнопкой из inline-сообщения"""
+    code: str
+
+@frozen_keyboard
 def get_checks_menu_keyboard() -> InlineKeyboardMarkup:
     """Главное меню чеков"""
     builder = InlineKeyboardBuilder()
@@ -55,6 +62,7 @@ def get_checks_menu_keyboard() -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+@frozen_keyboard
 def get_check_type_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора типа чека"""
     builder = InlineKeyboardBuilder()
@@ -89,78 +97,37 @@ def get_check_type_keyboard() -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+# Иконки статусов чеков в списке
+CHECK_STATUS_ICONS = {
+    "active": "🟢",
+    "expired": "⏰",
+    "completed": "✅",
+    "cancelled": "❌"
+}
+
 def get_my_checks_keyboard(
     checks: list[Check], 
     page: int = 1,
     has_next: bool = False
 ) -> InlineKeyboardMarkup:
     """Клавиатура моих чеков"""
-    builder = InlineKeyboardBuilder()
-    
-    # Чеки
-    for check in checks:
-        # Иконка статуса
-        status_icons = {
-            "active": "🟢",
-            "expired": "⏰",
-            "completed": "✅",
-            "cancelled": "❌"
-        }
-        
-        status_icon = status_icons.get(check.status, "❓")
-        progress = f"{check.current_activations}/{check.max_activations}"
-        
-        button_text = f"{status_icon} #{check.check_code} | {progress}"
-        
-        builder.row(
-            InlineKeyboardButton(
-                text=button_text,
-                callback_data=CheckCallback(action="manage", check_id=check.id).pack()
-            )
-        )
-    
-    # Навигация
-    nav_buttons = []
-    
-    if page > 1:
-        nav_buttons.append(
-            InlineKeyboardButton(
-                text="⬅️ Назад",
-                callback_data=CheckCallback(action="my_checks", page=page-1).pack()
-            )
-        )
-    
-    if has_next:
-        nav_buttons.append(
-            InlineKeyboardButton(
-                text="➡️ Вперед",
-                callback_data=CheckCallback(action="my_checks", page=page+1).pack()
-            )
-        )
-    
-    if nav_buttons:
-        builder.row(*nav_buttons)
-    
-    # Кнопки управления
-    builder.row(
-        InlineKeyboardButton(
-            text="➕ Создать новый",
-            callback_data=CheckCallback(action="create_menu").pack()
-        ),
-        InlineKeyboardButton(
-            text="🔄 Обновить",
-            callback_data=CheckCallback(action="my_checks", page=page).pack()
-        )
-    )
-    
-    builder.row(
-        InlineKeyboardButton(
-            text="⬅️ Назад в чеки",
-            callback_data=CheckCallback(action="menu").pack()
-        )
-    )
-    
-    return builder.as_markup()
+    rows = [
+        (callback_button(
+            f"{CHECK_STATUS_ICONS.get(check.status, '❓')} #{check.check_code} | "
+            f"{check.current_activations}/{check.max_activations}",
+            CheckCallback, action="manage", check_id=check.id
+        ),)
+        for check in checks
+    ]
+    
+    rows.append(nav_row(CheckCallback, page, has_next, action="my_checks"))
+    rows.append((
+        callback_button("➕ Создать новый", CheckCallback, action="create_menu"),
+        callback_button("🔄 Обновить", CheckCallback, action="my_checks", page=page)
+    ))
+    rows.append((callback_button("⬅️ Назад в чеки", CheckCallback, action="menu"),))
+    
+    return build_markup(rows)
 
 def get_check_management_keyboard(check: Check) -> InlineKeyboardMarkup:
     """Клавиатура управления чеком"""
@@ -170,7 +137,7 @@ def get_check_management_keyboard(check: Check) -> InlineKeyboardMarkup:
     builder.row(
         InlineKeyboardButton(
             text="📤 Поделиться чеком",
-            switch_inline_query=f"💳 Чек на {check.amount_per_activation:,.0f} GRAM! Код: {check.check_code}"
+            switch_inline_query=check.check_code
         )
     )
     
@@ -209,55 +176,32 @@ def get_check_management_keyboard(check: Check) -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
-def get_check_activation_keyboard() -> InlineKeyboardMarkup:
-    """Клавиатура активации чека"""
+def get_inline_check_keyboard(code: str, has_password: bool) -> InlineKeyboardMarkup:
+    """Кнопка под карточкой чека, отправленной через inline-режим"""
     builder = InlineKeyboardBuilder()
     
-    builder.row(
-        InlineKeyboardButton(
-            text="⬅️ Назад в чеки",
-            callback_data=CheckCallback(action="menu").pack()
-        )
-    )
-    
-    return builder.as_markup()
-
-def get_activated_checks_keyboard(
-    activations: list,
-    page: int = 1,
-    has_next: bool = False
-) -> InlineKeyboardMarkup:
-    """Клавиатура активированных чеков"""
-    builder = InlineKeyboardBuilder()
-    
-    # Навигация
-    nav_buttons = []
-    
-    if page > 1:
-        nav_buttons.append(
+    if has_password:
+        # Пароль кнопкой не передать - активация сообщением в боте
+        builder.row(
             InlineKeyboardButton(
-                text="⬅️ Назад",
-                callback_data=CheckCallback(action="activated", page=page-1).pack()
+                text="🔒 Активировать в боте",
+                url=f"https://t.me/{settings.BOT_USERNAME}"
             )
         )
-    
-    if has_next:
-        nav_buttons.append(
+    else:
+        builder.row(
             InlineKeyboardButton(
-                text="➡️ Вперед",
-                callback_data=CheckCallback(action="activated", page=page+1).pack()
+                text="🎁 Активировать",
+                callback_data=CheckClaimCallback(code=code).pack()
             )
         )
     
-    if nav_buttons:
-        builder.row(*nav_buttons)
-    
-    builder.row(
-        InlineKeyboardButton(
-            text="🔄 Обновить",
-            callback_data=CheckCallback(action="activated", page=page).pack()
-        )
-    )
+    return builder.as_markup()
+
+@frozen_keyboard
+def get_check_activation_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура активации чека"""
+    builder = InlineKeyboardBuilder()
     
     builder.row(
         InlineKeyboardButton(
@@ -268,6 +212,21 @@ def get_activated_checks_keyboard(
     
     return builder.as_markup()
 
+def get_activated_checks_keyboard(
+    activations: list,
+    page: int = 1,
+    has_next: bool = False
+) -> InlineKeyboardMarkup:
+    """
+    Клавиатура активированных чеков.
+    Не кэшируется целиком: страница приходит от клиента; кнопки берутся из ограниченных кэшей фабрики
+    """
+    return build_markup([
+        nav_row(CheckCallback, page, has_next, action="activated"),
+        (callback_button("🔄 Обновить", CheckCallback, action="activated", page=page),),
+        (callback_button("⬅️ Назад в чеки", CheckCallback, action="menu"),)
+    ])
+
 def get_check_display_keyboard(check_code: str) -> InlineKeyboardMarkup:
     """Клавиатура для отображения чека"""
     builder = InlineKeyboardBuilder()
@@ -281,6 +240,7 @@ def get_check_display_keyboard(check_code: str) -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+@frozen_keyboard
 def get_cancel_keyboard() -> InlineKeyboardMarkup:
     """Кнопка отмены"""
     builder = InlineKeyboardBuilder()
@@ -0,0 +1,221 @@
+"""
+Компактный формат callback_data.
+
+Вместо "check:manage:123:none:1" кнопка несет "<код класса><base64url(поля)>":
+
+• первый символ - код класса, по нему CALLBACK_REGISTRY находит класс
+• поля упакованы в порядке объявления: целые - varint (zigzag),
+  строки - длина и UTF-8, bool - один байт
+• хвостовые поля со значениями по умолчанию не передаются
+
+Фильтр класса отклоняет чужой callback сравнением первого символа, без разбора
+строки, а разобранные данные кэшируются - несколько фильтров одного класса
+разбирают строку один раз. Кнопки старого формата ("prefix:...") в уже
+отправленных сообщениях по-прежнему разбираются.
+
+Порядок полей - часть формата: новые поля добавляются только в конец.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Type
+
+from aiogram.filters.callback_data import CallbackData, CallbackQueryFilter
+from aiogram.types import CallbackQuery
+from magic_filter import MagicFilter
+
+# Коды классов не входят в алфавит base64url и не начинают строковые callback ("cancel" и т.п.)
+CODE_ALPHABET = "!#$%&()*+,.;<=>?@[]^{|}~"
+MAX_CALLBACK_DATA_LENGTH = 64
+DECODE_CACHE_SIZE = 4096
+
+CALLBACK_REGISTRY: Dict[str, Type["CompactCallbackData"]] = {}
+
+# Поле без значения по умолчанию: никогда не отбрасывается из хвоста
+_REQUIRED = object()
+
+# ==================== VARINT ====================
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated callback data")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+        if shift > 63:
+            raise ValueError("Callback data varint is too long")
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+# ==================== КЛАССЫ CALLBACK ====================
+
+class CompactCallbackFilter(CallbackQueryFilter):
+    """Фильтр CallbackData: чужие callback отсекаются по первому символу"""
+
+    async def __call__(self, query: CallbackQuery) -> bool | Dict[str, Any]:
+        if not isinstance(query, CallbackQuery) or not query.data:
+            return False
+        if not self.callback_data.owns(query.data):
+            return False
+        return await super().__call__(query)
+
+class CompactCallbackData(CallbackData, prefix="compact"):
+    """
+    CallbackData в компактном формате.
+
+    Класс объявляет код из CODE_ALPHABET:
+        class CheckCallback(CompactCallbackData, prefix="check", code="&")
+    prefix остается для разбора кнопок старого формата.
+    Поля - int, str или bool
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        code = kwargs.pop("code", None)
+        if code is None or len(code) != 1 or code not in CODE_ALPHABET:
+            raise ValueError(f"{cls.__name__}: code must be one character from {CODE_ALPHABET!r}")
+        if code in CALLBACK_REGISTRY:
+            raise ValueError(f"{cls.__name__}: code {code!r} is already used by {CALLBACK_REGISTRY[code].__name__}")
+
+        super().__init_subclass__(**kwargs)
+        cls.__callback_code__ = code
+        CALLBACK_REGISTRY[code] = cls
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+
+        # (имя, тип, значение по умолчанию или _REQUIRED) - поля известны после сборки модели
+        specs = []
+        for name, field in cls.model_fields.items():
+            kind = field.annotation
+            if kind not in (int, str, bool):
+                raise TypeError(f"{cls.__name__}.{name}: compact callback fields must be int, str or bool")
+            specs.append((name, kind, _REQUIRED if field.is_required() else field.default))
+        cls.__fields_spec__ = tuple(specs)
+
+    @classmethod
+    def owns(cls, data: str) -> bool:
+        """Строка принадлежит классу (компактный или старый формат) - без разбора полей"""
+        return data[:1] == cls.__callback_code__ or data.startswith(f"{cls.__prefix__}{cls.__separator__}")
+
+    @classmethod
+    def prefix_filter(cls) -> Callable[[CallbackQuery], bool]:
+        """Фильтр уровня роутера: только callback этого класса"""
+        def _owns(callback: CallbackQuery) -> bool:
+            return bool(callback.data) and cls.owns(callback.data)
+        return _owns
+
+    def pack(self) -> str:
+        specs = self.__fields_spec__
+
+        # Хвостовые значения по умолчанию не передаются
+        last = len(specs)
+        while last and getattr(self, specs[last - 1][0]) == specs[last - 1][2]:
+            last -= 1
+
+        out = bytearray()
+        for name, kind, _ in specs[:last]:
+            value = getattr(self, name)
+            if kind is str:
+                raw = value.encode()
+                _write_varint(out, len(raw))
+                out += raw
+            elif kind is bool:
+                out.append(1 if value else 0)
+            else:
+                _write_varint(out, _zigzag(value))
+
+        packed = self.__callback_code__ + base64.urlsafe_b64encode(out).rstrip(b"=").decode()
+        if len(packed.encode()) > MAX_CALLBACK_DATA_LENGTH:
+            raise ValueError(
+                f"Resulted callback data is too long! len({packed!r}.encode()) > {MAX_CALLBACK_DATA_LENGTH}"
+            )
+        return packed
+
+    @classmethod
+    def unpack(cls, value: str) -> "CompactCallbackData":
+        if value[:1] == cls.__callback_code__:
+            return _decode(cls, value)
+        if value.startswith(f"{cls.__prefix__}{cls.__separator__}"):
+            # Кнопка старого формата из ранее отправленного сообщения
+            return super().unpack(value)
+        raise ValueError(f"Bad prefix ({value!r} doesn't belong to {cls.__name__})")
+
+    @classmethod
+    def filter(cls, rule: Optional[MagicFilter] = None) -> CompactCallbackFilter:
+        return CompactCallbackFilter(callback_data=cls, rule=rule)
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode(cls: Type[CompactCallbackData], value: str) -> CompactCallbackData:
+    """Разбор компактной строки. Результат общий для одинаковых строк - не изменять"""
+    encoded = value[1:]
+    try:
+        data = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+    except binascii.Error as e:
+        raise ValueError(f"Malformed callback data {value!r}") from e
+
+    # Одно значение - одна строка: посторонние символы base64 не принимаются
+    if base64.urlsafe_b64encode(data).rstrip(b"=").decode() != encoded:
+        raise ValueError(f"Malformed callback data {value!r}")
+
+    values = {}
+    pos = 0
+    for name, kind, _ in cls.__fields_spec__:
+        if pos == len(data):
+            break
+        if kind is str:
+            length, pos = _read_varint(data, pos)
+            if pos + length > len(data):
+                raise ValueError("Truncated callback data")
+            values[name] = data[pos:pos + length].decode()
+            pos += length
+        elif kind is bool:
+            values[name] = bool(data[pos])
+            pos += 1
+        else:
+            number, pos = _read_varint(data, pos)
+            values[name] = _unzigzag(number)
+
+    if pos != len(data):
+        raise ValueError(f"Unexpected trailing bytes in callback data {value!r}")
+
+    return cls(**values)
+
+# ==================== РЕЕСТР ====================
+
+def decode_callback(data: str | None) -> CompactCallbackData | None:
+    """Разбор любого компактного callback по первому символу; None - не наш формат"""
+    cls = CALLBACK_REGISTRY.get(data[:1]) if data else None
+    if cls is None:
+        return None
+    try:
+        return cls.unpack(data)
+    except (TypeError, ValueError):
+        return None
+
+def describe_callback(data: str | None) -> str | None:
+    """Читаемый вид callback для логов: "check:manage:123:none:1" вместо компактной строки"""
+    decoded = decode_callback(data)
+    if decoded is None:
+        return data
+    return decoded.__separator__.join(
+        [decoded.__prefix__, *(str(getattr(decoded, name)) for name in decoded.model_fields)]
+    )
@@ -1,18 +1,20 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.filters.callback_data import CallbackData
 
 from app.database.models.task import Task, TaskType
 from app.database.models.user import User
+from app.bot.keyboards.codec import CompactCallbackData
+from app.bot.keyboards.factory import build_markup, callback_button, frozen_keyboard, nav_row
 from app.bot.keyboards.main_menu import MainMenuCallback
 
-class EarnCallback(CallbackData, prefix="earn"):
+class EarnCallback(CompactCallbackData, prefix="earn", code="$"):
     """Callback данные для заработка"""
     action: str
     task_type: str = "all"
     task_id: int = 0
     page: int = 1
 
+@frozen_keyboard
 def get_earn_menu_keyboard() -> InlineKeyboardMarkup:
     """Главное меню заработка"""
     builder = InlineKeyboardBuilder()
@@ -78,58 +80,21 @@ def get_task_list_keyboard(
     has_next: bool = False
 ) -> InlineKeyboardMarkup:
     """Клавиатура списка заданий"""
-    builder = InlineKeyboardBuilder()
-    
-    # Задания (по 5 в ряд максимум)
-    for task in tasks:
-        # Формируем текст кнопки
-        reward_text = f"{task.reward_amount:,.0f} GRAM"
-        remaining = task.remaining_executions
-        
-        button_text = f"💰 {reward_text} | {remaining} шт."
-        
-        builder.row(
-            InlineKeyboardButton(
-                text=button_text,
-                callback_data=EarnCallback(action="view", task_id=task.id).pack()
-            )
-        )
-    
-    # Навигация
-    nav_buttons = []
-    
-    if page > 1:
-        nav_buttons.append(
-            InlineKeyboardButton(
-                text="⬅️ Назад",
-                callback_data=EarnCallback(action="list", task_type=task_type, page=page-1).pack()
-            )
-        )
-    
-    if has_next:
-        nav_buttons.append(
-            InlineKeyboardButton(
-                text="➡️ Вперед",
-                callback_data=EarnCallback(action="list", task_type=task_type, page=page+1).pack()
-            )
-        )
-    
-    if nav_buttons:
-        builder.row(*nav_buttons)
-    
-    # Кнопки управления
-    builder.row(
-        InlineKeyboardButton(
-            text="🔄 Обновить",
-            callback_data=EarnCallback(action="list", task_type=task_type, page=page).pack()
-        ),
-        InlineKeyboardButton(
-            text="⬅️ К типам заданий",
-            callback_data=EarnCallback(action="menu").pack()
-        )
-    )
-    
-    return builder.as_markup()
+    rows = [
+        (callback_button(
+            f"💰 {task.reward_amount:,.0f} GRAM | {task.remaining_executions} шт.",
+            EarnCallback, action="view", task_id=task.id
+        ),)
+        for task in tasks
+    ]
+    
+    rows.append(nav_row(EarnCallback, page, has_next, action="list", task_type=task_type))
+    rows.append((
+        callback_button("🔄 Обновить", EarnCallback, action="list", task_type=task_type, page=page),
+        callback_button("⬅️ К типам заданий", EarnCallback, action="menu")
+    ))
+    
+    return build_markup(rows)
 
 def get_task_view_keyboard(task: Task, user: User) -> InlineKeyboardMarkup:
     """Клавиатура просмотра задания"""
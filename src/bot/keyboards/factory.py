@@ -0,0 +1,58 @@
+"""
+Фабрика клавиатур.
+
+Постоянные клавиатуры и клавиатуры, зависящие только от простых аргументов
+(уровень, флаги настроек), строятся один раз для каждого набора аргументов. Кнопки с упакованным callback_data переиспользуются между
+обновлениями, поэтому pack() и валидация моделей aiogram не повторяются.
+
+Возвращаемые разметки общие для всех вызовов: изменять их нельзя.
+"""
+
+from functools import lru_cache
+from typing import Callable, Sequence, Type
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+# Кнопки списков (задания, чеки) зависят от данных - кэш ограничен
+BUTTON_CACHE_SIZE = 4096
+NAV_ROW_CACHE_SIZE = 1024
+
+def frozen_keyboard(func: Callable[..., InlineKeyboardMarkup]) -> Callable[..., InlineKeyboardMarkup]:
+    """
+    Клавиатура строится один раз для каждого набора аргументов.
+    Аргументы - значения из небольшого закрытого множества (флаги, уровень, тип), а не модели
+    и не значения от клиента (страница, id): кэш не ограничен
+    """
+    return lru_cache(maxsize=None)(func)
+
+@lru_cache(maxsize=BUTTON_CACHE_SIZE)
+def _callback_button(text: str, callback_cls: Type[CallbackData], fields: tuple) -> InlineKeyboardButton:
+    return InlineKeyboardButton(text=text, callback_data=callback_cls(**dict(fields)).pack())
+
+def callback_button(text: str, callback_cls: Type[CallbackData], **fields) -> InlineKeyboardButton:
+    """Кнопка с упакованным callback_data из кэша"""
+    return _callback_button(text, callback_cls, tuple(sorted(fields.items())))
+
+@lru_cache(maxsize=NAV_ROW_CACHE_SIZE)
+def _nav_row(callback_cls: Type[CallbackData], page: int, has_next: bool, fields: tuple) -> tuple[InlineKeyboardButton, ...]:
+    row = []
+    if page > 1:
+        row.append(InlineKeyboardButton(
+            text="⬅️ Назад",
+            callback_data=callback_cls(**dict(fields), page=page - 1).pack()
+        ))
+    if has_next:
+        row.append(InlineKeyboardButton(
+            text="➡️ Вперед",
+            callback_data=callback_cls(**dict(fields), page=page + 1).pack()
+        ))
+    return tuple(row)
+
+def nav_row(callback_cls: Type[CallbackData], page: int, has_next: bool, **fields) -> tuple[InlineKeyboardButton, ...]:
+    """Ряд "Назад / Вперед" для постраничных списков; пустой, если листать некуда"""
+    return _nav_row(callback_cls, page, has_next, tuple(sorted(fields.items())))
+
+def build_markup(rows: Sequence[Sequence[InlineKeyboardButton]]) -> InlineKeyboardMarkup:
+    """Разметка из готовых рядов без InlineKeyboardBuilder; пустые ряды пропускаются"""
+    return InlineKeyboardMarkup(inline_keyboard=[list(row) for row in rows if row])
@@ -1,16 +1,21 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.filters.callback_data import CallbackData
 
 from app.database.models.user import User
+from app.bot.keyboards.codec import CompactCallbackData
+from app.bot.keyboards.factory import frozen_keyboard
 
-class MainMenuCallback(CallbackData, prefix="menu"):
+class MainMenuCallback(CompactCallbackData, prefix="menu", code="!"):
     """Callback данные для главного меню"""
     action: str
     data: str = "none"
 
 def get_main_menu_keyboard(user: User | None = None) -> InlineKeyboardMarkup:
-    """Клавиатура главного меню"""
+    """Клавиатура главного меню (одинакова для всех пользователей)"""
+    return _main_menu_keyboard()
+
+@frozen_keyboard
+def _main_menu_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     # Первый ряд - личный кабинет
@@ -59,6 +64,7 @@ def get_main_menu_keyboard(user: User | None = None) -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+@frozen_keyboard
 def get_back_to_menu_keyboard() -> InlineKeyboardMarkup:
     """Кнопка возврата в главное меню"""
     builder = InlineKeyboardBuilder()
@@ -70,6 +76,7 @@ def get_back_to_menu_keyboard() -> InlineKeyboardMarkup:
     )
     return builder.as_markup()
 
+@frozen_keyboard
 def get_cancel_keyboard() -> InlineKeyboardMarkup:
     """Кнопка отмены"""
     builder = InlineKeyboardBuilder()
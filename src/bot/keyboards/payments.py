@@ -1,15 +1,18 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.filters.callback_data import CallbackData
 
 from app.config.settings import settings
+from app.bot.keyboards.codec import CompactCallbackData
+from app.bot.keyboards.factory import frozen_keyboard
+from app.bot.keyboards.main_menu import MainMenuCallback
 
-class PaymentCallback(CallbackData, prefix="pay"):
+class PaymentCallback(CompactCallbackData, prefix="pay", code="+"):
     """Callback данные для платежей"""
     action: str
     package: str = "none"
     amount: int = 0
 
+@frozen_keyboard
 def get_payment_confirmation_keyboard(package_name: str, stars_amount: int) -> InlineKeyboardMarkup:
     """Клавиатура подтверждения платежа"""
     builder = InlineKeyboardBuilder()
@@ -1,17 +1,22 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.filters.callback_data import CallbackData
 
 from app.database.models.user import User
+from app.bot.keyboards.codec import CompactCallbackData
+from app.bot.keyboards.factory import frozen_keyboard
 from app.bot.keyboards.main_menu import MainMenuCallback
 
-class ProfileCallback(CallbackData, prefix="profile"):
+class ProfileCallback(CompactCallbackData, prefix="profile", code="#"):
     """Callback данные для профиля"""
     action: str
     data: str = "none"
 
 def get_profile_keyboard(user: User) -> InlineKeyboardMarkup:
-    """Клавиатура профиля пользователя"""
+    """Клавиатура профиля пользователя (одинакова для всех пользователей)"""
+    return _profile_keyboard()
+
+@frozen_keyboard
+def _profile_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     # Первый ряд - пополнение
@@ -68,6 +73,7 @@ def get_profile_keyboard(user: User) -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+@frozen_keyboard
 def get_deposit_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура для пополнения баланса"""
     from app.config.settings import settings
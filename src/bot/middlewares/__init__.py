@@ -3,23 +3,46 @@ from aiogram import Dispatcher
 from app.bot.middlewares.database import DatabaseMiddleware
 from app.bot.middlewares.auth import AuthMiddleware
 from app.bot.middlewares.rate_limit import RateLimitMiddleware
+from app.bot.middlewares.anti_fraud import AntiFraudMiddleware
 from app.bot.middlewares.logging import LoggingMiddleware
+from app.bot.middlewares.dedupe import DedupeMiddleware
+from app.bot.middlewares.metrics import MetricsMiddleware
+from app.services.container import ServiceContainer
 
-def register_all_middlewares(dp: Dispatcher) -> None:
+def register_all_middlewares(dp: Dispatcher, services: ServiceContainer) -> None:
     """Регистрация всех middlewares в правильном порядке"""
     
+    # 0. Повторные доставки обновлений отбрасываются до любой обработки
+    dp.update.outer_middleware(DedupeMiddleware(services.dedupe))
+    
+    # Метрики времени обработки (охватывают всю цепочку ниже)
+    metrics_middleware = MetricsMiddleware()
+    dp.message.middleware(metrics_middleware)
+    dp.callback_query.middleware(metrics_middleware)
+    dp.pre_checkout_query.middleware(metrics_middleware)
+    dp.inline_query.middleware(metrics_middleware)
+    
     # 1. Логирование (первый - видит все запросы)
     dp.message.middleware(LoggingMiddleware())
     dp.callback_query.middleware(LoggingMiddleware())
     
-    # 2. Ограничение частоты запросов
+    # 2. Антифрод (отсекает заблокированных до любых запросов к БД)
+    anti_fraud_middleware = AntiFraudMiddleware(services.anti_fraud)
+    dp.message.middleware(anti_fraud_middleware)
+    dp.callback_query.middleware(anti_fraud_middleware)
+    
+    # 3. Ограничение частоты запросов
     dp.message.middleware(RateLimitMiddleware())
     dp.callback_query.middleware(RateLimitMiddleware())
     
-    # 3. Внедрение сервисов
-    dp.message.middleware(DatabaseMiddleware())
-    dp.callback_query.middleware(DatabaseMiddleware())
+    # 4. Внедрение сервисов
+    database_middleware = DatabaseMiddleware(services)
+    dp.message.middleware(database_middleware)
+    dp.callback_query.middleware(database_middleware)
+    # Inline-запросам нужны только сервисы: без пользователя из БД и лимитов
+    dp.inline_query.middleware(database_middleware)
     
-    # 4. Аутентификация пользователей (последний)
-    dp.message.middleware(AuthMiddleware())
-    dp.callback_query.middleware(AuthMiddleware())
\ No newline at end of file
+    # 5. Аутентификация пользователей (последний)
+    auth_middleware = AuthMiddleware(services.user_service)
+    dp.message.middleware(auth_middleware)
+    dp.callback_query.middleware(auth_middleware)
\ No newline at end of file
@@ -0,0 +1,57 @@
+from typing import Callable, Dict, Any, Awaitable
+
+import structlog
+from aiogram import BaseMiddleware
+from aiogram.types import Message, CallbackQuery
+
+from app.config.settings import settings
+from app.services.anti_fraud_service import AntiFraudService
+
+logger = structlog.get_logger(__name__)
+
+class AntiFraudMiddleware(BaseMiddleware):
+    """
+    Middleware антифрода.
+    Считает поведенческие признаки каждого события и отсекает
+    временно заблокированных пользователей до обращения к БД
+    """
+
+    def __init__(self, anti_fraud: AntiFraudService | None = None):
+        self.anti_fraud = anti_fraud or AntiFraudService()
+
+    async def __call__(
+        self,
+        handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: Message | CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not settings.ANTIFRAUD_ENABLED or not event.from_user:
+            return await handler(event, data)
+
+        user_id = event.from_user.id
+        if settings.is_admin(user_id):
+            return await handler(event, data)
+
+        callback_data = event.data if isinstance(event, CallbackQuery) else None
+
+        try:
+            blocked_for, just_blocked = await self.anti_fraud.inspect_event(user_id, callback_data)
+        except Exception as e:
+            # Антифрод не должен останавливать бота при недоступности Redis
+            logger.error("💥 Anti-fraud check failed", user_id=user_id, error=str(e))
+            return await handler(event, data)
+
+        if not blocked_for:
+            return await handler(event, data)
+
+        minutes = max(1, blocked_for // 60)
+        if isinstance(event, CallbackQuery):
+            await event.answer(f"🚫 Доступ временно ограничен ({minutes} мин.)", show_alert=True)
+        elif just_blocked:
+            # Сообщения заблокированного пользователя дальше игнорируем молча
+            await event.answer(
+                f"🚫 Обнаружена подозрительная активность.\n\n"
+                f"Доступ к боту временно ограничен на {minutes} мин."
+            )
+
+        return
@@ -2,8 +2,10 @@ from typing import Callable, Dict, Any, Awaitable
 
 import structlog
 from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
 from aiogram.types import Message, CallbackQuery
 
+from app.bot.middlewares.flags import USER_ROW
 from app.services.user_service import UserService
 
 logger = structlog.get_logger(__name__)
@@ -11,8 +13,8 @@ logger = structlog.get_logger(__name__)
 class AuthMiddleware(BaseMiddleware):
     """Middleware для аутентификации и создания пользователей"""
     
-    def __init__(self):
-        self.user_service = UserService()
+    def __init__(self, user_service: UserService | None = None):
+        self.user_service = user_service or UserService()
     
     async def __call__(
         self,
@@ -20,6 +22,17 @@ class AuthMiddleware(BaseMiddleware):
         event: Message | CallbackQuery,
         data: Dict[str, Any]
     ) -> Any:
+        # Обработчику достаточно from_user.id - строку пользователя не загружаем,
+        # но бан проверяем по кэшированному флагу
+        if get_flag(data, "user", default=USER_ROW) != USER_ROW:
+            if await self.user_service.is_banned(event.from_user.id):
+                if isinstance(event, Message):
+                    await event.answer("❌ Ваш аккаунт заблокирован")
+                elif isinstance(event, CallbackQuery):
+                    await event.answer("❌ Ваш аккаунт заблокирован", show_alert=True)
+                return
+            return await handler(event, data)
+        
         # Получаем пользователя из БД
         user = await self.user_service.get_user(event.from_user.id)
         
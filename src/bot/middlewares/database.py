@@ -1,24 +1,31 @@
 from typing import Callable, Dict, Any, Awaitable
 
 from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
 from aiogram.types import Message, CallbackQuery
 
-from app.services.user_service import UserService
-from app.services.transaction_service import TransactionService
-from app.services.task_service import TaskService
+from app.database.database import get_session
+from app.services.container import ServiceContainer
 
 class DatabaseMiddleware(BaseMiddleware):
     """Middleware для внедрения сервисов в обработчики"""
     
+    def __init__(self, services: ServiceContainer):
+        self.services = services
+    
     async def __call__(
         self,
         handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
         event: Message | CallbackQuery,
         data: Dict[str, Any]
     ) -> Any:
-        # Внедряем сервисы в данные обработчика
-        data["user_service"] = UserService()
-        data["transaction_service"] = TransactionService()
-        data["task_service"] = TaskService()
+        # Внедряем общие экземпляры сервисов в данные обработчика
+        data.update(self.services.handler_data())
+        
+        # Сессия БД открывается только по запросу обработчика
+        if get_flag(data, "db_session"):
+            async with get_session() as session:
+                data["session"] = session
+                return await handler(event, data)
         
         return await handler(event, data)
@@ -0,0 +1,40 @@
+from typing import Callable, Dict, Any, Awaitable
+
+import structlog
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from app.services.dedupe_store import DedupeStore
+
+logger = structlog.get_logger(__name__)
+
+class DedupeMiddleware(BaseMiddleware):
+    """
+    Outer middleware обновлений.
+    Каждый update_id обрабатывается один раз, даже если Telegram доставил
+    его повторно или очередь повторила его после падения обработчика
+    """
+
+    def __init__(self, dedupe: DedupeStore | None = None):
+        self.dedupe = dedupe or DedupeStore()
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        # Повтор брошенного обновления из очереди: метка упавшего процесса не должна его пропустить
+        claim = self.dedupe.take_over if data.get("queue_replay") else self.dedupe.claim
+        if not await claim("update", event.update_id):
+            logger.info("♻️ Duplicate update skipped", update_id=event.update_id)
+            return
+
+        try:
+            result = await handler(event, data)
+        except Exception:
+            await self.dedupe.release("update", event.update_id)
+            raise
+
+        await self.dedupe.complete("update", event.update_id)
+        return result
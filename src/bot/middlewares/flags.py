@@ -0,0 +1,32 @@
+"""
+Флаги требований обработчиков.
+
+Обработчик (или весь роутер через set_router_flags) объявляет, что ему нужно,
+а middlewares пропускают лишнюю работу:
+
+• user="row" (по умолчанию) - загрузить пользователя из БД, проверить бан,
+  обновить активность и передать его как `user`
+• user="id" - достаточно event.from_user: строка пользователя не загружается,
+  бан проверяется по флагу в Redis (USER_BAN_CACHE_TTL)
+• db_session=True - открыть сессию БД и передать ее как `session`
+• rate_limit="money" / False - класс лимита запросов или без лимита
+"""
+
+from aiogram import Router
+
+USER_ROW = "row"
+USER_ID = "id"
+
+def set_router_flags(router: Router, **flags) -> None:
+    """
+    Задать флаги по умолчанию всем обработчикам роутера и его дочерних роутеров.
+    Флаги, объявленные у самого обработчика, не перезаписываются.
+    Вызывать после регистрации обработчиков
+    """
+    for observer in router.observers.values():
+        for handler in observer.handlers:
+            for name, value in flags.items():
+                handler.flags.setdefault(name, value)
+
+    for sub_router in router.sub_routers:
+        set_router_flags(sub_router, **flags)
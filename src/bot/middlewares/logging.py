@@ -4,6 +4,8 @@ import structlog
 from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery
 
+from app.bot.keyboards.codec import describe_callback
+
 logger = structlog.get_logger(__name__)
 
 class LoggingMiddleware(BaseMiddleware):
@@ -30,7 +32,7 @@ class LoggingMiddleware(BaseMiddleware):
                 "🔘 Callback received",
                 user_id=user.id,
                 username=user.username,
-                callback_data=event.data
+                callback_data=describe_callback(event.data)
             )
         
         try:
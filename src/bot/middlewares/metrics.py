@@ -0,0 +1,69 @@
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject
+
+from app.services.metrics import (
+    HANDLER_ERRORS,
+    HANDLER_LATENCY,
+    TELEGRAM_API_ERRORS,
+    TELEGRAM_API_LATENCY,
+    TELEGRAM_API_RETRY_AFTER,
+)
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Время обработки события по роутеру и обработчику.
+    Регистрируется первым, поэтому учитывает и остальные middlewares
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        if handler_object is None:
+            return await handler(event, data)
+
+        # Имя модуля и функции: ограниченный набор значений меток
+        callback = handler_object.callback
+        router = callback.__module__.rsplit(".", 1)[-1]
+        name = getattr(callback, "__name__", "unknown")
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.labels(router=router, handler=name).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(router=router, handler=name).observe(time.perf_counter() - started)
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Время запросов бота к Bot API и ответы 429"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        api_method = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter:
+            TELEGRAM_API_RETRY_AFTER.labels(method=api_method).inc()
+            raise
+        except Exception:
+            TELEGRAM_API_ERRORS.labels(method=api_method).inc()
+            raise
+        finally:
+            TELEGRAM_API_LATENCY.labels(method=api_method).observe(time.perf_counter() - started)
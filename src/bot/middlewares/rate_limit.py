@@ -1,63 +1,53 @@
-import time
 from typing import Callable, Dict, Any, Awaitable
 
 import structlog
 from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
 from aiogram.types import Message, CallbackQuery
 
-from app.config.settings import settings
+from app.services.rate_limiter import RateLimiter, rate_limiter, format_retry_after
 
 logger = structlog.get_logger(__name__)
 
 class RateLimitMiddleware(BaseMiddleware):
-    """Middleware для ограничения частоты запросов"""
-    
-    def __init__(self):
-        # Хранилище последних действий пользователей
-        self.user_actions: Dict[int, list[float]] = {}
-        self.max_actions = settings.MAX_ACTIONS_PER_MINUTE
-        self.window_seconds = 60
-    
+    """
+    Middleware для ограничения частоты запросов.
+    Маршрут лимита задается флагом обработчика:
+    flags={"rate_limit": "money"} - отдельный лимит, flags={"rate_limit": False} - без лимита
+    """
+
+    def __init__(self, limiter: RateLimiter | None = None):
+        self.limiter = limiter or rate_limiter
+
     async def __call__(
         self,
         handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
         event: Message | CallbackQuery,
         data: Dict[str, Any]
     ) -> Any:
+        route = get_flag(data, "rate_limit", default="default")
+        if route is False or not event.from_user:
+            return await handler(event, data)
+
         user_id = event.from_user.id
-        current_time = time.time()
-        
-        # Получаем список действий пользователя
-        if user_id not in self.user_actions:
-            self.user_actions[user_id] = []
-        
-        user_action_times = self.user_actions[user_id]
-        
-        # Удаляем старые действия (старше минуты)
-        user_action_times[:] = [
-            action_time for action_time in user_action_times
-            if current_time - action_time < self.window_seconds
-        ]
-        
-        # Проверяем лимит
-        if len(user_action_times) >= self.max_actions:
+        retry_after = await self.limiter.hit(user_id, route)
+
+        if retry_after:
             logger.warning(
                 "⚠️ Rate limit exceeded",
                 user_id=user_id,
-                actions_count=len(user_action_times),
-                max_actions=self.max_actions
+                route=route,
+                retry_after=round(retry_after, 1)
             )
-            
+
+            seconds = format_retry_after(retry_after)
             if isinstance(event, Message):
                 await event.answer(
-                    "⏰ Слишком много запросов! Подождите немного перед следующим действием."
+                    f"⏰ Слишком много запросов! Повторите через {seconds} сек."
                 )
             elif isinstance(event, CallbackQuery):
-                await event.answer("⏰ Слишком быстро! Подождите немного", show_alert=True)
-            
+                await event.answer(f"⏰ Слишком быстро! Подождите {seconds} сек.", show_alert=True)
+
             return
-        
-        # Добавляем текущее действие
-        user_action_times.append(current_time)
-        
+
         return await handler(event, data)
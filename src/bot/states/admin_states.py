@@ -17,3 +17,4 @@ class AdminStates(StatesGroup):
     # Системные функции
     confirming_action = State()
     entering_broadcast_message = State()
+    confirming_broadcast = State()
@@ -1,7 +1,6 @@
 """Декораторы для обработчиков"""
 
 import functools
-import time
 from typing import Callable, Any, Dict
 
 import structlog
@@ -9,35 +8,35 @@ from aiogram.types import Message, CallbackQuery
 
 logger = structlog.get_logger(__name__)
 
-def rate_limit(rate: int = 1):
+def rate_limit(rate: int = 1, route: str | None = None):
     """
     Декоратор для ограничения частоты вызовов
     
     Args:
         rate: Количество секунд между вызовами
+        route: Маршрут из settings.RATE_LIMITS (вместо rate)
     """
     def decorator(func: Callable) -> Callable:
-        # Хранилище времени последних вызовов
-        last_call_times: Dict[int, float] = {}
+        from app.services.rate_limiter import rate_limiter
+        
+        limit_route = route or f"call:{func.__module__}.{func.__qualname__}"
         
         @functools.wraps(func)
         async def wrapper(update: Message | CallbackQuery, *args, **kwargs):
-            user_id = update.from_user.id
-            current_time = time.time()
-            
-            # Проверяем время последнего вызова
-            if user_id in last_call_times:
-                time_passed = current_time - last_call_times[user_id]
-                if time_passed < rate:
-                    # Слишком быстро
-                    if isinstance(update, CallbackQuery):
-                        await update.answer("⏰ Слишком быстро!", show_alert=True)
-                    else:
-                        await update.answer("⏰ Подождите немного перед следующим действием")
-                    return
+            if route:
+                retry_after = await rate_limiter.hit(update.from_user.id, limit_route)
+            else:
+                retry_after = await rate_limiter.hit(
+                    update.from_user.id, limit_route, limit=1, period=rate
+                )
             
-            # Обновляем время последнего вызова
-            last_call_times[user_id] = current_time
+            if retry_after:
+                # Слишком быстро
+                if isinstance(update, CallbackQuery):
+                    await update.answer("⏰ Слишком быстро!", show_alert=True)
+                else:
+                    await update.answer("⏰ Подождите немного перед следующим действием")
+                return
             
             # Вызываем оригинальную функцию
             return await func(update, *args, **kwargs)
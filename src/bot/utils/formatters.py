@@ -7,6 +7,12 @@ from typing import Union, List, Optional
 from app.database.models.user import User
 from app.database.models.task import Task, TaskType, TaskStatus
 from app.database.models.task_execution import TaskExecution, ExecutionStatus
+from app.bot.utils.templates import Template, render_lines
+
+REFERRAL_ROW_TEMPLATE = Template("""{index}. {level_emoji} {username!h}
+   ├ Регистрация: {date}
+   ├ Заданий: {tasks_completed}
+   └ Баланс: {balance}""")
 
 class NumberFormatter:
     """Форматтер для чисел и валют"""
@@ -352,17 +358,17 @@ class TableFormatter:
         if not referrals:
             return "📭 Список рефералов пуст"
         
-        lines = [f"👥 <b>РЕФЕРАЛЫ</b> (стр. {page}):", ""]
-        
-        for i, referral in enumerate(referrals, 1):
-            level_emoji = StatusFormatter.get_level_emoji(referral.level)
-            username = TextFormatter.format_username(referral.username, referral.telegram_id)
-            date = TimeFormatter.format_datetime(referral.created_at, show_time=False)
-            
-            lines.append(f"{i}. {level_emoji} {username}")
-            lines.append(f"   ├ Регистрация: {date}")
-            lines.append(f"   ├ Заданий: {referral.tasks_completed}")
-            lines.append(f"   └ Баланс: {NumberFormatter.format_gram(referral.balance)}")
-            lines.append("")
+        rows = (
+            {
+                "index": i,
+                "level_emoji": StatusFormatter.get_level_emoji(referral.level),
+                "username": TextFormatter.format_username(referral.username, referral.telegram_id),
+                "date": referral.created_at.strftime('%d.%m.%Y'),
+                "tasks_completed": referral.tasks_completed,
+                "balance": NumberFormatter.format_gram(referral.balance)
+            }
+            for i, referral in enumerate(referrals, 1)
+        )
         
-        return "\n".join(lines[:-1])  # Убираем последнюю пустую строку
\ No newline at end of file
+        # Карточки рефералов разделены пустой строкой
+        return f"👥 <b>РЕФЕРАЛЫ</b> (стр. {page}):\n\n" + render_lines(REFERRAL_ROW_TEMPLATE, rows, separator="\n\n")
\ No newline at end of file
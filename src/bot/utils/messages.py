@@ -7,6 +7,7 @@ from app.database.models.user import User
 from app.database.models.task import Task, TaskType
 from app.database.models.task_execution import TaskExecution
 from app.config.settings import settings
+from app.bot.utils.templates import RenderCache, Template, render_lines
 
 # ==============================================================================
 # ОСНОВНЫЕ СООБЩЕНИЯ
@@ -94,62 +95,81 @@ def get_welcome_text(user: User) -> str:
 
 Начните с команды /earn или воспользуйтесь меню ниже! 👇"""
 
-def get_main_menu_text(user: User) -> str:
-    """Текст главного меню"""
-    level_config = user.get_level_config()
-    
-    return f"""🏠 <b>ГЛАВНОЕ МЕНЮ</b>
+MAIN_MENU_TEMPLATE = Template("""🏠 <b>ГЛАВНОЕ МЕНЮ</b>
 
-Баланс: <b>{user.balance:,.0f} GRAM</b> 💰
-Уровень: <b>{level_config['name']}</b> {level_config['emoji']}
+Баланс: <b>{balance:,.0f} GRAM</b> 💰
+Уровень: <b>{level_name}</b> {level_emoji}
 
-Выберите действие:"""
+Выберите действие:""")
 
-def get_profile_text(user: User) -> str:
-    """Текст профиля пользователя"""
+def get_main_menu_text(user: User) -> str:
+    """Текст главного меню"""
     level_config = user.get_level_config()
     
-    # Рассчитываем прогресс до следующего уровня
-    current_threshold = level_config.get('min_balance', Decimal('0'))
-    
-    # Определяем следующий уровень
-    next_level_info = ""
-    if user.level == "bronze":
-        next_threshold = settings.LEVEL_THRESHOLDS["silver"]
-        next_level_info = f"До Silver: {next_threshold - user.balance:,.0f} GRAM"
-    elif user.level == "silver":
-        next_threshold = settings.LEVEL_THRESHOLDS["gold"]
-        next_level_info = f"До Gold: {next_threshold - user.balance:,.0f} GRAM"
-    elif user.level == "gold":
-        next_threshold = settings.LEVEL_THRESHOLDS["premium"]
-        next_level_info = f"До Premium: {next_threshold - user.balance:,.0f} GRAM"
-    else:
-        next_level_info = "Максимальный уровень!"
-    
-    registration_date = user.created_at.strftime('%d.%m.%Y')
-    account_age = (datetime.utcnow() - user.created_at).days
-    
-    return f"""👤 <b>МОЙ КАБИНЕТ</b>
+    return MAIN_MENU_TEMPLATE.render(
+        balance=user.balance,
+        level_name=level_config['name'],
+        level_emoji=level_config['emoji']
+    )
+
+# Следующий уровень: ключ порога и название
+NEXT_LEVELS = {
+    "bronze": ("silver", "Silver"),
+    "silver": ("gold", "Gold"),
+    "gold": ("premium", "Premium")
+}
+
+PROFILE_TEMPLATE = Template("""👤 <b>МОЙ КАБИНЕТ</b>
 
-🆔 ID: <code>{user.telegram_id}</code>
-👨‍💼 @{user.username or 'не указан'}
-📊 Уровень: <b>{level_config['name']}</b>
+🆔 ID: <code>{telegram_id}</code>
+👨‍💼 @{username!h}
+📊 Уровень: <b>{level_name}</b>
 
 💰 <b>БАЛАНС:</b>
-├ Доступно: <b>{user.available_balance:,.0f} GRAM</b>
-├ Заморожено: {user.frozen_balance:,.0f} GRAM
+├ Доступно: <b>{available_balance:,.0f} GRAM</b>
+├ Заморожено: {frozen_balance:,.0f} GRAM
 └ {next_level_info}
 
 📈 <b>СТАТИСТИКА:</b>
-├ Выполнено заданий: {user.tasks_completed}
-├ Создано заданий: {user.tasks_created}  
-├ Рефералов: {user.total_referrals} ({user.premium_referrals} Premium)
-└ Заработано всего: {user.total_earned:,.0f} GRAM
+├ Выполнено заданий: {tasks_completed}
+├ Создано заданий: {tasks_created}  
+├ Рефералов: {total_referrals} ({premium_referrals} Premium)
+└ Заработано всего: {total_earned:,.0f} GRAM
 
 📅 <b>АККАУНТ:</b>
 ├ Регистрация: {registration_date}
 ├ Возраст: {account_age} дн.
-└ Последняя активность: {user.last_activity.strftime('%d.%m %H:%M') if user.last_activity else 'давно'}"""
+└ Последняя активность: {last_activity}""")
+
+def get_profile_text(user: User) -> str:
+    """Текст профиля пользователя"""
+    level_config = user.get_level_config()
+    
+    # Прогресс до следующего уровня
+    next_level = NEXT_LEVELS.get(user.level)
+    if next_level:
+        threshold_key, level_name = next_level
+        next_threshold = settings.LEVEL_THRESHOLDS[threshold_key]
+        next_level_info = f"До {level_name}: {next_threshold - user.balance:,.0f} GRAM"
+    else:
+        next_level_info = "Максимальный уровень!"
+    
+    return PROFILE_TEMPLATE.render(
+        telegram_id=user.telegram_id,
+        username=user.username or 'не указан',
+        level_name=level_config['name'],
+        available_balance=user.available_balance,
+        frozen_balance=user.frozen_balance,
+        next_level_info=next_level_info,
+        tasks_completed=user.tasks_completed,
+        tasks_created=user.tasks_created,
+        total_referrals=user.total_referrals,
+        premium_referrals=user.premium_referrals,
+        total_earned=user.total_earned,
+        registration_date=user.created_at.strftime('%d.%m.%Y'),
+        account_age=(datetime.utcnow() - user.created_at).days,
+        last_activity=user.last_activity.strftime('%d.%m %H:%M') if user.last_activity else 'давно'
+    )
 
 def get_balance_details_text(user: User) -> str:
     """Подробная информация о балансе"""
@@ -176,30 +196,82 @@ def get_balance_details_text(user: User) -> str:
 
 💡 <i>Повышайте уровень для лучших условий!</i>"""
 
-def get_task_text(task: Task, user: User | None = None) -> str:
-    """Текст задания"""
-    # Иконки типов заданий
-    type_icons = {
-        TaskType.CHANNEL_SUBSCRIPTION: "📺",
-        TaskType.GROUP_JOIN: "👥",
-        TaskType.POST_VIEW: "👀",
-        TaskType.POST_REACTION: "👍",
-        TaskType.BOT_INTERACTION: "🤖",
-        TaskType.CUSTOM: "⚙️"
-    }
+# Иконки типов заданий
+TASK_TYPE_ICONS = {
+    TaskType.CHANNEL_SUBSCRIPTION: "📺",
+    TaskType.GROUP_JOIN: "👥",
+    TaskType.POST_VIEW: "👀",
+    TaskType.POST_REACTION: "👍",
+    TaskType.BOT_INTERACTION: "🤖",
+    TaskType.CUSTOM: "⚙️"
+}
+
+# Названия типов
+TASK_TYPE_NAMES = {
+    TaskType.CHANNEL_SUBSCRIPTION: "Подписка на канал",
+    TaskType.GROUP_JOIN: "Вступление в группу",
+    TaskType.POST_VIEW: "Просмотр поста",
+    TaskType.POST_REACTION: "Реакция на пост",
+    TaskType.BOT_INTERACTION: "Взаимодействие с ботом",
+    TaskType.CUSTOM: "Пользовательское задание"
+}
+
+LEVEL_NAMES = {
+    "bronze": "🥉 Bronze",
+    "silver": "🥈 Silver", 
+    "gold": "🥇 Gold",
+    "premium": "💎 Premium"
+}
+
+# Неизменяемые части карточки: заголовок и описание со ссылкой
+TASK_CARD_HEAD_TEMPLATE = Template("""{icon} <b>{title!h}</b>
+
+📝 <b>Тип:</b> {type_name}""")
+
+TASK_CARD_TAIL_TEMPLATE = Template("""📄 <b>ОПИСАНИЕ:</b>
+{description!h}
+
+🔗 <b>Ссылка:</b> {target_url!h}{requirements_text}""")
+
+# Части, зависящие от пользователя и времени
+TASK_CARD_TEMPLATE = Template("""{head}
+💰 <b>Награда:</b> {final_reward:,.0f} GRAM
+👥 <b>Выполнено:</b> {completed_executions}/{target_executions}
+{time_info}
+
+{tail}""")
+
+task_card_cache = RenderCache("task_card", settings.TASK_CARD_CACHE_SIZE)
+
+def _render_task_card_parts(task: Task) -> tuple[str, str]:
+    """Заголовок и описание карточки: экранируются один раз на версию задания"""
+    requirements = []
+    if task.min_user_level:
+        req_level = LEVEL_NAMES.get(task.min_user_level, task.min_user_level)
+        requirements.append(f"Минимальный уровень: {req_level}")
     
-    # Названия типов
-    type_names = {
-        TaskType.CHANNEL_SUBSCRIPTION: "Подписка на канал",
-        TaskType.GROUP_JOIN: "Вступление в группу",
-        TaskType.POST_VIEW: "Просмотр поста",
-        TaskType.POST_REACTION: "Реакция на пост",
-        TaskType.BOT_INTERACTION: "Взаимодействие с ботом",
-        TaskType.CUSTOM: "Пользовательское задание"
-    }
+    requirements_text = ""
+    if requirements:
+        requirements_text = "\n\n📋 <b>ТРЕБОВАНИЯ:</b>\n" + "\n".join(f"• {req}" for req in requirements)
     
-    icon = type_icons.get(task.type, "🎯")
-    type_name = type_names.get(task.type, "Неизвестный тип")
+    head = TASK_CARD_HEAD_TEMPLATE.render(
+        icon=TASK_TYPE_ICONS.get(task.type, "🎯"),
+        title=task.title,
+        type_name=TASK_TYPE_NAMES.get(task.type, "Неизвестный тип")
+    )
+    tail = TASK_CARD_TAIL_TEMPLATE.render(
+        description=task.description or "",
+        target_url=task.target_url,
+        requirements_text=requirements_text
+    )
+    return head, tail
+
+def get_task_text(task: Task, user: User | None = None) -> str:
+    """Текст задания"""
+    # Версия задания - время последнего изменения: правка задания дает новую карточку
+    head, tail = task_card_cache.get_or_render(
+        task.id, task.updated_at, lambda: _render_task_card_parts(task)
+    )
     
     # Рассчитываем награду с учетом множителя пользователя
     final_reward = task.reward_amount
@@ -218,67 +290,61 @@ def get_task_text(task: Task, user: User | None = None) -> str:
         else:
             time_info = "⏰ Задание истекло"
     
-    # Требования
-    requirements = []
-    if task.min_user_level:
-        level_names = {
-            "bronze": "🥉 Bronze",
-            "silver": "🥈 Silver", 
-            "gold": "🥇 Gold",
-            "premium": "💎 Premium"
-        }
-        req_level = level_names.get(task.min_user_level, task.min_user_level)
-        requirements.append(f"Минимальный уровень: {req_level}")
-    
-    requirements_text = ""
-    if requirements:
-        requirements_text = "\n\n📋 <b>ТРЕБОВАНИЯ:</b>\n" + "\n".join(f"• {req}" for req in requirements)
-    
-    return f"""{icon} <b>{task.title}</b>
-
-📝 <b>Тип:</b> {type_name}
-💰 <b>Награда:</b> {final_reward:,.0f} GRAM
-👥 <b>Выполнено:</b> {task.completed_executions}/{task.target_executions}
-{time_info}
-
-📄 <b>ОПИСАНИЕ:</b>
-{task.description}
+    return TASK_CARD_TEMPLATE.render(
+        head=head,
+        final_reward=final_reward,
+        completed_executions=task.completed_executions,
+        target_executions=task.target_executions,
+        time_info=time_info,
+        tail=tail
+    )
+
+# Названия типов для заголовка списка
+TASK_LIST_TITLES = {
+    "all": "🎯 ВСЕ ЗАДАНИЯ",
+    "channel_subscription": "📺 ПОДПИСКА НА КАНАЛЫ",
+    "group_join": "👥 ВСТУПЛЕНИЕ В ГРУППЫ",
+    "post_view": "👀 ПРОСМОТР ПОСТОВ",
+    "post_reaction": "👍 РЕАКЦИИ НА ПОСТЫ",
+    "bot_interaction": "🤖 ПЕРЕХОД В БОТОВ"
+}
 
-🔗 <b>Ссылка:</b> {task.target_url}{requirements_text}"""
-
-def get_task_list_text(tasks: list[Task], task_type: str = "all", page: int = 1) -> str:
-    """Текст списка заданий"""
-    # Названия типов для заголовка
-    type_titles = {
-        "all": "🎯 ВСЕ ЗАДАНИЯ",
-        "channel_subscription": "📺 ПОДПИСКА НА КАНАЛЫ",
-        "group_join": "👥 ВСТУПЛЕНИЕ В ГРУППЫ",
-        "post_view": "👀 ПРОСМОТР ПОСТОВ",
-        "post_reaction": "👍 РЕАКЦИИ НА ПОСТЫ",
-        "bot_interaction": "🤖 ПЕРЕХОД В БОТОВ"
-    }
-    
-    title = type_titles.get(task_type, "🎯 ЗАДАНИЯ")
-    
-    if not tasks:
-        return f"""{title}
+TASK_LIST_EMPTY_TEMPLATE = Template("""{title}
 
 ❌ <b>Заданий не найдено</b>
 
 Попробуйте:
 • Выбрать другой тип заданий
 • Обновить список
-• Проверить позже"""
-    
-    total_reward = sum(task.reward_amount for task in tasks)
-    
-    return f"""{title}
+• Проверить позже""")
+
+TASK_LIST_TEMPLATE = Template("""{title}
 
-📊 Найдено: <b>{len(tasks)} заданий</b>
+📊 Найдено: <b>{count} заданий</b>
 💰 Общая награда: <b>{total_reward:,.0f} GRAM</b>
 📄 Страница: {page}
 
-Выберите задание для выполнения:"""
+Выберите задание для выполнения:""")
+
+# Пустой список не зависит от данных - готовые тексты для каждого типа
+TASK_LIST_EMPTY_TEXTS = {
+    task_type: TASK_LIST_EMPTY_TEMPLATE.render(title=title)
+    for task_type, title in TASK_LIST_TITLES.items()
+}
+
+def get_task_list_text(tasks: list[Task], task_type: str = "all", page: int = 1) -> str:
+    """Текст списка заданий"""
+    title = TASK_LIST_TITLES.get(task_type, "🎯 ЗАДАНИЯ")
+    
+    if not tasks:
+        return TASK_LIST_EMPTY_TEXTS.get(task_type) or TASK_LIST_EMPTY_TEMPLATE.render(title=title)
+    
+    return TASK_LIST_TEMPLATE.render(
+        title=title,
+        count=len(tasks),
+        total_reward=sum(task.reward_amount for task in tasks),
+        page=page
+    )
 
 def get_task_execution_text(task: Task, user: User) -> str:
     """Текст выполнения задания"""
@@ -449,6 +515,8 @@ def get_task_analytics_text(analytics: dict) -> str:
 
 📋 <b>СТАТИСТИКА ВЫПОЛНЕНИЙ:</b>"""
 
+EXECUTION_STAT_TEMPLATE = Template("├ {name}: {count}")
+
 def format_task_execution_stats(executions_by_status: dict) -> str:
     """Форматирование статистики выполнений"""
     status_names = {
@@ -458,34 +526,48 @@ def format_task_execution_stats(executions_by_status: dict) -> str:
         "expired": "⏰ Истекшие"
     }
     
-    lines = []
-    for status, count in executions_by_status.items():
-        name = status_names.get(status, status)
-        lines.append(f"├ {name}: {count}")
-    
-    return "\n".join(lines)
+    return render_lines(
+        EXECUTION_STAT_TEMPLATE,
+        ({"name": status_names.get(status, status), "count": count} for status, count in executions_by_status.items())
+    )
 
-def get_admin_stats_text(stats: dict) -> str:
-    """Текст админской статистики"""
-    return f"""📊 <b>СТАТИСТИКА СИСТЕМЫ</b>
+ADMIN_STATS_TEMPLATE = Template("""📊 <b>СТАТИСТИКА СИСТЕМЫ</b>
 
 🎯 <b>ЗАДАНИЯ:</b>
-├ Активных: {stats['tasks']['by_status'].get('active', {}).get('count', 0)}
-├ Завершенных: {stats['tasks']['by_status'].get('completed', {}).get('count', 0)}
-├ Приостановленных: {stats['tasks']['by_status'].get('paused', {}).get('count', 0)}
-└ Общий бюджет: {stats['tasks']['total_budget']:,.0f} GRAM
+├ Активных: {tasks_active}
+├ Завершенных: {tasks_completed}
+├ Приостановленных: {tasks_paused}
+└ Общий бюджет: {total_budget:,.0f} GRAM
 
 💼 <b>ВЫПОЛНЕНИЯ:</b>
-├ Ожидают проверки: {stats['executions']['by_status'].get('pending', {}).get('count', 0)}
-├ Завершенных: {stats['executions']['by_status'].get('completed', {}).get('count', 0)}
-├ Отклоненных: {stats['executions']['by_status'].get('rejected', {}).get('count', 0)}
-└ Общие награды: {stats['executions']['total_rewards']:,.0f} GRAM
+├ Ожидают проверки: {executions_pending}
+├ Завершенных: {executions_completed}
+├ Отклоненных: {executions_rejected}
+└ Общие награды: {total_rewards:,.0f} GRAM
 
 📈 <b>ЗА 24 ЧАСА:</b>
-├ Новых заданий: {stats['recent_24h']['new_tasks']}
-└ Новых выполнений: {stats['recent_24h']['new_executions']}
+├ Новых заданий: {new_tasks}
+└ Новых выполнений: {new_executions}
 
-⚡ <i>Данные обновляются в реальном времени</i>"""
+⚡ <i>Данные обновляются в реальном времени</i>""")
+
+def get_admin_stats_text(stats: dict) -> str:
+    """Текст админской статистики"""
+    tasks_by_status = stats['tasks']['by_status']
+    executions_by_status = stats['executions']['by_status']
+    
+    return ADMIN_STATS_TEMPLATE.render(
+        tasks_active=tasks_by_status.get('active', {}).get('count', 0),
+        tasks_completed=tasks_by_status.get('completed', {}).get('count', 0),
+        tasks_paused=tasks_by_status.get('paused', {}).get('count', 0),
+        total_budget=stats['tasks']['total_budget'],
+        executions_pending=executions_by_status.get('pending', {}).get('count', 0),
+        executions_completed=executions_by_status.get('completed', {}).get('count', 0),
+        executions_rejected=executions_by_status.get('rejected', {}).get('count', 0),
+        total_rewards=stats['executions']['total_rewards'],
+        new_tasks=stats['recent_24h']['new_tasks'],
+        new_executions=stats['recent_24h']['new_executions']
+    )
 
 def get_error_message(error_key: str, **kwargs) -> str:
     """Получить сообщение об ошибке"""
@@ -588,15 +670,7 @@ def get_level_emoji(level: str) -> str:
 
 def get_task_type_emoji(task_type: TaskType) -> str:
     """Получить эмодзи типа задания"""
-    emojis = {
-        TaskType.CHANNEL_SUBSCRIPTION: "📺",
-        TaskType.GROUP_JOIN: "👥",
-        TaskType.POST_VIEW: "👀",
-        TaskType.POST_REACTION: "👍",
-        TaskType.BOT_INTERACTION: "🤖",
-        TaskType.CUSTOM: "⚙️"
-    }
-    return emojis.get(task_type, "🎯")
+    return TASK_TYPE_ICONS.get(task_type, "🎯")
 
 def get_status_emoji(status: str) -> str:
     """Получить эмодзи статуса"""
@@ -621,10 +695,10 @@ def validate_url(url: str) -> bool:
     
     # Паттерны для Telegram ссылок
     patterns = [
-        r'^https://t\.me/[a-zA-Z0-9_]+/?,  # Канал/группа
-        r'^https://t\.me/[a-zA-Z0-9_]+/\d+/?,  # Пост
-        r'^@[a-zA-Z0-9_]+,  # Username
-        r'^https://t\.me/\+[a-zA-Z0-9_-]+/?  # Приватная ссылка
+        r'^https://t\.me/[a-zA-Z0-9_]+/?$',  # Канал/группа
+        r'^https://t\.me/[a-zA-Z0-9_]+/\d+/?$',  # Пост
+        r'^@[a-zA-Z0-9_]+$',  # Username
+        r'^https://t\.me/\+[a-zA-Z0-9_-]+/?$'  # Приватная ссылка
     ]
     
     return any(re.match(pattern, url) for pattern in patterns)
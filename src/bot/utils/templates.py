@@ -0,0 +1,113 @@
+"""
+Предкомпилированные шаблоны сообщений.
+
+Шаблон разбирается один раз при импорте модуля: статические фрагменты
+склеиваются заранее, поля проверяются, а поля с пометкой !h экранируются
+при подстановке. Неизменяемые части сообщений (карточки заданий)
+кэшируются по ключу и версии объекта.
+"""
+
+from __future__ import annotations
+
+import html
+import string
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Mapping
+
+from app.services.metrics import observe_cache
+
+_FORMATTER = string.Formatter()
+
+def escape_html(text: Any) -> str:
+    """Экранирование HTML (те же замены, что и в messages.escape_html)"""
+    return html.escape(str(text), quote=True)
+
+class Template:
+    """
+    Шаблон сообщения.
+
+    Поля: {name} и {name:формат} - как в str.format, {name!h} - значение
+    экранируется. Вложенные поля и индексы не поддерживаются
+    """
+
+    __slots__ = ("source", "fields", "_escaped", "_format")
+
+    def __init__(self, source: str):
+        chunks = []
+        fields = []
+        escaped = []
+
+        for literal, field, spec, conversion in _FORMATTER.parse(source):
+            chunks.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+
+            if not field.isidentifier():
+                raise ValueError(f"Template field must be a plain name: {field!r}")
+            if conversion not in (None, "h"):
+                raise ValueError(f"Unsupported conversion !{conversion} for field {field!r}")
+            if spec and "{" in spec:
+                raise ValueError(f"Nested format spec for field {field!r}")
+
+            fields.append(field)
+            if conversion == "h":
+                escaped.append(field)
+            chunks.append("{" + field + (":" + spec if spec else "") + "}")
+
+        self.source = source
+        self.fields = tuple(dict.fromkeys(fields))
+        self._escaped = tuple(dict.fromkeys(escaped))
+        # Шаблон без пользовательских пометок: подстановку выполняет str.format_map
+        self._format = "".join(chunks).format_map
+
+    def render(self, **values: Any) -> str:
+        for name in self._escaped:
+            values[name] = escape_html(values[name])
+        return self._format(values)
+
+    def render_map(self, values: Mapping[str, Any]) -> str:
+        """Подстановка из готового словаря (строки таблиц, данные сервисов)"""
+        if self._escaped:
+            values = dict(values)
+            for name in self._escaped:
+                values[name] = escape_html(values[name])
+        return self._format(values)
+
+def render_lines(template: Template, rows: Iterable[Mapping[str, Any]], separator: str = "\n") -> str:
+    """Список строк по одному шаблону, собранный одним join"""
+    render = template.render_map
+    return separator.join([render(row) for row in rows])
+
+class RenderCache:
+    """
+    LRU готовых фрагментов.
+
+    Запись действительна, пока совпадает версия объекта: изменение
+    данных дает новую версию, и фрагмент перерисовывается
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self._items: OrderedDict[Hashable, tuple[Hashable, Any]] = OrderedDict()
+
+    def get_or_render(self, key: Hashable, version: Hashable, render: Callable[[], Any]) -> Any:
+        entry = self._items.get(key)
+        if entry is not None and entry[0] == version:
+            self._items.move_to_end(key)
+            observe_cache(self.name, hit=True)
+            return entry[1]
+
+        observe_cache(self.name, hit=False)
+        value = render()
+        self._items[key] = (version, value)
+        self._items.move_to_end(key)
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
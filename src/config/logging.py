@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, TextIO
+
+import structlog
+
+from app.config.settings import settings
+
+# Уровни, которые никогда не сэмплируются
+_ALWAYS_KEEP = {"warning", "error", "critical", "exception"}
+_ERROR_LEVELS = {"error", "critical", "exception"}
+
+class LogWriter:
+    """
+    Фоновая запись логов.
+    Event loop только кладет готовую строку в очередь, запись в поток
+    вывода выполняет отдельный поток пачками. При переполнении очереди
+    строки отбрасываются, количество потерь выводится отдельной записью
+    """
+
+    def __init__(self, stream: TextIO | None = None, maxsize: int | None = None):
+        self.stream = stream or sys.stdout
+        self._queue: queue.Queue[str | None] = queue.Queue(maxsize=maxsize or settings.LOG_QUEUE_SIZE)
+        self._dropped = 0
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Дописать очередь и остановить поток"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def put(self, line: str) -> None:
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self._dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            line = self._queue.get()
+            batch = [line]
+
+            # Забираем все, что накопилось, и пишем одним вызовом
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            lines = [item for item in batch if item is not None]
+
+            if self._dropped:
+                dropped, self._dropped = self._dropped, 0
+                lines.append(f'{{"event": "log queue overflow", "level": "warning", "dropped": {dropped}}}')
+
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    pass
+
+            if stop:
+                return
+
+class QueueLogger:
+    """Логгер structlog, отдающий отрендеренную строку в LogWriter"""
+
+    def __init__(self, writer: LogWriter):
+        self._writer = writer
+
+    def msg(self, message: str) -> None:
+        self._writer.put(message)
+
+    log = debug = info = warn = warning = msg
+    fatal = failure = err = error = critical = exception = msg
+
+class QueueLoggerFactory:
+    def __init__(self, writer: LogWriter):
+        self._writer = writer
+
+    def __call__(self, *args: Any) -> QueueLogger:
+        return QueueLogger(self._writer)
+
+class _QueueHandler(logging.Handler):
+    """Обработчик stdlib logging (aiogram, SQLAlchemy) поверх той же очереди"""
+
+    def __init__(self, writer: LogWriter):
+        super().__init__()
+        self._writer = writer
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._writer.put(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+class SamplingProcessor:
+    """Пропускает заданную долю событий info и ниже по имени события"""
+
+    def __init__(self, rates: Dict[str, float]):
+        self.rates = rates
+
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if method_name in _ALWAYS_KEEP:
+            return event_dict
+
+        rate = self.rates.get(event_dict.get("event"))
+        if rate is not None and random.random() >= rate:
+            raise structlog.DropEvent
+        return event_dict
+
+class ErrorRateLimiter:
+    """
+    Ограничивает число одинаковых ошибок в минуту.
+    Подавленные повторы учитываются в поле suppressed следующей записи
+    """
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        # event -> [начало окна, записано, подавлено]
+        self._windows: Dict[str, list] = {}
+
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if method_name not in _ERROR_LEVELS:
+            return event_dict
+
+        now = time.monotonic()
+        key = str(event_dict.get("event"))
+        window = self._windows.get(key)
+
+        if window is None or now - window[0] >= 60:
+            if len(self._windows) > 10000:
+                self._windows.clear()
+            suppressed = window[2] if window else 0
+            self._windows[key] = [now, 1, 0]
+            if suppressed:
+                event_dict["suppressed"] = suppressed
+            return event_dict
+
+        if window[1] >= self.per_minute:
+            window[2] += 1
+            raise structlog.DropEvent
+
+        window[1] += 1
+        return event_dict
+
+_writer: LogWriter | None = None
+
+def setup_logging() -> None:
+    """Настройка structlog и stdlib logging с неблокирующей записью"""
+    global _writer
+    if _writer is not None:
+        return
+
+    _writer = LogWriter()
+    _writer.start()
+    atexit.register(shutdown_logging)
+
+    level = logging.DEBUG if settings.DEBUG else getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
+
+    handler = _QueueHandler(_writer)
+    handler.setFormatter(logging.Formatter(settings.LOG_FORMAT))
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+    structlog.configure(
+        processors=[
+            # Сначала отбрасываем лишнее, чтобы не тратить время на форматирование
+            SamplingProcessor(settings.LOG_SAMPLING),
+            ErrorRateLimiter(settings.LOG_ERROR_RATE_LIMIT),
+            structlog.contextvars.merge_contextvars,
+            structlog.processors.add_log_level,
+            structlog.processors.StackInfoRenderer(),
+            structlog.dev.set_exc_info,
+            structlog.processors.TimeStamper(fmt="ISO"),
+            *(
+                [structlog.dev.ConsoleRenderer()] if settings.DEBUG
+                else [structlog.processors.format_exc_info, structlog.processors.JSONRenderer()]
+            ),
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        logger_factory=QueueLoggerFactory(_writer),
+        cache_logger_on_first_use=True,
+    )
+
+def shutdown_logging() -> None:
+    """Дописать накопленные логи"""
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
@@ -34,6 +34,34 @@ class Settings(BaseSettings):
     WEBHOOK_URL: str | None = Field(default=None, description="URL для webhook")
     WEBHOOK_SECRET: str | None = Field(default=None, description="Секрет для webhook")
     
+    # Webhook сервер (несколько процессов на одном порту через SO_REUSEPORT)
+    WEBHOOK_HOST: str = Field(default="0.0.0.0", description="Адрес webhook сервера")
+    WEBHOOK_PORT: int = Field(default=8000, description="Порт webhook сервера")
+    WEBHOOK_WORKERS: int = Field(default=1, description="Число процессов webhook сервера")
+    WEBHOOK_MAX_CONNECTIONS: int = Field(default=100, description="Максимум одновременных соединений от Telegram")
+    WEBHOOK_SHUTDOWN_TIMEOUT: float = Field(default=30.0, description="Время на завершение обработки при остановке (сек)")
+    USE_UVLOOP: bool = Field(default=True, description="Использовать uvloop, если установлен")
+    
+    # Очередь обновлений: webhook только подтверждает получение, обработка из Redis Stream
+    UPDATE_QUEUE_ENABLED: bool = Field(default=False, description="Принимать обновления в очередь Redis")
+    UPDATE_CONSUMER_ENABLED: bool = Field(default=True, description="Обрабатывать очередь обновлений в процессах webhook")
+    UPDATE_QUEUE_PARTITIONS: int = Field(default=32, description="Число разделов очереди (порядок сохраняется внутри раздела)")
+    UPDATE_QUEUE_MAX_BACKLOG: int = Field(default=10000, description="Максимум необработанных обновлений в разделе")
+    UPDATE_QUEUE_LEASE_TTL: int = Field(default=15, description="Время аренды раздела обработчиком (сек)")
+    UPDATE_QUEUE_BATCH_SIZE: int = Field(default=50, description="Размер пакета чтения из раздела")
+    UPDATE_QUEUE_CLAIM_IDLE: int = Field(default=60, description="Неподтвержденное обновление забирается другим обработчиком через (сек), больше худшего времени обработки")
+    
+    # Идемпотентность: повторные доставки отбрасываются, поэтому накопленные
+    # за время перезапуска обновления можно не сбрасывать, а обработать
+    DROP_PENDING_UPDATES: bool = Field(default=False, description="Сбрасывать накопленные обновления при запуске")
+    DEDUPE_TTL: int = Field(default=86400, description="Сколько помнить обработанные обновления и платежи (сек)")
+    DEDUPE_PROCESSING_TTL: int = Field(default=300, description="Метка обработки: после падения повтор разрешается через (сек)")
+    
+    # Быстрый запуск
+    LAZY_ROUTERS: bool = Field(default=True, description="Импортировать редкие разделы (админка, платежи, настройки) при первом обращении")
+    BOT_INFO_CACHE_TTL: int = Field(default=86400, description="Время кэширования getMe (сек)")
+    USER_BAN_CACHE_TTL: int = Field(default=300, description="Время кэширования флага бана для обработчиков без загрузки пользователя (сек)")
+    
     # ==================== БАЗА ДАННЫХ ====================
     
     # PostgreSQL настройки
@@ -49,6 +77,11 @@ class Settings(BaseSettings):
     DB_ECHO: bool = Field(default=False, description="Логирование SQL запросов")
     USE_PGBOUNCER: bool = Field(default=False, description="Использование PgBouncer")
     
+    # Схема при запуске: create_all - создать таблицы, check - сверить ревизию Alembic,
+    # skip - ничего не делать; auto - check в production, create_all в остальных окружениях
+    DB_SCHEMA_MODE: str = Field(default="auto", description="Работа со схемой БД при запуске")
+    ALEMBIC_CONFIG: str = Field(default="alembic.ini", description="Путь к alembic.ini")
+    
     @computed_field
     @property
     def DATABASE_URL(self) -> str:
@@ -196,6 +229,15 @@ class Settings(BaseSettings):
     
     # Лимиты для защиты от ботов
     MAX_ACTIONS_PER_MINUTE: int = Field(default=30, description="Максимум действий в минуту")
+    RATE_LIMITS: dict[str, dict[str, int]] = Field(
+        default={
+            "money": {"limit": 5, "period": 60},
+            "checks": {"limit": 10, "period": 60}
+        },
+        description="Лимиты запросов по маршрутам (остальные - MAX_ACTIONS_PER_MINUTE)"
+    )
+    RATE_LIMIT_BACKEND: str = Field(default="redis", description="Хранилище лимитов: redis или memory")
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = Field(default=100000, description="Максимум ключей в локальном лимитере")
     MAX_TASKS_PER_HOUR: int = Field(default=10, description="Максимум заданий в час")
     SUSPICIOUS_ACTIVITY_THRESHOLD: int = Field(default=50, description="Порог подозрительной активности")
     
@@ -203,12 +245,52 @@ class Settings(BaseSettings):
     SPAM_BLOCK_DURATION: int = Field(default=3600, description="Время блокировки за спам (1 час)")
     FRAUD_BLOCK_DURATION: int = Field(default=86400, description="Время блокировки за фрод (24 часа)")
     
+    # Поведенческий скоринг
+    ANTIFRAUD_ENABLED: bool = Field(default=True, description="Включить антифрод")
+    ANTIFRAUD_SCORE_TTL: int = Field(default=3600, description="Время жизни накопленного счета (сек)")
+    MAX_CHECK_ACTIVATIONS_PER_MINUTE: int = Field(default=5, description="Максимум активаций чеков в минуту")
+    MAX_REFERRALS_PER_HOUR: int = Field(default=30, description="Максимум регистраций рефералов в час")
+    FAST_CLICK_INTERVAL_MS: int = Field(default=150, description="Нажатия кнопок чаще этого интервала подозрительны (мс)")
+    ANTIFRAUD_PATTERN_USERS: int = Field(default=10, description="Порог аккаунтов с одинаковым шаблоном нажатий в минуту")
+    
     # ==================== СИСТЕМА ЧЕКОВ ====================
     
     # Время жизни чеков (в секундах)
     CHECK_EXPIRY_TIME: int = Field(default=2592000, description="Время жизни чека (30 дней)")
     MAX_CHECK_ACTIVATIONS: int = Field(default=1000, description="Максимум активаций мульти-чека")
     
+    # Движок активаций: допуск через счетчик в Redis, запись в БД пачками
+    CHECK_BATCH_SIZE: int = Field(default=200, description="Максимум активаций в одной транзакции БД")
+    CHECK_BATCH_INTERVAL_MS: int = Field(default=50, description="Ожидание накопления пачки активаций (мс)")
+    CHECK_META_TTL: int = Field(default=60, description="Время кэширования параметров чека в Redis (сек)")
+    CHECK_RECONCILE_INTERVAL: int = Field(default=60, description="Период сверки счетчиков Redis с БД (сек)")
+    
+    # Реестр кодов чеков: фильтр Блума в Redis и локальный LRU
+    CHECK_BLOOM_CAPACITY: int = Field(default=1_000_000, description="Расчетное число кодов в фильтре Блума")
+    CHECK_BLOOM_ERROR_RATE: float = Field(default=0.001, description="Доля ложных срабатываний фильтра Блума")
+    CHECK_CODE_CACHE_SIZE: int = Field(default=10000, description="Размер локального кэша чеков по коду")
+    CHECK_CODE_CACHE_TTL: int = Field(default=30, description="Время жизни записи локального кэша чеков (сек)")
+    CHECK_CODE_VERIFY_TAG: bool = Field(default=False, description="Отклонять коды без верной подписи (включить, когда истекут чеки со старыми кодами)")
+    
+    # Inline-режим: карточки активных чеков создателя
+    CHECK_INLINE_CACHE_TTL: int = Field(default=600, description="Время жизни кэша карточек чеков создателя в Redis (сек)")
+    CHECK_INLINE_CACHE_TIME: int = Field(default=30, description="cache_time ответа на inline-запрос (сек)")
+    CHECK_INLINE_MAX_RESULTS: int = Field(default=20, description="Максимум карточек в ответе на inline-запрос")
+    
+    # ==================== ОБЯЗАТЕЛЬНАЯ ПОДПИСКА ====================
+    
+    # Проверка участников при вступлении в группу
+    TELEGRAM_API_CONCURRENCY: int = Field(default=20, description="Общий лимит одновременных запросов к Telegram API")
+    TELEGRAM_API_RATE_LIMIT: int = Field(default=25, description="Бюджет запросов проверок к Telegram API в секунду на всех репликах")
+    JOIN_BATCH_WINDOW: float = Field(default=0.05, description="Окно объединения вступлений в один чат (сек)")
+    SUBSCRIPTION_CACHE_TTL: int = Field(default=60, description="Время кэширования подтвержденной подписки (сек)")
+    SUBSCRIPTION_CACHE_SIZE: int = Field(default=50000, description="Максимум записей в кэше подписок")
+    
+    # Массовый аудит подписок
+    AUDIT_WORKERS: int = Field(default=5, description="Число воркеров аудита подписок")
+    AUDIT_REQUEST_INTERVAL: float = Field(default=0.1, description="Пауза воркера между запросами (сек)")
+    AUDIT_CHECKPOINT_EVERY: int = Field(default=500, description="Сохранять прогресс аудита каждые N проверок")
+    
     # ==================== ЗАДАНИЯ ====================
     
     # Время на выполнение заданий (в секундах)
@@ -218,11 +300,17 @@ class Settings(BaseSettings):
     # Время ожидания между одинаковыми заданиями (в секундах)
     SAME_TASK_COOLDOWN: int = Field(default=300, description="Кулдаун между одинаковыми заданиями (5 мин)")
     
+    # Кэш отрисованных карточек заданий (по id и версии задания)
+    TASK_CARD_CACHE_SIZE: int = Field(default=5000, description="Размер кэша карточек заданий")
+    
     # ==================== УВЕДОМЛЕНИЯ ====================
     
     # Настройки уведомлений
     NOTIFICATION_RATE_LIMIT: int = Field(default=10, description="Лимит уведомлений в минуту")
     BATCH_NOTIFICATION_SIZE: int = Field(default=100, description="Размер пакета уведомлений")
+    NOTIFICATION_GLOBAL_RATE: int = Field(default=30, description="Глобальный лимит отправки (сообщений в секунду)")
+    NOTIFICATION_SENDERS: int = Field(default=10, description="Число параллельных отправителей")
+    NOTIFICATION_SENDER_ENABLED: bool = Field(default=True, description="Запускать отправку очереди в этом процессе")
     
     # ==================== ЛОГИРОВАНИЕ ====================
     
@@ -233,6 +321,17 @@ class Settings(BaseSettings):
     )
     SLOW_QUERY_THRESHOLD: float = Field(default=0.5, description="Порог медленных запросов (сек)")
     
+    # Неблокирующий вывод логов
+    LOG_QUEUE_SIZE: int = Field(default=10000, description="Размер очереди записи логов")
+    LOG_SAMPLING: dict[str, float] = Field(
+        default={
+            "📨 Message received": 0.1,
+            "🔘 Callback received": 0.1
+        },
+        description="Доля записываемых событий по типу (info и ниже)"
+    )
+    LOG_ERROR_RATE_LIMIT: int = Field(default=10, description="Максимум одинаковых ошибок в минуту")
+    
     # ==================== ВНЕШНИЕ СЕРВИСЫ ====================
     
     # Мониторинг
@@ -242,6 +341,14 @@ class Settings(BaseSettings):
     PROMETHEUS_PORT: int = Field(default=8000, description="Порт для метрик Prometheus")
     METRICS_ENABLED: bool = Field(default=True, description="Включить сбор метрик")
     
+    # CryptoBot (Crypto Pay API)
+    CRYPTOBOT_API_TOKEN: str | None = Field(default=None, description="Токен Crypto Pay API")
+    CRYPTOBOT_WEBHOOK_SECRET: str | None = Field(default=None, description="Ключ подписи webhook (по умолчанию SHA256 от токена)")
+    CRYPTOBOT_API_URL: str = Field(default="https://pay.crypt.bot/api", description="Адрес Crypto Pay API")
+    CRYPTOBOT_INVOICE_TTL: int = Field(default=3600, description="Время жизни инвойса CryptoBot (сек)")
+    CRYPTOBOT_POLL_INTERVAL: int = Field(default=30, description="Период опроса неоплаченных инвойсов (сек)")
+    CRYPTOBOT_POLL_BATCH: int = Field(default=100, description="Инвойсов в одном запросе getInvoices (не больше 1000)")
+    
     # ==================== БЕЗОПАСНОСТЬ ====================
     
     # JWT настройки (если будет веб-интерфейс)
@@ -318,6 +425,16 @@ class Settings(BaseSettings):
             })
         }
     
+    def get_rate_limit(self, route: str = "default") -> tuple[int, int]:
+        """
+        Получить лимит маршрута
+        Возвращает: (количество_запросов, период_в_секундах)
+        """
+        route_limit = self.RATE_LIMITS.get(route)
+        if not route_limit:
+            return self.MAX_ACTIONS_PER_MINUTE, 60
+        return route_limit["limit"], route_limit["period"]
+    
     def is_admin(self, user_id: int) -> bool:
         """Проверить, является ли пользователь администратором"""
         return user_id in self.ADMIN_IDS
@@ -15,6 +15,7 @@ from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.pool import NullPool
 
 from app.config.settings import settings
+from app.services.metrics import instrument_engine
 
 logger = structlog.get_logger(__name__)
 
@@ -64,6 +65,7 @@ def create_engine() -> AsyncEngine:
     return engine
 
 engine = create_engine()
+instrument_engine(engine)
 
 # Современная фабрика сессий с типизацией
 AsyncSessionLocal = async_sessionmaker(
@@ -93,5 +95,40 @@ async def init_db() -> None:
         await conn.run_sync(Base.metadata.create_all)
     logger.info("Database initialized successfully")
 
+async def check_db_revision() -> None:
+    """
+    Сверка ревизии БД с head миграций Alembic.
+    Один запрос вместо create_all (который проверяет каждую таблицу)
+    """
+    # Alembic нужен только здесь, не загружаем его при каждом запуске
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    heads = set(ScriptDirectory.from_config(Config(settings.ALEMBIC_CONFIG)).get_heads())
+
+    async with engine.connect() as conn:
+        current = set(await conn.run_sync(
+            lambda sync_conn: MigrationContext.configure(sync_conn).get_current_heads()
+        ))
+
+    if current != heads:
+        # База, созданная create_all до появления миграций: alembic stamp <baseline>, затем upgrade
+        logger.error("💥 Database revision mismatch", current=sorted(current), expected=sorted(heads))
+        raise RuntimeError("Database schema is not up to date, run `alembic upgrade head` first")
+
+    logger.info("Database revision is up to date", revision=sorted(current))
+
+async def prepare_db_schema() -> None:
+    """Подготовка схемы при запуске согласно DB_SCHEMA_MODE"""
+    mode = settings.DB_SCHEMA_MODE
+    if mode == "auto":
+        mode = "check" if settings.is_production else "create_all"
+
+    if mode == "create_all":
+        await init_db()
+    elif mode == "check":
+        await check_db_revision()
+
 
 
@@ -16,6 +16,10 @@ from app.database.database import Base
 # Импортируем все модели для автогенерации
 from app.database.models.user import User
 from app.database.models.transaction import Transaction
+from app.database.models.task import Task
+from app.database.models.task_execution import TaskExecution
+from app.database.models.check import Check, CheckActivation
+from app.database.models.chat_subscription import ChatSubscriptionSettings, ChatRequiredChannel
 
 # Конфигурация Alembic
 config = context.config
@@ -0,0 +1,301 @@
+"""baseline
+
+Схема, которую до появления миграций создавал create_all:
+пользователи, задания, выполнения, транзакции, чеки, настройки.
+Базы, созданные create_all, не пересоздаются: `alembic stamp ee47041d9bbf`,
+затем `alembic upgrade head`.
+
+Revision ID: ee47041d9bbf
+Revises:
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ee47041d9bbf'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('username', sa.String(length=32), nullable=True),
+        sa.Column('first_name', sa.String(length=64), nullable=True),
+        sa.Column('last_name', sa.String(length=64), nullable=True),
+        sa.Column('language_code', sa.String(length=10), nullable=False),
+        sa.Column('balance', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('frozen_balance', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('total_deposited', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('total_withdrawn', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('level', sa.String(length=20), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('is_premium', sa.Boolean(), nullable=False),
+        sa.Column('is_banned', sa.Boolean(), nullable=False),
+        sa.Column('ban_reason', sa.Text(), nullable=True),
+        sa.Column('referrer_id', sa.BigInteger(), nullable=True),
+        sa.Column('total_referrals', sa.Integer(), nullable=False),
+        sa.Column('premium_referrals', sa.Integer(), nullable=False),
+        sa.Column('referral_earnings', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('tasks_completed', sa.Integer(), nullable=False),
+        sa.Column('tasks_created', sa.Integer(), nullable=False),
+        sa.Column('total_earned', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('total_spent', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('daily_tasks_completed', sa.Integer(), nullable=False),
+        sa.Column('daily_tasks_created', sa.Integer(), nullable=False),
+        sa.Column('last_task_date', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('last_activity', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('premium_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('notifications_enabled', sa.Boolean(), nullable=False),
+        sa.Column('auto_withdraw_enabled', sa.Boolean(), nullable=False),
+        sa.Column('min_task_reward', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_users')),
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_telegram_id'), 'users', ['telegram_id'], unique=True)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=False)
+    op.create_index(op.f('ix_users_balance'), 'users', ['balance'], unique=False)
+    op.create_index(op.f('ix_users_level'), 'users', ['level'], unique=False)
+    op.create_index(op.f('ix_users_is_active'), 'users', ['is_active'], unique=False)
+    op.create_index(op.f('ix_users_is_premium'), 'users', ['is_premium'], unique=False)
+    op.create_index(op.f('ix_users_is_banned'), 'users', ['is_banned'], unique=False)
+    op.create_index(op.f('ix_users_referrer_id'), 'users', ['referrer_id'], unique=False)
+    op.create_index(op.f('ix_users_created_at'), 'users', ['created_at'], unique=False)
+    op.create_index(op.f('ix_users_last_activity'), 'users', ['last_activity'], unique=False)
+    op.create_index('ix_users_level_balance', 'users', ['level', 'balance'], unique=False)
+    op.create_index('ix_users_referrer_active', 'users', ['referrer_id', 'is_active'], unique=False)
+    op.create_index('ix_users_created_activity', 'users', ['created_at', 'last_activity'], unique=False)
+
+    op.create_table(
+        'tasks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.BigInteger(), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('target_url', sa.String(length=500), nullable=False),
+        sa.Column('reward_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('total_budget', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('spent_budget', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('commission_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('target_executions', sa.Integer(), nullable=False),
+        sa.Column('completed_executions', sa.Integer(), nullable=False),
+        sa.Column('max_executions_per_user', sa.Integer(), nullable=False),
+        sa.Column('auto_check', sa.Boolean(), nullable=False),
+        sa.Column('manual_review_required', sa.Boolean(), nullable=False),
+        sa.Column('check_delay_seconds', sa.Integer(), nullable=False),
+        sa.Column('required_subscription_channels', sa.Text(), nullable=True),
+        sa.Column('min_user_level', sa.String(length=20), nullable=True),
+        sa.Column('geo_restrictions', sa.Text(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('starts_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('views_count', sa.Integer(), nullable=False),
+        sa.Column('clicks_count', sa.Integer(), nullable=False),
+        sa.Column('conversion_rate', sa.Numeric(precision=5, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['author_id'], ['users.telegram_id'],
+            name=op.f('fk_tasks_author_id_users'), ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_tasks')),
+    )
+    op.create_index(op.f('ix_tasks_id'), 'tasks', ['id'], unique=False)
+    op.create_index(op.f('ix_tasks_author_id'), 'tasks', ['author_id'], unique=False)
+    op.create_index(op.f('ix_tasks_type'), 'tasks', ['type'], unique=False)
+    op.create_index(op.f('ix_tasks_status'), 'tasks', ['status'], unique=False)
+    op.create_index(op.f('ix_tasks_reward_amount'), 'tasks', ['reward_amount'], unique=False)
+    op.create_index(op.f('ix_tasks_created_at'), 'tasks', ['created_at'], unique=False)
+    op.create_index('ix_tasks_status_type', 'tasks', ['status', 'type'], unique=False)
+    op.create_index('ix_tasks_author_status', 'tasks', ['author_id', 'status'], unique=False)
+    op.create_index('ix_tasks_reward_created', 'tasks', ['reward_amount', 'created_at'], unique=False)
+    op.create_index('ix_tasks_active_expires', 'tasks', ['status', 'expires_at'], unique=False)
+
+    op.create_table(
+        'task_executions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('reward_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('screenshot_url', sa.String(length=500), nullable=True),
+        sa.Column('proof_data', sa.Text(), nullable=True),
+        sa.Column('user_comment', sa.Text(), nullable=True),
+        sa.Column('reviewer_id', sa.BigInteger(), nullable=True),
+        sa.Column('review_comment', sa.Text(), nullable=True),
+        sa.Column('auto_checked', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('reviewed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ['task_id'], ['tasks.id'],
+            name=op.f('fk_task_executions_task_id_tasks'), ondelete='CASCADE'
+        ),
+        sa.ForeignKeyConstraint(
+            ['user_id'], ['users.telegram_id'],
+            name=op.f('fk_task_executions_user_id_users'), ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_task_executions')),
+    )
+    op.create_index(op.f('ix_task_executions_id'), 'task_executions', ['id'], unique=False)
+    op.create_index(op.f('ix_task_executions_task_id'), 'task_executions', ['task_id'], unique=False)
+    op.create_index(op.f('ix_task_executions_user_id'), 'task_executions', ['user_id'], unique=False)
+    op.create_index(op.f('ix_task_executions_status'), 'task_executions', ['status'], unique=False)
+    op.create_index(op.f('ix_task_executions_created_at'), 'task_executions', ['created_at'], unique=False)
+    op.create_index('ix_task_executions_task_user', 'task_executions', ['task_id', 'user_id'], unique=False)
+    op.create_index('ix_task_executions_status_created', 'task_executions', ['status', 'created_at'], unique=False)
+    op.create_index('ix_task_executions_user_status', 'task_executions', ['user_id', 'status'], unique=False)
+    op.create_index('ix_task_executions_reviewer', 'task_executions', ['reviewer_id', 'reviewed_at'], unique=False)
+
+    op.create_table(
+        'transactions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('reference_id', sa.String(length=255), nullable=True),
+        sa.Column('reference_type', sa.String(length=50), nullable=True),
+        sa.Column('stars_amount', sa.Integer(), nullable=True),
+        sa.Column('stars_transaction_id', sa.String(length=255), nullable=True),
+        sa.Column('balance_before', sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column('balance_after', sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ['user_id'], ['users.telegram_id'],
+            name=op.f('fk_transactions_user_id_users'), ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_transactions')),
+        sa.UniqueConstraint('stars_transaction_id', name=op.f('uq_transactions_stars_transaction_id')),
+    )
+    op.create_index(op.f('ix_transactions_id'), 'transactions', ['id'], unique=False)
+    op.create_index(op.f('ix_transactions_user_id'), 'transactions', ['user_id'], unique=False)
+    op.create_index(op.f('ix_transactions_type'), 'transactions', ['type'], unique=False)
+    op.create_index(op.f('ix_transactions_status'), 'transactions', ['status'], unique=False)
+    op.create_index(op.f('ix_transactions_reference_id'), 'transactions', ['reference_id'], unique=False)
+    op.create_index(op.f('ix_transactions_created_at'), 'transactions', ['created_at'], unique=False)
+    op.create_index('ix_transactions_user_type', 'transactions', ['user_id', 'type'], unique=False)
+    op.create_index('ix_transactions_user_created', 'transactions', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_transactions_type_status', 'transactions', ['type', 'status'], unique=False)
+    op.create_index('ix_transactions_reference', 'transactions', ['reference_type', 'reference_id'], unique=False)
+
+    op.create_table(
+        'checks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('creator_id', sa.BigInteger(), nullable=False),
+        sa.Column('type', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('total_amount', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('amount_per_activation', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('remaining_amount', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('max_activations', sa.Integer(), nullable=False),
+        sa.Column('current_activations', sa.Integer(), nullable=False),
+        sa.Column('max_per_user', sa.Integer(), nullable=False),
+        sa.Column('check_code', sa.String(length=50), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('password', sa.String(length=100), nullable=True),
+        sa.Column('required_subscription_channel', sa.String(length=100), nullable=True),
+        sa.Column('min_user_level', sa.String(length=20), nullable=True),
+        sa.Column('image_url', sa.String(length=500), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['creator_id'], ['users.telegram_id'],
+            name=op.f('fk_checks_creator_id_users'), ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_checks')),
+    )
+    op.create_index(op.f('ix_checks_id'), 'checks', ['id'], unique=False)
+    op.create_index(op.f('ix_checks_creator_id'), 'checks', ['creator_id'], unique=False)
+    op.create_index(op.f('ix_checks_type'), 'checks', ['type'], unique=False)
+    op.create_index(op.f('ix_checks_status'), 'checks', ['status'], unique=False)
+    op.create_index(op.f('ix_checks_check_code'), 'checks', ['check_code'], unique=True)
+    op.create_index(op.f('ix_checks_created_at'), 'checks', ['created_at'], unique=False)
+    op.create_index('ix_checks_creator_status', 'checks', ['creator_id', 'status'], unique=False)
+    op.create_index('ix_checks_type_status', 'checks', ['type', 'status'], unique=False)
+    op.create_index('ix_checks_expires', 'checks', ['expires_at', 'status'], unique=False)
+
+    op.create_table(
+        'check_activations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('check_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('amount_received', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('transaction_id', sa.Integer(), nullable=True),
+        sa.Column('activated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['check_id'], ['checks.id'],
+            name=op.f('fk_check_activations_check_id_checks'), ondelete='CASCADE'
+        ),
+        sa.ForeignKeyConstraint(
+            ['user_id'], ['users.telegram_id'],
+            name=op.f('fk_check_activations_user_id_users'), ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_check_activations')),
+    )
+    op.create_index(op.f('ix_check_activations_id'), 'check_activations', ['id'], unique=False)
+    op.create_index(op.f('ix_check_activations_check_id'), 'check_activations', ['check_id'], unique=False)
+    op.create_index(op.f('ix_check_activations_user_id'), 'check_activations', ['user_id'], unique=False)
+    op.create_index(op.f('ix_check_activations_activated_at'), 'check_activations', ['activated_at'], unique=False)
+    op.create_index('ix_check_activations_check_user', 'check_activations', ['check_id', 'user_id'], unique=False)
+    op.create_index('ix_check_activations_user_activated', 'check_activations', ['user_id', 'activated_at'], unique=False)
+
+    op.create_table(
+        'user_settings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('task_notifications', sa.Boolean(), nullable=False),
+        sa.Column('payment_notifications', sa.Boolean(), nullable=False),
+        sa.Column('referral_notifications', sa.Boolean(), nullable=False),
+        sa.Column('admin_notifications', sa.Boolean(), nullable=False),
+        sa.Column('hide_profile', sa.Boolean(), nullable=False),
+        sa.Column('hide_stats', sa.Boolean(), nullable=False),
+        sa.Column('hide_from_leaderboard', sa.Boolean(), nullable=False),
+        sa.Column('allow_referral_mentions', sa.Boolean(), nullable=False),
+        sa.Column('language', sa.String(length=10), nullable=False),
+        sa.Column('timezone', sa.String(length=50), nullable=False),
+        sa.Column('auto_withdraw_enabled', sa.Boolean(), nullable=False),
+        sa.Column('auto_withdraw_threshold', sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column('auto_withdraw_address', sa.Text(), nullable=True),
+        sa.Column('auto_withdraw_method', sa.String(length=50), nullable=True),
+        sa.Column('two_factor_enabled', sa.Boolean(), nullable=False),
+        sa.Column('login_notifications', sa.Boolean(), nullable=False),
+        sa.Column('api_access_enabled', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['user_id'], ['users.telegram_id'],
+            name=op.f('fk_user_settings_user_id_users')
+        ),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_user_settings')),
+    )
+    op.create_index(op.f('ix_user_settings_id'), 'user_settings', ['id'], unique=False)
+    op.create_index(op.f('ix_user_settings_user_id'), 'user_settings', ['user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table('user_settings')
+    op.drop_table('check_activations')
+    op.drop_table('checks')
+    op.drop_table('transactions')
+    op.drop_table('task_executions')
+    op.drop_table('tasks')
+    op.drop_table('users')
@@ -0,0 +1,68 @@
+"""chat subscription settings
+
+Настройки обязательной подписки чатов и их обязательные каналы.
+
+Revision ID: 7018159c738f
+Revises: ee47041d9bbf
+Create Date: 2026-10-18 23:01:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7018159c738f'
+down_revision: Union[str, None] = 'ee47041d9bbf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'chat_subscription_settings',
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('enabled', sa.Boolean(), nullable=False),
+        sa.Column('referral_check', sa.Boolean(), nullable=False),
+        sa.Column('referral_user_id', sa.BigInteger(), nullable=True),
+        sa.Column('check_duration', sa.Integer(), nullable=True),
+        sa.Column('auto_delete_time', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('chat_id', name=op.f('pk_chat_subscription_settings')),
+    )
+    op.create_index(
+        op.f('ix_chat_subscription_settings_enabled'), 'chat_subscription_settings', ['enabled'], unique=False
+    )
+
+    op.create_table(
+        'chat_required_channels',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('username', sa.String(length=100), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=True),
+        sa.Column('duration_hours', sa.Integer(), nullable=True),
+        sa.Column('added_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ['chat_id'], ['chat_subscription_settings.chat_id'],
+            name=op.f('fk_chat_required_channels_chat_id_chat_subscription_settings'), ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_chat_required_channels')),
+    )
+    op.create_index(
+        op.f('ix_chat_required_channels_chat_id'), 'chat_required_channels', ['chat_id'], unique=False
+    )
+    op.create_index(
+        'ix_chat_required_channels_chat_username', 'chat_required_channels', ['chat_id', 'username'], unique=True
+    )
+    op.create_index(
+        'ix_chat_required_channels_expires', 'chat_required_channels', ['expires_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('chat_required_channels')
+    op.drop_table('chat_subscription_settings')
@@ -0,0 +1,37 @@
+"""check activations check_activated index
+
+Индекс (check_id, activated_at) для аналитики чеков. Строится CONCURRENTLY,
+чтобы не блокировать запись активаций.
+
+Revision ID: 7e67adf1d913
+Revises: 7018159c738f
+Create Date: 2026-10-18 23:02:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e67adf1d913'
+down_revision: Union[str, None] = '7018159c738f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_check_activations_check_activated', 'check_activations', ['check_id', 'activated_at'],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_check_activations_check_activated', table_name='check_activations',
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    func,
+)
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.database.database import Base
+
+class ChatSubscriptionSettings(Base):
+    """Настройки обязательной подписки (ОП) для чата"""
+    __tablename__ = "chat_subscription_settings"
+
+    # Идентификатор чата Telegram
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    enabled: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+
+    # Реферальная ОП
+    referral_check: Mapped[bool] = mapped_column(Boolean, default=False)
+    referral_user_id: Mapped[int | None] = mapped_column(BigInteger)
+    check_duration: Mapped[int | None] = mapped_column(Integer)
+
+    # Автоудаление сообщений (в секундах)
+    auto_delete_time: Mapped[int | None] = mapped_column(Integer)
+
+    # Временные метки
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+    # Связи
+    channels: Mapped[list[ChatRequiredChannel]] = relationship(
+        back_populates="chat_settings",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+        order_by="ChatRequiredChannel.id"
+    )
+
+    def __repr__(self) -> str:
+        return f"<ChatSubscriptionSettings(chat_id={self.chat_id}, enabled={self.enabled})>"
+
+class ChatRequiredChannel(Base):
+    """Обязательный канал ОП с предрассчитанным сроком действия"""
+    __tablename__ = "chat_required_channels"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    chat_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("chat_subscription_settings.chat_id", ondelete="CASCADE"),
+        index=True
+    )
+
+    # Канал
+    username: Mapped[str] = mapped_column(String(100))
+    title: Mapped[str | None] = mapped_column(String(255))
+    duration_hours: Mapped[int | None] = mapped_column(Integer)
+
+    # Срок действия считается один раз при добавлении
+    added_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    # Связи
+    chat_settings: Mapped[ChatSubscriptionSettings] = relationship(back_populates="channels")
+
+    __table_args__ = (
+        Index("ix_chat_required_channels_chat_username", "chat_id", "username", unique=True),
+        Index("ix_chat_required_channels_expires", "expires_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<ChatRequiredChannel(chat_id={self.chat_id}, username={self.username})>"
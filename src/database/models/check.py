@@ -170,6 +170,8 @@ class CheckActivation(Base):
     __table_args__ = (
         Index("ix_check_activations_check_user", "check_id", "user_id"),
         Index("ix_check_activations_user_activated", "user_id", "activated_at"),
+        # Первые/последние активации чека без сортировки всех строк
+        Index("ix_check_activations_check_activated", "check_id", "activated_at"),
     )
     
     def __repr__(self) -> str:
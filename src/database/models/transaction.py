@@ -28,6 +28,7 @@ class TransactionType(StrEnum):
     # Пополнения через Telegram Stars
     DEPOSIT_STARS = "deposit_stars"
     DEPOSIT_BONUS = "deposit_bonus"
+    DEPOSIT_CRYPTO = "deposit_crypto"
     
     # Заработок
     TASK_REWARD = "task_reward"
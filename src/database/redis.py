@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import structlog
+from redis.asyncio import Redis
+
+from app.config.settings import settings
+
+logger = structlog.get_logger(__name__)
+
+def create_redis() -> Redis:
+    """Создание общего клиента Redis (кэши, счетчики, индексы)"""
+    return Redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        health_check_interval=30,
+    )
+
+# Один пул соединений на процесс, как и для движка БД
+redis_client = create_redis()
+
+async def close_redis() -> None:
+    """Закрытие пула соединений Redis"""
+    await redis_client.aclose()
+    logger.info("Redis connection pool closed")
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+import structlog
+from sqlalchemy import delete, select
+
+from app.database.database import get_session
+from app.database.models.chat_subscription import ChatRequiredChannel, ChatSubscriptionSettings
+from app.database.redis import redis_client
+
+logger = structlog.get_logger(__name__)
+
+# Ключи Redis
+CHAT_SETTINGS_KEY = "subscription:chat:{chat_id}"
+CHANNEL_EXPIRY_KEY = "subscription:channel_expiry"
+
+# Кэш держим сутки, источник истины - БД
+CACHE_TTL = 86400
+
+def default_chat_settings() -> Dict[str, Any]:
+    """Настройки ОП по умолчанию"""
+    return {
+        'required_channels': [],
+        'check_duration': None,
+        'auto_delete_time': None,
+        'referral_check': False,
+        'referral_user_id': None,
+        'enabled': False
+    }
+
+def _to_timestamp(value: datetime | None) -> float | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def _from_timestamp(value: float | None) -> datetime | None:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+def _optional_int(value: str | None) -> int | None:
+    return int(value) if value not in (None, "") else None
+
+class ChatSubscriptionRepository:
+    """
+    Хранилище настроек ОП: таблица в БД + хэш-кэш в Redis.
+    Сроки действия каналов хранятся готовыми timestamp'ами,
+    истекшие каналы находятся через sorted set без перебора чатов.
+    """
+
+    def __init__(self, redis=None):
+        self.redis = redis or redis_client
+
+    # ==================== ЧТЕНИЕ ====================
+
+    async def get(self, chat_id: int) -> Dict[str, Any]:
+        """Получить настройки чата (одно чтение из Redis на горячем пути)"""
+        cached = await self.redis.hgetall(CHAT_SETTINGS_KEY.format(chat_id=chat_id))
+        if cached:
+            return self._decode(cached)
+
+        chat_settings = await self._load_from_db(chat_id)
+        await self._write_cache(chat_id, chat_settings)
+        return chat_settings
+
+    async def _load_from_db(self, chat_id: int) -> Dict[str, Any]:
+        async with get_session() as session:
+            result = await session.execute(
+                select(ChatSubscriptionSettings)
+                .where(ChatSubscriptionSettings.chat_id == chat_id)
+            )
+            row = result.scalar_one_or_none()
+
+            if not row:
+                return default_chat_settings()
+
+            return {
+                'required_channels': [
+                    {
+                        'username': channel.username,
+                        'url': f"@{channel.username}",
+                        'title': channel.title,
+                        'duration_hours': channel.duration_hours,
+                        'added_at': channel.added_at.isoformat(),
+                        'expires_at': _to_timestamp(channel.expires_at)
+                    }
+                    for channel in row.channels
+                ],
+                'check_duration': row.check_duration,
+                'auto_delete_time': row.auto_delete_time,
+                'referral_check': row.referral_check,
+                'referral_user_id': row.referral_user_id,
+                'enabled': row.enabled
+            }
+
+    # ==================== ЗАПИСЬ ====================
+
+    async def save(self, chat_id: int, chat_settings: Dict[str, Any]) -> None:
+        """Сохранить настройки чата в БД и обновить кэш"""
+        async with get_session() as session:
+            row = await session.get(ChatSubscriptionSettings, chat_id)
+            if not row:
+                row = ChatSubscriptionSettings(chat_id=chat_id)
+                session.add(row)
+
+            row.enabled = chat_settings['enabled']
+            row.referral_check = chat_settings['referral_check']
+            row.referral_user_id = chat_settings['referral_user_id']
+            row.check_duration = chat_settings['check_duration']
+            row.auto_delete_time = chat_settings['auto_delete_time']
+
+            # Каналов не больше 5 - проще переписать список целиком
+            await session.execute(
+                delete(ChatRequiredChannel).where(ChatRequiredChannel.chat_id == chat_id)
+            )
+            for channel in chat_settings['required_channels']:
+                session.add(ChatRequiredChannel(
+                    chat_id=chat_id,
+                    username=channel['username'],
+                    title=channel.get('title'),
+                    duration_hours=channel.get('duration_hours'),
+                    added_at=datetime.fromisoformat(channel['added_at']),
+                    expires_at=_from_timestamp(channel.get('expires_at'))
+                ))
+
+        await self._write_cache(chat_id, chat_settings)
+
+    async def _write_cache(self, chat_id: int, chat_settings: Dict[str, Any]) -> None:
+        key = CHAT_SETTINGS_KEY.format(chat_id=chat_id)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=self._encode(chat_settings))
+            pipe.expire(key, CACHE_TTL)
+
+            # Индекс сроков действия: член "chat_id:username", score - timestamp.
+            # Записи удаленных каналов не чистим здесь - они отбрасываются
+            # при очистке, когда подойдет их срок
+            expiring = {
+                f"{chat_id}:{channel['username']}": channel['expires_at']
+                for channel in chat_settings['required_channels']
+                if channel.get('expires_at')
+            }
+            if expiring:
+                pipe.zadd(CHANNEL_EXPIRY_KEY, expiring)
+
+            await pipe.execute()
+
+    # ==================== ИСТЕЧЕНИЕ СРОКОВ ====================
+
+    async def get_expired_channels(self, now: float | None = None) -> Dict[int, list[str]]:
+        """Каналы с истекшим сроком, сгруппированные по чатам"""
+        members = await self.redis.zrangebyscore(
+            CHANNEL_EXPIRY_KEY, "-inf", now if now is not None else time.time()
+        )
+
+        expired: Dict[int, list[str]] = {}
+        for member in members:
+            chat_id, _, username = member.partition(":")
+            expired.setdefault(int(chat_id), []).append(username)
+
+        return expired
+
+    async def remove_from_expiry_index(self, chat_id: int, usernames: list[str]) -> None:
+        """Убрать каналы из индекса сроков"""
+        if usernames:
+            await self.redis.zrem(
+                CHANNEL_EXPIRY_KEY,
+                *(f"{chat_id}:{username}" for username in usernames)
+            )
+
+    # ==================== СЕРИАЛИЗАЦИЯ ====================
+
+    @staticmethod
+    def _encode(chat_settings: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            'enabled': "1" if chat_settings['enabled'] else "0",
+            'referral_check': "1" if chat_settings['referral_check'] else "0",
+            'referral_user_id': str(chat_settings['referral_user_id'] or ""),
+            'check_duration': str(chat_settings['check_duration'] or ""),
+            'auto_delete_time': str(chat_settings['auto_delete_time'] or ""),
+            'required_channels': json.dumps(chat_settings['required_channels'], ensure_ascii=False)
+        }
+
+    @staticmethod
+    def _decode(cached: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            'required_channels': json.loads(cached.get('required_channels') or "[]"),
+            'check_duration': _optional_int(cached.get('check_duration')),
+            'auto_delete_time': _optional_int(cached.get('auto_delete_time')),
+            'referral_check': cached.get('referral_check') == "1",
+            'referral_user_id': _optional_int(cached.get('referral_user_id')),
+            'enabled': cached.get('enabled') == "1"
+        }
@@ -1,5 +1,5 @@
-import asyncio
-import logging
+import hashlib
+import json
 import sys
 
 import structlog
@@ -7,37 +7,32 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.redis import RedisStorage
-from aiogram.types import BotCommand
-from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
-from aiohttp import web
+from aiogram.types import BotCommand, User as BotUser
 
 from app.config.settings import settings
-from app.database.database import init_db
+from app.config.logging import setup_logging
+from app.database.database import prepare_db_schema
+from app.database.redis import redis_client
 from app.bot.handlers import register_all_handlers
+from app.bot.handlers.lazy import resolve_lazy_update_types
 from app.bot.middlewares import register_all_middlewares
+from app.bot.middlewares.metrics import TelegramMetricsMiddleware
+from app.services.container import ServiceContainer
+from app.services.metrics import QueueDepthCollector, observe_cache, start_metrics_server
+from app.webhook_server import run_event_loop, serve_webhook
 
-# Настройка структурированного логирования
-structlog.configure(
-    processors=[
-        structlog.contextvars.merge_contextvars,
-        structlog.processors.add_log_level,
-        structlog.processors.StackInfoRenderer(),
-        structlog.dev.set_exc_info,
-        structlog.processors.TimeStamper(fmt="ISO"),
-        structlog.dev.ConsoleRenderer() if settings.DEBUG else structlog.processors.JSONRenderer(),
-    ],
-    wrapper_class=structlog.make_filtering_bound_logger(
-        logging.INFO if not settings.DEBUG else logging.DEBUG
-    ),
-    logger_factory=structlog.WriteLoggerFactory(),
-    cache_logger_on_first_use=False,
-)
+# Настройка структурированного логирования (запись в фоновом потоке)
+setup_logging()
 
 logger = structlog.get_logger(__name__)
 
+# Кэш данных бота в Redis (общий для реплик и перезапусков)
+BOT_INFO_KEY = "bot:{bot_id}:me"
+BOT_COMMANDS_HASH_KEY = "bot:{bot_id}:commands_hash"
+
 async def create_bot() -> Bot:
     """Создание экземпляра бота"""
-    return Bot(
+    bot = Bot(
         token=settings.BOT_TOKEN,
         default=DefaultBotProperties(
             parse_mode=ParseMode.HTML,
@@ -45,20 +40,26 @@ async def create_bot() -> Bot:
             protect_content=False
         )
     )
+    bot.session.middleware(TelegramMetricsMiddleware())
+    return bot
 
 async def create_dispatcher() -> Dispatcher:
     """Создание диспетчера с Redis хранилищем"""
     storage = RedisStorage.from_url(settings.REDIS_URL)
     dp = Dispatcher(storage=storage)
     
+    # Общие сервисы процесса (доступны фильтрам и startup/shutdown как "services")
+    services = ServiceContainer()
+    dp["services"] = services
+    
     # Регистрируем middlewares и handlers
-    register_all_middlewares(dp)
+    register_all_middlewares(dp, services)
     register_all_handlers(dp)
     
     return dp
 
-async def set_bot_commands(bot: Bot) -> None:
-    """Установка команд бота"""
+async def set_bot_commands(bot: Bot) -> bool:
+    """Установка команд бота (только если список изменился)"""
     commands = [
         BotCommand(command="start", description="🚀 Запустить бота"),
         BotCommand(command="help", description="❓ Помощь"),
@@ -70,41 +71,118 @@ async def set_bot_commands(bot: Bot) -> None:
         BotCommand(command="balance", description="💰 Баланс"),
     ]
     
+    digest = hashlib.sha256(
+        json.dumps([command.model_dump() for command in commands], ensure_ascii=False).encode()
+    ).hexdigest()
+    key = BOT_COMMANDS_HASH_KEY.format(bot_id=bot.id)
+    if await redis_client.get(key) == digest:
+        return False
+    
     await bot.set_my_commands(commands)
+    await redis_client.set(key, digest)
+    return True
 
-async def on_startup(bot: Bot) -> None:
-    """Действия при запуске бота"""
-    logger.info("🚀 Starting PR GRAM Bot...")
+async def get_bot_info(bot: Bot) -> BotUser:
+    """getMe с кэшированием в Redis"""
+    key = BOT_INFO_KEY.format(bot_id=bot.id)
+    cached = await redis_client.get(key)
+    observe_cache("bot_info", hit=bool(cached))
+    if cached:
+        return BotUser.model_validate_json(cached)
     
-    # Инициализируем БД
-    await init_db()
+    bot_info = await bot.get_me()
+    await redis_client.set(key, bot_info.model_dump_json(), ex=settings.BOT_INFO_CACHE_TTL)
+    return bot_info
+
+async def prepare_bot(bot: Bot) -> None:
+    """Однократная подготовка: БД и команды бота"""
+    # Схема БД: в production только сверка ревизии миграций
+    await prepare_db_schema()
     logger.info("✅ Database initialized")
     
     # Устанавливаем команды бота
-    await set_bot_commands(bot)
-    logger.info("✅ Bot commands set")
+    if await set_bot_commands(bot):
+        logger.info("✅ Bot commands set")
+
+async def on_startup(bot: Bot, dispatcher: Dispatcher) -> None:
+    """Действия при запуске бота"""
+    logger.info("🚀 Starting PR GRAM Bot...")
+    
+    # В webhook режиме подготовку один раз выполняет супервизор
+    worker_index = dispatcher.workflow_data.get("worker_index")
+    if worker_index is None:
+        await prepare_bot(bot)
+    
+    # Открываем ресурсы сервисов
+    services: ServiceContainer = dispatcher["services"]
+    await services.startup()
+    
+    # Запускаем отправку уведомлений из очереди (один отправитель на все процессы)
+    if settings.NOTIFICATION_SENDER_ENABLED and worker_index in (None, 0):
+        from app.services.notification_service import NotificationSender
+        
+        sender = NotificationSender(bot, user_service=services.user_service)
+        await sender.start()
+        dispatcher["notification_sender"] = sender
+    
+    # Длина очередей снимается одним процессом
+    if worker_index in (None, 0):
+        probes = {"notifications": services.notification_service.get_queue_depth}
+        if settings.UPDATE_QUEUE_ENABLED:
+            from app.services.update_queue import UpdateQueue
+            
+            probes["updates"] = UpdateQueue().get_backlog
+        
+        collector = QueueDepthCollector(probes)
+        collector.start()
+        dispatcher["queue_depth_collector"] = collector
+        
+        # Резервная проверка оплат CryptoBot (основной путь - webhook)
+        from app.services.crypto_payment_service import CryptoInvoicePoller
+        
+        poller = CryptoInvoicePoller(services.crypto_payments)
+        poller.start()
+        dispatcher["crypto_invoice_poller"] = poller
     
     # Получаем информацию о боте
-    bot_info = await bot.get_me()
+    bot_info = await get_bot_info(bot)
     logger.info(
         "🤖 Bot started successfully",
         username=bot_info.username,
         first_name=bot_info.first_name,
         id=bot_info.id,
-        environment=settings.ENVIRONMENT
+        environment=settings.ENVIRONMENT,
+        worker=worker_index
     )
 
-async def on_shutdown(bot: Bot) -> None:
+async def on_shutdown(bot: Bot, dispatcher: Dispatcher) -> None:
     """Действия при остановке бота"""
     logger.info("🛑 Shutting down PR GRAM Bot...")
     
-    # Удаляем webhook если был установлен
-    await bot.delete_webhook(drop_pending_updates=True)
+    # Неотправленные уведомления останутся в очереди до следующего запуска
+    sender = dispatcher.workflow_data.get("notification_sender")
+    if sender:
+        await sender.stop()
+    
+    collector = dispatcher.workflow_data.get("queue_depth_collector")
+    if collector:
+        await collector.stop()
+    
+    poller = dispatcher.workflow_data.get("crypto_invoice_poller")
+    if poller:
+        await poller.stop()
+    
+    # Процессы webhook сервера останавливаются по одному, webhook остается
+    if "worker_index" not in dispatcher.workflow_data:
+        await bot.delete_webhook(drop_pending_updates=settings.DROP_PENDING_UPDATES)
+    
+    # Закрываем HTTP-сессии и пул Redis
+    await dispatcher["services"].shutdown()
     
     logger.info("✅ Bot stopped gracefully")
 
-async def main() -> None:
-    """Основная функция запуска"""
+async def run_polling() -> None:
+    """Запуск в режиме polling (для разработки)"""
     try:
         # Создаем бот и диспетчер
         bot = await create_bot()
@@ -114,40 +192,14 @@ async def main() -> None:
         dp.startup.register(on_startup)
         dp.shutdown.register(on_shutdown)
         
-        if settings.WEBHOOK_URL and not settings.DEBUG:
-            # Webhook режим (для продакшн)
-            logger.info("🌐 Starting in webhook mode", webhook_url=settings.WEBHOOK_URL)
-            
-            # Настраиваем webhook
-            webhook_requests_handler = SimpleRequestHandler(
-                dispatcher=dp,
-                bot=bot,
-                secret_token=settings.WEBHOOK_SECRET
-            )
-            
-            # Создаем aiohttp приложение
-            app = web.Application()
-            webhook_requests_handler.register(app, path="/webhook")
-            setup_application(app, dp, bot=bot)
-            
-            # Устанавливаем webhook
-            await bot.set_webhook(
-                url=f"{settings.WEBHOOK_URL}/webhook",
-                secret_token=settings.WEBHOOK_SECRET,
-                drop_pending_updates=True
-            )
-            
-            # Запускаем веб-сервер
-            web.run_app(app, host="0.0.0.0", port=8000)
-        else:
-            # Polling режим (для разработки)
-            logger.info("🔄 Starting in polling mode")
-            
-            await dp.start_polling(
-                bot,
-                allowed_updates=dp.resolve_used_update_types(),
-                drop_pending_updates=True
-            )
+        logger.info("🔄 Starting in polling mode")
+        start_metrics_server()
+        
+        await dp.start_polling(
+            bot,
+            allowed_updates=sorted(set(dp.resolve_used_update_types()) | resolve_lazy_update_types(dp)),
+            drop_pending_updates=settings.DROP_PENDING_UPDATES
+        )
             
     except Exception as e:
         logger.error("💥 Fatal error during bot execution", error=str(e), exc_info=True)
@@ -156,11 +208,20 @@ async def main() -> None:
         if 'bot' in locals():
             await bot.session.close()
 
+def main() -> None:
+    """Основная функция запуска"""
+    if settings.WEBHOOK_URL and not settings.DEBUG:
+        # Webhook режим (для продакшн): WEBHOOK_WORKERS процессов на одном порту
+        logger.info("🌐 Starting in webhook mode", webhook_url=settings.WEBHOOK_URL, workers=settings.WEBHOOK_WORKERS)
+        serve_webhook()
+    else:
+        run_event_loop(run_polling())
+
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        main()
     except (KeyboardInterrupt, SystemExit):
         logger.info("👋 Bot stopped by user")
     except Exception as e:
         logger.error("💥 Unexpected error", error=str(e), exc_info=True)
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Dict
+
+import structlog
+
+from app.config.settings import settings
+from app.database.redis import redis_client
+
+logger = structlog.get_logger(__name__)
+
+# Ключи Redis
+BLOCK_KEY = "antifraud:block:{user_id}"
+SCORE_KEY = "antifraud:score:{user_id}"
+COUNTER_KEY = "antifraud:{user_id}:{signal}:{window}"
+LAST_CALLBACK_KEY = "antifraud:{user_id}:last_callback"
+PATTERN_KEY = "antifraud:pattern:{window}:{signature}"
+
+# Сигналы: (окно в секундах, имя настройки с лимитом, вес превышения, тип)
+# Тип определяет срок блокировки: spam - SPAM_BLOCK_DURATION, fraud - FRAUD_BLOCK_DURATION
+SIGNALS: Dict[str, tuple[int, str, int, str]] = {
+    "actions": (60, "MAX_ACTIONS_PER_MINUTE", 1, "spam"),
+    "task_executions": (3600, "MAX_TASKS_PER_HOUR", 5, "fraud"),
+    "check_activations": (60, "MAX_CHECK_ACTIVATIONS_PER_MINUTE", 10, "fraud"),
+    "referrals": (3600, "MAX_REFERRALS_PER_HOUR", 5, "fraud"),
+}
+
+# Веса поведенческих признаков нажатий кнопок
+FAST_CLICK_WEIGHT = 1
+SHARED_PATTERN_WEIGHT = 5
+
+# Переходы между кнопками медленнее этого не сравниваем между аккаунтами
+PATTERN_MAX_INTERVAL_MS = 3000
+PATTERN_BUCKET_MS = 50
+PATTERN_WINDOW = 60
+
+class AntiFraudService:
+    """
+    Антифрод на скользящих счетчиках в Redis.
+    Каждое событие обновляет несколько счетчиков и, при превышении лимитов,
+    накопленный счет пользователя; по достижении SUSPICIOUS_ACTIVITY_THRESHOLD
+    пользователь временно блокируется. БД не используется.
+    """
+
+    def __init__(self, redis=None):
+        self.redis = redis or redis_client
+
+    # ==================== ПРОВЕРКИ ====================
+
+    async def inspect_event(self, user_id: int, callback_data: str | None = None) -> tuple[int, bool]:
+        """
+        Учесть входящее событие пользователя.
+        Возвращает: (секунд_до_разблокировки, заблокирован_этим_событием)
+        """
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.ttl(BLOCK_KEY.format(user_id=user_id))
+        self._queue_counter(pipe, user_id, "actions", now)
+        if callback_data is not None:
+            pipe.set(
+                LAST_CALLBACK_KEY.format(user_id=user_id),
+                f"{int(now * 1000)}|{callback_data}",
+                ex=PATTERN_WINDOW,
+                get=True
+            )
+        results = await pipe.execute()
+
+        block_ttl, current, _, previous = results[:4]
+        if block_ttl > 0:
+            return block_ttl, False
+
+        penalties = {"spam": 0, "fraud": 0}
+        self._add_penalty(penalties, "actions", current, previous, now)
+
+        pattern_key = None
+        last_callback = results[4] if callback_data is not None else None
+        if last_callback:
+            previous_ms, _, previous_data = last_callback.partition("|")
+            interval_ms = int(now * 1000) - int(previous_ms)
+
+            if interval_ms < settings.FAST_CLICK_INTERVAL_MS:
+                penalties["spam"] += FAST_CLICK_WEIGHT
+
+            if interval_ms < PATTERN_MAX_INTERVAL_MS:
+                pattern_key = self._pattern_key(previous_data, callback_data, interval_ms, now)
+
+        return await self._apply(user_id, penalties, pattern_key)
+
+    async def record(self, user_id: int, signal: str) -> bool:
+        """
+        Учесть действие пользователя (выполнение задания, активация чека, реферал).
+        Возвращает False, если пользователь заблокирован.
+        Без Redis пропускает (как и middleware): антифрод не должен останавливать выплаты
+        """
+        if not settings.ANTIFRAUD_ENABLED:
+            return True
+
+        try:
+            now = time.time()
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.exists(BLOCK_KEY.format(user_id=user_id))
+            self._queue_counter(pipe, user_id, signal, now)
+            blocked, current, _, previous = await pipe.execute()
+
+            if blocked:
+                return False
+
+            penalties = {"spam": 0, "fraud": 0}
+            self._add_penalty(penalties, signal, current, previous, now)
+
+            block_ttl, _ = await self._apply(user_id, penalties)
+        except Exception as e:
+            logger.error("💥 Anti-fraud record failed", user_id=user_id, signal=signal, error=str(e))
+            return True
+
+        return block_ttl == 0
+
+    async def unblock(self, user_id: int) -> None:
+        """Снять временную блокировку и обнулить счет"""
+        await self.redis.delete(
+            BLOCK_KEY.format(user_id=user_id),
+            SCORE_KEY.format(user_id=user_id)
+        )
+
+    # ==================== СКОРИНГ ====================
+
+    @staticmethod
+    def _queue_counter(pipe, user_id: int, signal: str, now: float) -> None:
+        """Счетчик текущего окна и значение предыдущего"""
+        window_size = SIGNALS[signal][0]
+        window = int(now // window_size)
+        key = COUNTER_KEY.format(user_id=user_id, signal=signal, window=window)
+
+        pipe.incr(key)
+        pipe.expire(key, window_size * 2)
+        pipe.get(COUNTER_KEY.format(user_id=user_id, signal=signal, window=window - 1))
+
+    @staticmethod
+    def _add_penalty(
+        penalties: Dict[str, int],
+        signal: str,
+        current: int,
+        previous: str | None,
+        now: float
+    ) -> None:
+        window_size, limit_setting, weight, kind = SIGNALS[signal]
+
+        # Оценка скользящего окна: текущее + доля предыдущего
+        elapsed = (now % window_size) / window_size
+        rate = int(current) + int(previous or 0) * (1 - elapsed)
+
+        if rate > getattr(settings, limit_setting):
+            penalties[kind] += weight
+
+    @staticmethod
+    def _pattern_key(previous_data: str, callback_data: str, interval_ms: int, now: float) -> str:
+        # Одинаковая последовательность кнопок с одинаковым таймингом
+        # у многих аккаунтов - признак скрипта или одного устройства
+        signature = hashlib.blake2b(
+            f"{previous_data}>{callback_data}:{interval_ms // PATTERN_BUCKET_MS}".encode(),
+            digest_size=8
+        ).hexdigest()
+        return PATTERN_KEY.format(window=int(now // PATTERN_WINDOW), signature=signature)
+
+    async def _apply(
+        self,
+        user_id: int,
+        penalties: Dict[str, int],
+        pattern_key: str | None = None
+    ) -> tuple[int, bool]:
+        """Начислить штрафы и заблокировать при превышении порога"""
+        if pattern_key:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.pfadd(pattern_key, user_id)
+            pipe.expire(pattern_key, PATTERN_WINDOW * 2)
+            pipe.pfcount(pattern_key)
+            _, _, pattern_users = await pipe.execute()
+
+            if pattern_users > settings.ANTIFRAUD_PATTERN_USERS:
+                penalties["fraud"] += SHARED_PATTERN_WEIGHT
+
+        if not penalties["spam"] and not penalties["fraud"]:
+            return 0, False
+
+        score_key = SCORE_KEY.format(user_id=user_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hincrby(score_key, "spam", penalties["spam"])
+        pipe.hincrby(score_key, "fraud", penalties["fraud"])
+        pipe.expire(score_key, settings.ANTIFRAUD_SCORE_TTL)
+        spam_score, fraud_score, _ = await pipe.execute()
+
+        if spam_score + fraud_score < settings.SUSPICIOUS_ACTIVITY_THRESHOLD:
+            return 0, False
+
+        reason = "fraud" if fraud_score >= spam_score else "spam"
+        duration = settings.FRAUD_BLOCK_DURATION if reason == "fraud" else settings.SPAM_BLOCK_DURATION
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.set(BLOCK_KEY.format(user_id=user_id), reason, ex=duration)
+        pipe.delete(score_key)
+        await pipe.execute()
+
+        logger.warning(
+            "🚨 User temporarily blocked by anti-fraud",
+            user_id=user_id,
+            reason=reason,
+            spam_score=spam_score,
+            fraud_score=fraud_score,
+            duration=duration
+        )
+
+        return duration, True
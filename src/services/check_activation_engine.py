@@ -0,0 +1,600 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List
+
+import structlog
+from sqlalchemy import func, select
+
+from app.config.settings import settings
+from app.database.database import get_session
+from app.database.models.check import Check, CheckActivation, CheckStatus
+from app.database.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.database.models.user import User
+from app.database.redis import redis_client
+from app.services.check_code_registry import CheckCodeRegistry
+from app.services.metrics import observe_cache
+from app.services.user_service import UserService
+
+logger = structlog.get_logger(__name__)
+
+CHECK_META_KEY = "check:meta:{code}"
+CHECK_SLOTS_KEY = "check:{check_id}:slots"
+CHECK_USERS_KEY = "check:{check_id}:users"
+CHECK_INFLIGHT_KEY = "check:{check_id}:inflight"
+# Карточки активных чеков создателя для inline-режима
+CHECK_INLINE_KEY = "checks:inline:{creator_id}"
+# Чеки со счетчиками в Redis (для сверки)
+CHECK_ENGINE_INDEX = "checks:engine"
+
+# Ответы скрипта допуска
+ADMIT_NOT_LOADED = -2
+ADMIT_SOLD_OUT = -1
+ADMIT_USER_LIMIT = -3
+
+# Допуск: слот чека и лимит на пользователя проверяются и занимаются атомарно.
+# inflight - допущенные, но еще не записанные в БД активации
+ADMIT_SCRIPT = """
+local slots = redis.call('GET', KEYS[1])
+if not slots then
+    return -2
+end
+if tonumber(slots) <= 0 then
+    return -1
+end
+local used = tonumber(redis.call('HGET', KEYS[2], ARGV[1]) or '0')
+if used >= tonumber(ARGV[2]) then
+    return -3
+end
+redis.call('DECR', KEYS[1])
+redis.call('HINCRBY', KEYS[2], ARGV[1], 1)
+redis.call('INCR', KEYS[3])
+return tonumber(slots) - 1
+"""
+
+# Загрузка счетчиков из БД (если их еще нет)
+PRIME_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[1])
+redis.call('DEL', KEYS[2])
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[3], ARGV[1])
+return 1
+"""
+
+# Итог записи: ARGV[2] = 1 - слот израсходован, 0 - вернуть слот и попытку пользователя
+SETTLE_SCRIPT = """
+redis.call('DECR', KEYS[3])
+if ARGV[2] == '0' then
+    if redis.call('EXISTS', KEYS[1]) == 1 then
+        redis.call('INCR', KEYS[1])
+    end
+    if redis.call('HINCRBY', KEYS[2], ARGV[1], -1) <= 0 then
+        redis.call('HDEL', KEYS[2], ARGV[1])
+    end
+end
+return 1
+"""
+
+# Сверка: свободные слоты = свободные по БД минус еще не записанные
+RECONCILE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local inflight = tonumber(redis.call('GET', KEYS[2]) or '0')
+if inflight < 0 then
+    inflight = 0
+    redis.call('SET', KEYS[2], 0, 'KEEPTTL')
+end
+local expected = math.max(0, tonumber(ARGV[1]) - inflight)
+local current = tonumber(redis.call('GET', KEYS[1]))
+if current ~= expected then
+    redis.call('SET', KEYS[1], expected, 'KEEPTTL')
+    return {current, expected}
+end
+return false
+"""
+
+_LEVEL_HIERARCHY = ["bronze", "silver", "gold", "premium"]
+_LEVEL_NAMES = {
+    "bronze": "🥉 Bronze",
+    "silver": "🥈 Silver",
+    "gold": "🥇 Gold",
+    "premium": "💎 Premium"
+}
+
+_STATUS_MESSAGES = {
+    CheckStatus.EXPIRED: "⏰ Срок действия чека истек",
+    CheckStatus.COMPLETED: "✅ Чек уже полностью активирован",
+    CheckStatus.CANCELLED: "❌ Чек отменен",
+}
+
+_ERROR_MESSAGE = "❌ Ошибка активации чека. Попробуйте позже"
+
+def utc_timestamp(value: datetime) -> float:
+    """Метка времени для datetime в UTC: наивные значения (datetime.utcnow()) не считаются местным временем"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def _check_keys(check_id: int) -> list[str]:
+    return [
+        CHECK_SLOTS_KEY.format(check_id=check_id),
+        CHECK_USERS_KEY.format(check_id=check_id),
+        CHECK_INFLIGHT_KEY.format(check_id=check_id),
+    ]
+
+class CheckActivationEngine:
+    """
+    Активация чеков при высокой конкуренции (розыгрыши, мульти-чеки).
+
+    Допуск выполняется одним Lua-скриптом в Redis: свободный слот и лимит
+    активаций на пользователя, без блокировок в БД. Допущенные активации
+    пишет в БД фоновый писатель пачками: одна транзакция на пачку, одна
+    блокировка строки чека на пачку. БД остается источником истины:
+    писатель повторно проверяет лимиты под блокировкой, а периодическая
+    сверка выравнивает счетчики Redis по БД.
+    """
+
+    def __init__(
+        self,
+        user_service: UserService | None = None,
+        redis=None,
+        code_registry: CheckCodeRegistry | None = None
+    ):
+        self.user_service = user_service or UserService()
+        self.redis = redis or redis_client
+        self.code_registry = code_registry or CheckCodeRegistry(self.redis)
+
+        self._admit = self.redis.register_script(ADMIT_SCRIPT)
+        self._prime = self.redis.register_script(PRIME_SCRIPT)
+        self._settle = self.redis.register_script(SETTLE_SCRIPT)
+        self._reconcile = self.redis.register_script(RECONCILE_SCRIPT)
+
+        # (check_id, check_code, user_id, amount, future)
+        self._queue: asyncio.Queue[tuple] = asyncio.Queue()
+        self._writer_task: asyncio.Task | None = None
+        self._reconcile_task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Запустить писателя и периодическую сверку"""
+        self._ensure_writer()
+        if self._reconcile_task is None:
+            self._reconcile_task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self) -> None:
+        """Дописать очередь и остановить фоновые задачи"""
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+            await asyncio.gather(self._reconcile_task, return_exceptions=True)
+            self._reconcile_task = None
+
+        if self._writer_task:
+            await self._queue.put(None)
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            self._writer_task = None
+
+    def _ensure_writer(self) -> None:
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    # ==================== ДОПУСК ====================
+
+    async def activate(
+        self,
+        check_code: str,
+        user_id: int,
+        password: str | None = None
+    ) -> tuple[bool, str, Decimal]:
+        """Активировать чек. Возвращает: (успех, сообщение, сумма)"""
+        meta = await self.get_meta(check_code)
+        if not meta:
+            return False, "❌ Чек не найден", Decimal("0")
+
+        if meta["status"] != CheckStatus.ACTIVE:
+            return False, _STATUS_MESSAGES.get(meta["status"], "❌ Чек неактивен"), Decimal("0")
+
+        if meta["expires_at"] and time.time() > float(meta["expires_at"]):
+            return False, "⏰ Срок действия чека истек", Decimal("0")
+
+        if int(meta["creator_id"]) == user_id:
+            return False, "❌ Нельзя активировать собственный чек", Decimal("0")
+
+        if meta["password"] and meta["password"] != password:
+            return False, "🔒 Неверный пароль", Decimal("0")
+
+        if meta["min_user_level"]:
+            user = await self.user_service.get_user(user_id)
+            if not user:
+                return False, "❌ Пользователь не найден", Decimal("0")
+            if user.level not in _LEVEL_HIERARCHY:
+                return False, "❌ Неизвестный уровень пользователя", Decimal("0")
+            if _LEVEL_HIERARCHY.index(user.level) < _LEVEL_HIERARCHY.index(meta["min_user_level"]):
+                required_level = _LEVEL_NAMES.get(meta["min_user_level"], meta["min_user_level"])
+                return False, f"❌ Требуется уровень {required_level}", Decimal("0")
+
+        check_id = int(meta["id"])
+        result = await self._admit(keys=_check_keys(check_id), args=[user_id, meta["max_per_user"]])
+        if result == ADMIT_NOT_LOADED:
+            await self._load_counters(check_id)
+            result = await self._admit(keys=_check_keys(check_id), args=[user_id, meta["max_per_user"]])
+
+        if result == ADMIT_SOLD_OUT:
+            return False, "✅ Чек уже полностью активирован", Decimal("0")
+        if result == ADMIT_USER_LIMIT:
+            return False, "❌ Вы уже активировали этот чек", Decimal("0")
+
+        # Слот занят: ждем записи пачки в БД
+        amount = Decimal(meta["amount"])
+        future = asyncio.get_running_loop().create_future()
+        self._ensure_writer()
+        self._queue.put_nowait((check_id, meta["code"], user_id, amount, future))
+
+        try:
+            success, message = await asyncio.wait_for(asyncio.shield(future), timeout=30)
+        except asyncio.TimeoutError:
+            return False, "⏳ Активация обрабатывается, баланс обновится в ближайшее время", Decimal("0")
+
+        return success, message, amount if success else Decimal("0")
+
+    async def get_meta(self, check_code: str) -> Dict[str, str] | None:
+        """Параметры чека: локальный LRU, фильтр Блума, кэш Redis, БД"""
+        check_code = check_code.upper()
+        registry = self.code_registry
+
+        cached = registry.cached(check_code)
+        if not registry.is_missing(cached):
+            return cached
+
+        # Случайный текст и перебор кодов отсекаются без обращения к БД
+        if not await registry.might_exist(check_code):
+            return None
+
+        key = CHECK_META_KEY.format(code=check_code)
+        meta = await self.redis.hgetall(key)
+        observe_cache("check_meta", hit=bool(meta))
+        if meta:
+            registry.remember(check_code, meta)
+            return meta
+
+        async with get_session() as session:
+            result = await session.execute(
+                select(Check).where(Check.check_code == check_code)
+            )
+            check = result.scalar_one_or_none()
+
+        if not check:
+            # Ложное срабатывание фильтра: запоминаем отрицательный ответ
+            registry.remember(check_code, None)
+            return None
+
+        meta = {
+            "id": str(check.id),
+            "code": check.check_code,
+            "creator_id": str(check.creator_id),
+            "status": str(check.status),
+            "amount": str(check.amount_per_activation),
+            "max_per_user": str(check.max_per_user),
+            "password": check.password or "",
+            "min_user_level": check.min_user_level or "",
+            "expires_at": str(utc_timestamp(check.expires_at)) if check.expires_at else "",
+        }
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping=meta)
+            pipe.expire(key, settings.CHECK_META_TTL)
+            await pipe.execute()
+
+        registry.remember(check_code, meta)
+        return meta
+
+    async def _load_counters(self, check_id: int) -> None:
+        """Загрузить свободные слоты и активации пользователей из БД"""
+        async with get_session() as session:
+            check = await session.get(Check, check_id)
+            if not check:
+                return
+
+            result = await session.execute(
+                select(CheckActivation.user_id, func.count(CheckActivation.id))
+                .where(CheckActivation.check_id == check_id)
+                .group_by(CheckActivation.user_id)
+            )
+            per_user = result.all()
+
+        free_slots = max(0, check.max_activations - check.current_activations) if check.is_active else 0
+
+        ttl = settings.CHECK_EXPIRY_TIME
+        if check.expires_at:
+            ttl = max(60, int(utc_timestamp(check.expires_at) - time.time()) + 3600)
+
+        args = [ttl, free_slots]
+        for user_id, count in per_user:
+            args.extend((user_id, count))
+
+        await self._prime(keys=_check_keys(check_id), args=args)
+        await self.redis.sadd(CHECK_ENGINE_INDEX, check_id)
+
+    async def invalidate(self, check_id: int, check_code: str) -> None:
+        """Сбросить кэш и счетчики чека (отмена, истечение, завершение)"""
+        self.code_registry.forget(check_code)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(CHECK_META_KEY.format(code=check_code), *_check_keys(check_id)[:2])
+            pipe.srem(CHECK_ENGINE_INDEX, check_id)
+            await pipe.execute()
+
+    # ==================== ЗАПИСЬ В БД ====================
+
+    async def _writer_loop(self) -> None:
+        interval = settings.CHECK_BATCH_INTERVAL_MS / 1000
+
+        while True:
+            entry = await self._queue.get()
+            if entry is None:
+                return
+
+            batch = [entry]
+            deadline = time.monotonic() + interval
+            stop = False
+
+            # Копим пачку до размера или до истечения интервала
+            while len(batch) < settings.CHECK_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                logger.error("💥 Check activation batch failed", size=len(batch), error=str(e))
+
+            if stop:
+                return
+
+    async def _flush(self, batch: List[tuple]) -> None:
+        # index -> (успех, сообщение, слот израсходован)
+        results: Dict[int, tuple[bool, str, bool]] = {}
+        # check_id -> (код, создатель)
+        completed: Dict[int, tuple[str, int]] = {}
+
+        try:
+            async with get_session() as session:
+                # Одна блокировка на чек на всю пачку, порядок id исключает взаимоблокировки
+                check_ids = sorted({entry[0] for entry in batch})
+                checks = {
+                    check.id: check
+                    for check in (await session.execute(
+                        select(Check).where(Check.id.in_(check_ids)).order_by(Check.id).with_for_update()
+                    )).scalars()
+                }
+
+                # Лимит на пользователя по БД: счетчики Redis могли быть сброшены.
+                # Активации чека пишутся только под блокировкой его строки, подсчет точен
+                activated = {
+                    (check_id, user_id): count
+                    for check_id, user_id, count in (await session.execute(
+                        select(CheckActivation.check_id, CheckActivation.user_id, func.count(CheckActivation.id))
+                        .where(
+                            CheckActivation.check_id.in_(check_ids),
+                            CheckActivation.user_id.in_({entry[2] for entry in batch})
+                        )
+                        .group_by(CheckActivation.check_id, CheckActivation.user_id)
+                    )).all()
+                }
+
+                accepted = []
+                for index, (check_id, check_code, user_id, amount, _) in enumerate(batch):
+                    check = checks.get(check_id)
+                    if check is None or not check.is_active:
+                        # По БД слотов нет: слот не возвращаем, сверка выровняет счетчик
+                        results[index] = (False, "✅ Чек уже полностью активирован", True)
+                        continue
+
+                    if activated.get((check_id, user_id), 0) >= check.max_per_user:
+                        results[index] = (False, "❌ Вы уже активировали этот чек", False)
+                        continue
+
+                    activated[(check_id, user_id)] = activated.get((check_id, user_id), 0) + 1
+                    check.current_activations += 1
+                    check.remaining_amount -= check.amount_per_activation
+                    accepted.append(index)
+
+                user_ids = sorted(
+                    {batch[index][2] for index in accepted} | {checks[batch[index][0]].creator_id for index in accepted}
+                )
+                users = {
+                    user.telegram_id: user
+                    for user in (await session.execute(
+                        select(User).where(User.telegram_id.in_(user_ids)).order_by(User.telegram_id).with_for_update()
+                    )).scalars()
+                }
+
+                received = []
+                debited: Dict[int, list] = {}
+                for index in accepted:
+                    check_id, check_code, user_id, amount, _ = batch[index]
+                    check = checks[check_id]
+                    user = users.get(user_id)
+                    creator = users.get(check.creator_id)
+                    if user is None or creator is None:
+                        # Без создателя отклоняются только активации этого чека, а не вся пачка
+                        check.current_activations -= 1
+                        check.remaining_amount += check.amount_per_activation
+                        if user is None:
+                            results[index] = (False, "❌ Пользователь не найден", False)
+                        else:
+                            logger.error("💥 Check creator not found", check_id=check_id, creator_id=check.creator_id)
+                            results[index] = (False, _ERROR_MESSAGE, False)
+                        continue
+
+                    balance_before = user.balance
+                    user.balance += check.amount_per_activation
+                    transaction = Transaction(
+                        user_id=user_id,
+                        type=TransactionType.CHECK_RECEIVED,
+                        status=TransactionStatus.COMPLETED,
+                        amount=check.amount_per_activation,
+                        description=f"Получение чека #{check.check_code}",
+                        reference_id=str(check.id),
+                        reference_type="check",
+                        balance_before=balance_before,
+                        balance_after=user.balance
+                    )
+                    session.add(transaction)
+                    received.append((index, transaction))
+                    debited.setdefault(check_id, []).append(index)
+                    results[index] = (True, "✅ Чек успешно активирован!", True)
+
+                # Создателю - одна запись на чек на пачку: списание замороженных средств
+                for check_id, indexes in debited.items():
+                    check = checks[check_id]
+                    creator = users[check.creator_id]
+                    total = check.amount_per_activation * len(indexes)
+
+                    balance_before = creator.balance
+                    creator.balance -= total
+                    creator.frozen_balance -= total
+                    session.add(Transaction(
+                        user_id=creator.telegram_id,
+                        type=TransactionType.CHECK_CREATION,
+                        status=TransactionStatus.COMPLETED,
+                        amount=-total,
+                        description=f"Активации чека #{check.check_code}: {len(indexes)}",
+                        reference_id=str(check.id),
+                        reference_type="check",
+                        balance_before=balance_before,
+                        balance_after=creator.balance
+                    ))
+
+                    # Чек исчерпан - остаток возвращается создателю
+                    if not check.is_active and check.status == CheckStatus.ACTIVE:
+                        check.status = CheckStatus.COMPLETED
+                        completed[check.id] = (check.check_code, check.creator_id)
+                        if check.remaining_amount > 0:
+                            creator.frozen_balance -= check.remaining_amount
+                            session.add(Transaction(
+                                user_id=creator.telegram_id,
+                                type=TransactionType.BALANCE_UNFREEZE,
+                                status=TransactionStatus.COMPLETED,
+                                amount=check.remaining_amount,
+                                description=f"Возврат средств с чека #{check.check_code}",
+                                reference_id=str(check.id),
+                                reference_type="check",
+                                balance_before=creator.balance,
+                                balance_after=creator.balance
+                            ))
+
+                # id транзакций нужны для связи с активациями
+                await session.flush()
+                session.add_all(
+                    CheckActivation(
+                        check_id=batch[index][0],
+                        user_id=batch[index][2],
+                        amount_received=transaction.amount,
+                        transaction_id=transaction.id,
+                        activated_at=datetime.utcnow()
+                    )
+                    for index, transaction in received
+                )
+
+        except Exception as e:
+            logger.error("💥 Check activation write failed", size=len(batch), error=str(e))
+            results = {index: (False, _ERROR_MESSAGE, False) for index in range(len(batch))}
+            completed = {}
+
+        # Возвращаем неиспользованные слоты и снимаем отметки "в записи"
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for index, (check_id, _, user_id, _, _) in enumerate(batch):
+                    consumed = results.get(index, (False, _ERROR_MESSAGE, False))[2]
+                    await self._settle(keys=_check_keys(check_id), args=[user_id, 1 if consumed else 0], client=pipe)
+                await pipe.execute()
+        except Exception as e:
+            logger.error("💥 Check activation settle failed", error=str(e))
+
+        for check_id, (check_code, _) in completed.items():
+            await self.invalidate(check_id, check_code)
+
+        # Исчерпанные чеки не должны оставаться в inline-карточках: следующий запрос пересоберет их из БД
+        creator_ids = {creator_id for _, creator_id in completed.values()}
+        if creator_ids:
+            try:
+                await self.redis.delete(*(CHECK_INLINE_KEY.format(creator_id=creator_id) for creator_id in creator_ids))
+            except Exception as e:
+                logger.error("💥 Inline cards cache reset failed", error=str(e))
+
+        for index, (check_id, check_code, user_id, amount, future) in enumerate(batch):
+            success, message, _ = results.get(index, (False, _ERROR_MESSAGE, False))
+            if not future.done():
+                future.set_result((success, message))
+
+        logger.info(
+            "💳 Check activations written",
+            size=len(batch),
+            accepted=sum(1 for success, _, _ in results.values() if success)
+        )
+
+    # ==================== СВЕРКА ====================
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.CHECK_RECONCILE_INTERVAL)
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("💥 Check counters reconcile failed", error=str(e))
+
+    async def reconcile(self) -> int:
+        """Выровнять счетчики Redis по БД. Возвращает число исправленных чеков"""
+        check_ids = [int(check_id) for check_id in await self.redis.smembers(CHECK_ENGINE_INDEX)]
+        if not check_ids:
+            return 0
+
+        async with get_session() as session:
+            checks = list((await session.execute(
+                select(Check).where(Check.id.in_(check_ids))
+            )).scalars())
+
+        found = {check.id for check in checks}
+        for check_id in set(check_ids) - found:
+            await self.redis.srem(CHECK_ENGINE_INDEX, check_id)
+
+        corrected = 0
+        for check in checks:
+            if not check.is_active:
+                await self.invalidate(check.id, check.check_code)
+                continue
+
+            keys = _check_keys(check.id)
+            result = await self._reconcile(
+                keys=[keys[0], keys[2]],
+                args=[check.max_activations - check.current_activations]
+            )
+            if result:
+                corrected += 1
+                logger.warning(
+                    "⚠️ Check slots corrected",
+                    check_id=check.id,
+                    redis_slots=result[0],
+                    expected=result[1]
+                )
+
+        return corrected
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import math
+import re
+import string
+import time
+from collections import OrderedDict
+from typing import Any
+
+import structlog
+from sqlalchemy import func, select
+
+from app.config.settings import settings
+from app.database.database import get_session
+from app.database.models.check import Check
+from app.database.redis import redis_client
+from app.services.metrics import observe_cache
+
+logger = structlog.get_logger(__name__)
+
+CHECK_CODE_SEQ_KEY = "checks:code_seq"
+CHECK_BLOOM_KEY = "checks:bloom"
+CHECK_BLOOM_READY_KEY = "checks:bloom:ready"
+CHECK_BLOOM_REBUILD_LOCK = "checks:bloom:rebuild"
+
+ALPHABET = string.digits + string.ascii_uppercase
+CODE_PATTERN = re.compile(r"^[A-Z0-9]{8}$")
+
+# Код: 6 символов - номер чека, переставленный секретной перестановкой,
+# и 2 символа подписи. Пока цел счетчик, коды не повторяются без проверки в БД; по порядку не перебираются
+BODY_LENGTH = 6
+TAG_LENGTH = 2
+BODY_SPACE = len(ALPHABET) ** BODY_LENGTH
+
+# Отсутствующее в кэше значение (None - закэшированный "чека нет")
+_MISSING = object()
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[index])
+    return "".join(reversed(chars))
+
+class CheckCodeRegistry:
+    """
+    Реестр кодов чеков.
+
+    • Коды выдаются из счетчика в Redis: номер переставляется сетью Фейстеля
+      с ключом из SECRET_KEY и дополняется HMAC-подписью
+    • Фильтр Блума в Redis (один BITFIELD на проверку) отсекает несуществующие
+      коды без обращения к БД; перестраивается при запуске, пополняется при создании
+    • Локальный LRU хранит параметры недавно запрошенных чеков и отрицательные ответы
+    """
+
+    def __init__(self, redis=None):
+        self.redis = redis or redis_client
+        self._key = hashlib.sha256(f"check-codes:{settings.SECRET_KEY}".encode()).digest()
+
+        # Оптимальные параметры фильтра для заданной емкости и доли ошибок
+        capacity = settings.CHECK_BLOOM_CAPACITY
+        error_rate = settings.CHECK_BLOOM_ERROR_RATE
+        self.bloom_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.bloom_hashes = max(1, round(self.bloom_bits / capacity * math.log(2)))
+
+        self._cache: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    # ==================== ВЫДАЧА КОДОВ ====================
+
+    def _round(self, value: int, round_index: int) -> int:
+        digest = hmac.new(self._key, f"{round_index}:{value}".encode(), hashlib.sha256).digest()
+        return int.from_bytes(digest[:2], "big")
+
+    def _permute(self, number: int) -> int:
+        """Перестановка [0, BODY_SPACE): 4 раунда Фейстеля на 32 битах с циклическим блужданием"""
+        value = number
+        while True:
+            left, right = value >> 16, value & 0xFFFF
+            for round_index in range(4):
+                left, right = right, left ^ self._round(right, round_index)
+            value = (left << 16) | right
+            if value < BODY_SPACE:
+                return value
+
+    def _tag(self, body: str) -> str:
+        digest = hmac.new(self._key, body.encode(), hashlib.sha256).digest()
+        return _encode(int.from_bytes(digest[:4], "big") % len(ALPHABET) ** TAG_LENGTH, TAG_LENGTH)
+
+    def verify(self, code: str) -> bool:
+        """Код выдан этим реестром (проверка подписи без обращений к Redis и БД)"""
+        if not CODE_PATTERN.match(code):
+            return False
+        body, tag = code[:BODY_LENGTH], code[BODY_LENGTH:]
+        return hmac.compare_digest(self._tag(body), tag)
+
+    async def next_code(self) -> str:
+        """Новый уникальный код чека"""
+        number = await self.redis.incr(CHECK_CODE_SEQ_KEY)
+        if number == 1:
+            # Счетчик пуст (новый Redis): продолжаем с номера не меньше числа созданных чеков
+            number = await self._restore_sequence()
+
+        if number >= BODY_SPACE:
+            raise RuntimeError("Check code space is exhausted")
+
+        body = _encode(self._permute(number), BODY_LENGTH)
+        return body + self._tag(body)
+
+    async def _restore_sequence(self) -> int:
+        async with get_session() as session:
+            max_id = (await session.execute(select(func.max(Check.id)))).scalar() or 0
+
+        # max(id) - только нижняя граница: номер расходуется и при неудачном создании чека,
+        # поэтому счетчик мог уйти вперед. Повторно выданный код отклонит уникальный индекс
+        # check_code, и CheckService.create_check возьмет следующий
+        if max_id:
+            await self.redis.set(CHECK_CODE_SEQ_KEY, max_id)
+            return await self.redis.incr(CHECK_CODE_SEQ_KEY)
+        return 1
+
+    # ==================== ФИЛЬТР БЛУМА ====================
+
+    def _positions(self, code: str) -> list[int]:
+        digest = hashlib.blake2b(code.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return [(first + index * second) % self.bloom_bits for index in range(self.bloom_hashes)]
+
+    async def might_exist(self, code: str) -> bool:
+        """False - чека с таким кодом точно нет"""
+        if settings.CHECK_CODE_VERIFY_TAG and not self.verify(code):
+            return False
+        if not CODE_PATTERN.match(code):
+            return False
+
+        args = []
+        for position in self._positions(code):
+            args.extend(("GET", "u1", position))
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.exists(CHECK_BLOOM_READY_KEY)
+                pipe.execute_command("BITFIELD", CHECK_BLOOM_KEY, *args)
+                ready, bits = await pipe.execute()
+        except Exception as e:
+            logger.error("💥 Check bloom lookup failed", error=str(e))
+            return True
+
+        # Фильтр еще не построен - ответить "нет" нельзя
+        return not ready or all(bits)
+
+    async def add(self, code: str) -> None:
+        """
+        Добавить код нового чека.
+        Если записать биты не удалось, фильтр снимается с готовности: иначе
+        might_exist() отвечал бы "нет" для уже созданного чека до перестройки
+        """
+        args = []
+        for position in self._positions(code):
+            args.extend(("SET", "u1", position, 1))
+        try:
+            await self.redis.execute_command("BITFIELD", CHECK_BLOOM_KEY, *args)
+        except Exception as e:
+            logger.error("💥 Check bloom add failed", code=code, error=str(e))
+            try:
+                await self.redis.delete(CHECK_BLOOM_READY_KEY)
+            except Exception as e:
+                logger.error("💥 Check bloom invalidation failed", error=str(e))
+
+    async def rebuild(self) -> int:
+        """
+        Построить фильтр по всем кодам из БД.
+        Выполняет один процесс: остальные видят блокировку и пропускают шаг
+        """
+        if not await self.redis.set(CHECK_BLOOM_REBUILD_LOCK, 1, nx=True, ex=300):
+            return 0
+
+        started = time.monotonic()
+        bits = bytearray((self.bloom_bits + 7) // 8)
+        count = 0
+
+        async with get_session() as session:
+            result = await session.stream(
+                select(Check.check_code).execution_options(yield_per=10000)
+            )
+            async for (code,) in result:
+                # Порядок битов как в Redis: бит 0 - старший бит первого байта
+                for position in self._positions(code):
+                    bits[position >> 3] |= 0x80 >> (position & 7)
+                count += 1
+
+        # OR с текущим фильтром: коды, созданные во время перестройки, не теряются
+        temp_key = f"{CHECK_BLOOM_KEY}:rebuild"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(temp_key, bytes(bits))
+            pipe.bitop("OR", CHECK_BLOOM_KEY, CHECK_BLOOM_KEY, temp_key)
+            pipe.delete(temp_key)
+            pipe.set(CHECK_BLOOM_READY_KEY, 1)
+            await pipe.execute()
+
+        logger.info(
+            "🌸 Check bloom filter rebuilt",
+            codes=count,
+            bits=self.bloom_bits,
+            hashes=self.bloom_hashes,
+            duration=round(time.monotonic() - started, 3)
+        )
+        return count
+
+    # ==================== ЛОКАЛЬНЫЙ КЭШ ====================
+
+    def cached(self, code: str) -> Any:
+        """Параметры чека из LRU, None - чека нет, _MISSING - нет в кэше"""
+        entry = self._cache.get(code)
+        if entry is None or entry[0] < time.monotonic():
+            observe_cache("check_code", hit=False)
+            return _MISSING
+        self._cache.move_to_end(code)
+        observe_cache("check_code", hit=True)
+        return entry[1]
+
+    def remember(self, code: str, meta: Any) -> None:
+        self._cache[code] = (time.monotonic() + settings.CHECK_CODE_CACHE_TTL, meta)
+        self._cache.move_to_end(code)
+        while len(self._cache) > settings.CHECK_CODE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def forget(self, code: str) -> None:
+        self._cache.pop(code, None)
+
+    @staticmethod
+    def is_missing(value: Any) -> bool:
+        return value is _MISSING
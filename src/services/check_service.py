@@ -1,37 +1,49 @@
 from __future__ import annotations
 
-import secrets
-import string
+import json
 from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Optional
 
 import structlog
-from sqlalchemy import select, func, and_, desc
+from sqlalchemy import select, and_, desc, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.database import get_session
 from app.database.models.check import Check, CheckActivation, CheckType, CheckStatus
-from app.database.models.user import User
-from app.database.models.transaction import TransactionType
+from app.database.redis import redis_client
 from app.services.user_service import UserService
 from app.services.transaction_service import TransactionService
+from app.services.anti_fraud_service import AntiFraudService
+from app.services.check_activation_engine import CHECK_INLINE_KEY, CheckActivationEngine, utc_timestamp
+from app.services.check_code_registry import CheckCodeRegistry
 from app.config.settings import settings
 
 logger = structlog.get_logger(__name__)
 
+# Попытки выдать свободный код чека (повторы после потери счетчика в Redis)
+CHECK_CODE_ATTEMPTS = 5
+
 class CheckService:
     """Сервис для работы с чеками"""
     
-    def __init__(self):
-        self.user_service = UserService()
-        self.transaction_service = TransactionService()
-    
-    def _generate_check_code(self) -> str:
-        """Генерация уникального кода чека"""
-        # Генерируем код из 8 символов (буквы + цифры)
-        alphabet = string.ascii_uppercase + string.digits
-        return ''.join(secrets.choice(alphabet) for _ in range(8))
+    def __init__(
+        self,
+        user_service: UserService | None = None,
+        transaction_service: TransactionService | None = None,
+        anti_fraud: AntiFraudService | None = None,
+        activation_engine: CheckActivationEngine | None = None,
+        code_registry: CheckCodeRegistry | None = None
+    ):
+        self.user_service = user_service or UserService()
+        self.transaction_service = transaction_service or TransactionService()
+        self.anti_fraud = anti_fraud or AntiFraudService()
+        self.code_registry = code_registry or CheckCodeRegistry()
+        self.activation_engine = activation_engine or CheckActivationEngine(
+            user_service=self.user_service,
+            code_registry=self.code_registry
+        )
     
     async def create_check(
         self,
@@ -69,56 +81,61 @@ class CheckService:
             # Рассчитываем сумму на активацию
             amount_per_activation = total_amount / max_activations
             
-            # Генерируем уникальный код
-            attempts = 0
-            while attempts < 10:
-                check_code = self._generate_check_code()
-                
-                # Проверяем уникальность
-                existing = await session.execute(
-                    select(Check).where(Check.check_code == check_code)
+            expires_at = None
+            if expires_in_hours:
+                expires_at = datetime.utcnow() + timedelta(hours=expires_in_hours)
+            
+            # Чек записывается до заморозки средств: код, повторно выданный после
+            # потери счетчика в Redis, отклоняет уникальный индекс - берем следующий
+            for attempt in range(CHECK_CODE_ATTEMPTS):
+                check_code = await self.code_registry.next_code()
+                check = Check(
+                    creator_id=creator_id,
+                    type=check_type,
+                    total_amount=total_amount,
+                    amount_per_activation=amount_per_activation,
+                    remaining_amount=total_amount,
+                    max_activations=max_activations,
+                    max_per_user=max_per_user,
+                    check_code=check_code,
+                    title=title,
+                    description=description,
+                    password=password,
+                    required_subscription_channel=required_subscription_channel,
+                    min_user_level=min_user_level,
+                    expires_at=expires_at
                 )
-                if not existing.scalar_one_or_none():
+                session.add(check)
+                try:
+                    await session.flush()
                     break
-                    
-                attempts += 1
+                except IntegrityError:
+                    await session.rollback()
+                    logger.warning("⚠️ Check code already used", check_code=check_code, attempt=attempt + 1)
             else:
-                logger.error("❌ Failed to generate unique check code")
+                logger.error("❌ Could not allocate check code", creator_id=creator_id)
                 return None
             
-            # Замораживаем средства у создателя
-            await self.user_service.freeze_balance(
+            # Замораживаем средства у создателя; без них чек не сохраняется
+            if not await self.user_service.freeze_balance(
                 creator_id,
                 total_amount,
                 f"Создание чека #{check_code}"
-            )
-            
-            # Создаем чек
-            expires_at = None
-            if expires_in_hours:
-                expires_at = datetime.utcnow() + timedelta(hours=expires_in_hours)
-            
-            check = Check(
-                creator_id=creator_id,
-                type=check_type,
-                total_amount=total_amount,
-                amount_per_activation=amount_per_activation,
-                remaining_amount=total_amount,
-                max_activations=max_activations,
-                max_per_user=max_per_user,
-                check_code=check_code,
-                title=title,
-                description=description,
-                password=password,
-                required_subscription_channel=required_subscription_channel,
-                min_user_level=min_user_level,
-                expires_at=expires_at
-            )
+            ):
+                await session.rollback()
+                return None
             
-            session.add(check)
             await session.commit()
             await session.refresh(check)
             
+            # Чек уже сохранен и средства заморожены: ошибки кэшей не должны
+            # выглядеть для создателя как неудача - иначе он создаст чек повторно
+            await self.code_registry.add(check_code)
+            try:
+                await self.refresh_inline_cards(creator_id)
+            except Exception as e:
+                logger.error("💥 Inline cards refresh failed", creator_id=creator_id, error=str(e))
+            
             logger.info(
                 "💳 Check created",
                 check_id=check.id,
@@ -132,6 +149,9 @@ class CheckService:
     
     async def get_check_by_code(self, check_code: str) -> Check | None:
         """Получить чек по коду"""
+        if not await self.code_registry.might_exist(check_code.upper()):
+            return None
+        
         async with get_session() as session:
             result = await session.execute(
                 select(Check).where(Check.check_code == check_code.upper())
@@ -149,129 +169,11 @@ class CheckService:
         Возвращает: (успех, сообщение, сумма)
         """
         
-        async with get_session() as session:
-            # Получаем чек
-            check = await self.get_check_by_code(check_code)
-            if not check:
-                return False, "❌ Чек не найден", Decimal("0")
-            
-            # Проверяем активность чека
-            if not check.is_active:
-                if check.status == CheckStatus.EXPIRED:
-                    return False, "⏰ Срок действия чека истек", Decimal("0")
-                elif check.status == CheckStatus.COMPLETED:
-                    return False, "✅ Чек уже полностью активирован", Decimal("0")
-                elif check.status == CheckStatus.CANCELLED:
-                    return False, "❌ Чек отменен", Decimal("0")
-                else:
-                    return False, "❌ Чек неактивен", Decimal("0")
-            
-            # Проверяем, не создатель ли пытается активировать
-            if check.creator_id == user_id:
-                return False, "❌ Нельзя активировать собственный чек", Decimal("0")
-            
-            # Проверяем пароль
-            if check.password and check.password != password:
-                return False, "🔒 Неверный пароль", Decimal("0")
-            
-            # Проверяем условия пользователя
-            user = await self.user_service.get_user(user_id)
-            if not user:
-                return False, "❌ Пользователь не найден", Decimal("0")
-            
-            # Проверяем минимальный уровень
-            if check.min_user_level:
-                level_hierarchy = ["bronze", "silver", "gold", "premium"]
-                if user.level not in level_hierarchy:
-                    return False, "❌ Неизвестный уровень пользователя", Decimal("0")
-                
-                required_index = level_hierarchy.index(check.min_user_level)
-                user_index = level_hierarchy.index(user.level)
-                
-                if user_index < required_index:
-                    level_names = {
-                        "bronze": "🥉 Bronze",
-                        "silver": "🥈 Silver",
-                        "gold": "🥇 Gold", 
-                        "premium": "💎 Premium"
-                    }
-                    required_level = level_names.get(check.min_user_level, check.min_user_level)
-                    return False, f"❌ Требуется уровень {required_level}", Decimal("0")
-            
-            # Проверяем лимит активаций на пользователя
-            user_activations = await session.execute(
-                select(func.count(CheckActivation.id))
-                .where(
-                    and_(
-                        CheckActivation.check_id == check.id,
-                        CheckActivation.user_id == user_id
-                    )
-                )
-            )
-            
-            user_activation_count = user_activations.scalar() or 0
-            if user_activation_count >= check.max_per_user:
-                return False, "❌ Вы уже активировали этот чек", Decimal("0")
-            
-            # Проверяем обязательную подписку
-            if check.required_subscription_channel:
-                # Здесь должна быть проверка подписки через Telegram API
-                # Пока что пропускаем эту проверку
-                pass
-            
-            # Активируем чек
-            activation = CheckActivation(
-                check_id=check.id,
-                user_id=user_id,
-                amount_received=check.amount_per_activation
-            )
-            
-            session.add(activation)
-            
-            # Обновляем чек
-            check.current_activations += 1
-            check.remaining_amount -= check.amount_per_activation
-            
-            # Проверяем завершение чека
-            if check.current_activations >= check.max_activations or check.remaining_amount <= 0:
-                check.status = CheckStatus.COMPLETED
-                
-                # Возвращаем оставшиеся средства создателю если есть
-                if check.remaining_amount > 0:
-                    await self.user_service.unfreeze_balance(
-                        check.creator_id,
-                        check.remaining_amount,
-                        f"Возврат средств с чека #{check.check_code}"
-                    )
-            
-            # Начисляем средства получателю
-            await self.user_service.update_balance(
-                user_id,
-                check.amount_per_activation,
-                TransactionType.CHECK_RECEIVED,
-                f"Получение чека #{check.check_code}",
-                str(check.id),
-                "check"
-            )
-            
-            # Списываем с создателя (размораживаем)
-            await self.user_service.unfreeze_balance(
-                check.creator_id,
-                check.amount_per_activation,
-                f"Активация чека #{check.check_code} пользователем @{user.username or user.telegram_id}"
-            )
-            
-            await session.commit()
-            
-            logger.info(
-                "💳 Check activated",
-                check_id=check.id,
-                check_code=check.check_code,
-                user_id=user_id,
-                amount=float(check.amount_per_activation)
-            )
-            
-            return True, "✅ Чек успешно активирован!", check.amount_per_activation
+        if not await self.anti_fraud.record(user_id, "check_activations"):
+            return False, "🚫 Слишком много активаций. Попробуйте позже", Decimal("0")
+        
+        # Допуск через счетчики Redis, запись в БД пачками
+        return await self.activation_engine.activate(check_code, user_id, password)
     
     async def get_user_checks(
         self,
@@ -331,6 +233,8 @@ class CheckService:
                 )
             
             await session.commit()
+            await self.activation_engine.invalidate(check.id, check.check_code)
+            await self.refresh_inline_cards(creator_id)
             
             logger.info(
                 "❌ Check cancelled",
@@ -341,33 +245,135 @@ class CheckService:
             
             return True
     
-    async def get_check_analytics(self, check_id: int) -> dict | None:
-        """Получить аналитику чека"""
+    @staticmethod
+    def _summarize(check: Check) -> dict:
+        """Показатели, которые считаются по строке чека без активаций"""
+        return {
+            'check': check,
+            'total_distributed': float(check.total_amount - check.remaining_amount),
+            'completion_percentage': (check.current_activations / check.max_activations * 100) if check.max_activations > 0 else 0,
+            'is_expired': check.expires_at and datetime.utcnow() > check.expires_at if check.expires_at else False
+        }
+    
+    async def get_check_summary(self, check_id: int) -> dict | None:
+        """Сводка чека для экранов управления и копирования кода (один запрос по PK)"""
         async with get_session() as session:
-            check = await session.execute(
-                select(Check).where(Check.id == check_id)
-            )
-            check = check.scalar_one_or_none()
+            check = await session.get(Check, check_id)
             
             if not check:
                 return None
             
-            # Статистика активаций
-            activations = await session.execute(
-                select(CheckActivation)
+            return self._summarize(check)
+    
+    async def get_check_analytics(self, check_id: int, recent_limit: int = 5) -> dict | None:
+        """
+        Получить аналитику чека.
+        Счетчики и суммы считаются агрегатами в БД, из строк активаций
+        загружаются только первые и последние recent_limit
+        """
+        async with get_session() as session:
+            check = await session.get(Check, check_id)
+            
+            if not check:
+                return None
+            
+            stats = (await session.execute(
+                select(
+                    func.count(CheckActivation.id),
+                    func.count(func.distinct(CheckActivation.user_id)),
+                    func.coalesce(func.sum(CheckActivation.amount_received), 0),
+                    func.min(CheckActivation.activated_at),
+                    func.max(CheckActivation.activated_at)
+                ).where(CheckActivation.check_id == check_id)
+            )).one()
+            
+            # Только нужные колонки: без ORM-объектов и подгрузки пользователей
+            columns = (
+                CheckActivation.user_id,
+                CheckActivation.amount_received,
+                CheckActivation.activated_at
+            )
+            first_activations = (await session.execute(
+                select(*columns)
+                .where(CheckActivation.check_id == check_id)
+                .order_by(CheckActivation.activated_at, CheckActivation.id)
+                .limit(recent_limit)
+            )).all()
+            recent_activations = (await session.execute(
+                select(*columns)
                 .where(CheckActivation.check_id == check_id)
-                .order_by(CheckActivation.activated_at)
+                .order_by(desc(CheckActivation.activated_at), desc(CheckActivation.id))
+                .limit(recent_limit)
+            )).all()
+            
+            analytics = self._summarize(check)
+            analytics.update({
+                'total_activations': stats[0],
+                'unique_users': stats[1],
+                'activations_sum': Decimal(stats[2]),
+                'first_activation_at': stats[3],
+                'last_activation_at': stats[4],
+                'first_activations': list(first_activations),
+                # В хронологическом порядке
+                'recent_activations': list(reversed(recent_activations)),
+            })
+            return analytics
+    
+    async def get_inline_cards(self, creator_id: int) -> list[dict]:
+        """
+        Карточки активных чеков создателя для inline-запросов.
+        Кэш в Redis обновляется при создании, отмене, истечении и завершении чеков,
+        поэтому inline-запросы обслуживаются без обращения к БД
+        """
+        try:
+            cached = await redis_client.get(CHECK_INLINE_KEY.format(creator_id=creator_id))
+        except Exception as e:
+            logger.error("💥 Inline cards cache read failed", creator_id=creator_id, error=str(e))
+            cached = None
+        
+        if cached is not None:
+            return json.loads(cached)
+        
+        return await self.refresh_inline_cards(creator_id)
+    
+    async def refresh_inline_cards(self, creator_id: int) -> list[dict]:
+        """Пересобрать карточки чеков создателя из БД"""
+        async with get_session() as session:
+            result = await session.execute(
+                select(Check)
+                .where(
+                    and_(
+                        Check.creator_id == creator_id,
+                        Check.status == CheckStatus.ACTIVE
+                    )
+                )
+                .order_by(desc(Check.created_at))
+                .limit(settings.CHECK_INLINE_MAX_RESULTS)
             )
-            activations_list = list(activations.scalars().all())
-            
-            return {
-                'check': check,
-                'total_activations': len(activations_list),
-                'total_distributed': float(check.total_amount - check.remaining_amount),
-                'completion_percentage': (check.current_activations / check.max_activations * 100) if check.max_activations > 0 else 0,
-                'activations': activations_list,
-                'is_expired': check.expires_at and datetime.utcnow() > check.expires_at if check.expires_at else False
+            checks = result.scalars().all()
+        
+        cards = [
+            {
+                "code": check.check_code,
+                "amount": str(check.amount_per_activation),
+                "max_activations": check.max_activations,
+                "description": check.description or "",
+                "has_password": bool(check.password),
+                "expires_at": utc_timestamp(check.expires_at) if check.expires_at else None,
             }
+            for check in checks
+        ]
+        
+        try:
+            await redis_client.set(
+                CHECK_INLINE_KEY.format(creator_id=creator_id),
+                json.dumps(cards, ensure_ascii=False),
+                ex=settings.CHECK_INLINE_CACHE_TTL
+            )
+        except Exception as e:
+            logger.error("💥 Inline cards cache write failed", creator_id=creator_id, error=str(e))
+        
+        return cards
     
     async def cleanup_expired_checks(self) -> int:
         """Очистка истекших чеков"""
@@ -383,6 +389,7 @@ class CheckService:
             )
             
             count = 0
+            expired = []
             for check in expired_checks.scalars():
                 check.status = CheckStatus.EXPIRED
                 
@@ -394,10 +401,17 @@ class CheckService:
                         f"Истечение срока чека #{check.check_code}"
                     )
                 
+                expired.append(check)
                 count += 1
             
             await session.commit()
             
+            for check in expired:
+                await self.activation_engine.invalidate(check.id, check.check_code)
+            
+            for creator_id in {check.creator_id for check in expired}:
+                await self.refresh_inline_cards(creator_id)
+            
             if count > 0:
                 logger.info("🧹 Expired checks cleaned up", count=count)
             
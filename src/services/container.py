@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict
+
+import structlog
+
+from app.database.redis import close_redis
+from app.services.anti_fraud_service import AntiFraudService
+from app.services.check_activation_engine import CheckActivationEngine
+from app.services.check_code_registry import CheckCodeRegistry
+from app.services.check_service import CheckService
+from app.services.crypto_payment_service import CryptoPaymentService
+from app.services.dedupe_store import DedupeStore
+from app.services.notification_service import NotificationService
+from app.services.payment_settlement import PaymentSettlementEngine
+from app.services.settings_service import SettingsService
+from app.services.subscription_service import SubscriptionService
+from app.services.task_service import TaskService
+from app.services.telegram_api_service import TelegramAPIService
+from app.services.transaction_service import TransactionService
+from app.services.user_service import UserService
+
+logger = structlog.get_logger(__name__)
+
+class ServiceContainer:
+    """
+    Общие экземпляры сервисов процесса.
+    Сервисы не хранят состояние запроса, поэтому один граф
+    создается при старте и передается во все обработчики
+    """
+
+    def __init__(self):
+        self.anti_fraud = AntiFraudService()
+        self.dedupe = DedupeStore()
+        self.user_service = UserService(anti_fraud=self.anti_fraud)
+        self.transaction_service = TransactionService(
+            settlement=PaymentSettlementEngine(user_service=self.user_service)
+        )
+        self.settings_service = SettingsService()
+
+        self.task_service = TaskService(
+            user_service=self.user_service,
+            transaction_service=self.transaction_service,
+            anti_fraud=self.anti_fraud
+        )
+        self.check_code_registry = CheckCodeRegistry()
+        self.check_activation_engine = CheckActivationEngine(
+            user_service=self.user_service,
+            code_registry=self.check_code_registry
+        )
+        self.check_service = CheckService(
+            user_service=self.user_service,
+            transaction_service=self.transaction_service,
+            anti_fraud=self.anti_fraud,
+            activation_engine=self.check_activation_engine,
+            code_registry=self.check_code_registry
+        )
+        self._bloom_task: asyncio.Task | None = None
+
+        self.telegram_api = TelegramAPIService()
+        self.subscription_service = SubscriptionService(telegram_api=self.telegram_api)
+        self.notification_service = NotificationService(settings_service=self.settings_service)
+        self.crypto_payments = CryptoPaymentService(
+            transaction_service=self.transaction_service,
+            notification_service=self.notification_service
+        )
+
+        # Готовый набор для внедрения в обработчики
+        self._handler_data: Dict[str, Any] = {
+            "user_service": self.user_service,
+            "transaction_service": self.transaction_service,
+            "settings_service": self.settings_service,
+            "task_service": self.task_service,
+            "check_service": self.check_service,
+            "subscription_service": self.subscription_service,
+            "notification_service": self.notification_service,
+            "dedupe_store": self.dedupe,
+            "crypto_payments": self.crypto_payments,
+        }
+
+    def handler_data(self) -> Dict[str, Any]:
+        """Сервисы для внедрения в данные обработчика"""
+        return self._handler_data
+
+    async def startup(self) -> None:
+        """Открыть ресурсы сервисов (HTTP-сессии)"""
+        await self.telegram_api.startup()
+        await self.check_activation_engine.start()
+        # Фильтр Блума строится в фоне: до готовности проверка кодов пропускает все
+        self._bloom_task = asyncio.create_task(self._rebuild_check_codes())
+        logger.info("✅ Services started")
+
+    async def _rebuild_check_codes(self) -> None:
+        try:
+            await self.check_code_registry.rebuild()
+        except Exception as e:
+            logger.error("💥 Check bloom rebuild failed", error=str(e))
+
+    async def shutdown(self) -> None:
+        """Закрыть ресурсы сервисов"""
+        if self._bloom_task:
+            self._bloom_task.cancel()
+            await asyncio.gather(self._bloom_task, return_exceptions=True)
+
+        # Сначала дописываем принятые активации чеков, пока открыты БД и Redis
+        await self.check_activation_engine.stop()
+        await self.telegram_api.close()
+        await close_redis()
+        logger.info("✅ Services stopped")
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from decimal import Decimal
+from typing import Any, Dict
+
+import structlog
+
+from app.config.settings import settings
+from app.database.redis import redis_client
+from app.services.cryptobot_service import CryptoBotService
+from app.services.notification_service import NotificationService
+from app.services.transaction_service import TransactionService
+
+logger = structlog.get_logger(__name__)
+
+CRYPTO_INVOICE_KEY = "cryptobot:invoice:{invoice_id}"
+# Неоплаченные инвойсы: invoice_id -> время создания
+CRYPTO_PENDING_KEY = "cryptobot:pending"
+# Запрос внеочередной проверки от кнопки "Проверить оплату"
+CRYPTO_POLL_REQUEST_KEY = "cryptobot:poll_requested"
+# Минимальный интервал между внеочередными опросами (сек)
+MIN_REQUESTED_POLL_GAP = 5
+
+class CryptoPaymentService:
+    """
+    Пополнения через CryptoBot.
+
+    Инвойс создается через Crypto Pay API, его состояние хранится в Redis.
+    Оплату подтверждает webhook CryptoBot или CryptoInvoicePoller,
+    зачисление идет через идемпотентный PaymentSettlementEngine,
+    поэтому webhook и опрос могут прийти в любом порядке и сколько угодно раз
+    """
+
+    def __init__(
+        self,
+        transaction_service: TransactionService | None = None,
+        notification_service: NotificationService | None = None,
+        cryptobot: CryptoBotService | None = None,
+        redis=None
+    ):
+        self.transaction_service = transaction_service or TransactionService()
+        self.notification_service = notification_service or NotificationService()
+        self.cryptobot = cryptobot or CryptoBotService()
+        self.redis = redis or redis_client
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.CRYPTOBOT_API_TOKEN)
+
+    async def create_invoice(self, user_id: int, package: Dict[str, Any]) -> Dict[str, Any] | None:
+        """Создать инвойс и поставить его на отслеживание"""
+        gram = int(package["gram"])
+
+        # Payload подписан CryptoBot в webhook: зачисление не зависит от состояния в Redis
+        invoice = await self.cryptobot.create_invoice(
+            amount=package["amount"],
+            currency=package["currency"],
+            description=f"Пополнение PR GRAM Bot - {gram:,} GRAM",
+            payload=f"{user_id}:{gram}",
+            return_url=f"https://t.me/{settings.BOT_USERNAME}",
+            expires_in=settings.CRYPTOBOT_INVOICE_TTL
+        )
+        if not invoice:
+            return None
+
+        invoice_id = invoice["invoice_id"]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(
+                CRYPTO_INVOICE_KEY.format(invoice_id=invoice_id),
+                mapping={"user_id": user_id, "gram": gram, "status": "active"}
+            )
+            pipe.expire(CRYPTO_INVOICE_KEY.format(invoice_id=invoice_id), settings.CRYPTOBOT_INVOICE_TTL * 2)
+            pipe.zadd(CRYPTO_PENDING_KEY, {invoice_id: time.time()})
+            await pipe.execute()
+
+        return invoice
+
+    async def get_invoice_state(self, invoice_id: int) -> Dict[str, str]:
+        """Состояние инвойса из Redis (без запроса к API)"""
+        return await self.redis.hgetall(CRYPTO_INVOICE_KEY.format(invoice_id=invoice_id))
+
+    async def request_check(self) -> None:
+        """Попросить опрос раньше срока: любое число нажатий - не больше одного запроса к API"""
+        await self.redis.set(CRYPTO_POLL_REQUEST_KEY, 1, ex=settings.CRYPTOBOT_POLL_INTERVAL)
+
+    async def _finish(self, invoice_id: int, status: str) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(CRYPTO_INVOICE_KEY.format(invoice_id=invoice_id), "status", status)
+            pipe.zrem(CRYPTO_PENDING_KEY, invoice_id)
+            await pipe.execute()
+
+    async def settle_invoice(self, invoice: Dict[str, Any]) -> bool:
+        """Обработать инвойс из webhook или getInvoices. True - платеж зачислен (сейчас или раньше)"""
+        invoice_id = invoice["invoice_id"]
+        status = invoice.get("status")
+
+        if status == "expired":
+            await self._finish(invoice_id, "expired")
+            return False
+        if status != "paid":
+            return False
+
+        try:
+            user_id, gram = (int(part) for part in invoice["payload"].split(":"))
+        except (KeyError, ValueError):
+            logger.error("❌ Unknown CryptoBot invoice payload", invoice_id=invoice_id)
+            await self._finish(invoice_id, "invalid")
+            return False
+
+        result = await self.transaction_service.process_crypto_payment(
+            user_id=user_id,
+            payment_id=f"cryptobot:{invoice_id}",
+            gram_amount=Decimal(gram),
+            description=f"Пополнение через CryptoBot: {invoice.get('amount')} {invoice.get('asset')} → {gram:,} GRAM"
+        )
+        if not result:
+            return False
+
+        await self._finish(invoice_id, "paid")
+
+        if result["created"]:
+            logger.info("💎 CryptoBot payment settled", invoice_id=invoice_id, user_id=user_id, gram=gram)
+            await self.notification_service.notify(
+                user_id,
+                f"🎉 <b>КРИПТОПЛАТЕЖ ОБРАБОТАН!</b>\n\n"
+                f"💎 Оплачено: {invoice.get('amount')} {invoice.get('asset')}\n"
+                f"💰 Зачислено: {gram:,} GRAM\n"
+                f"💳 Ваш баланс: {result['balance']:,.0f} GRAM"
+            )
+
+        return True
+
+    async def poll_pending(self) -> int:
+        """Проверить все неоплаченные инвойсы пачками getInvoices. Возвращает число зачисленных"""
+        # Инвойсы без ответа дольше двойного срока жизни больше не отслеживаем
+        await self.redis.zremrangebyscore(
+            CRYPTO_PENDING_KEY, "-inf", time.time() - settings.CRYPTOBOT_INVOICE_TTL * 2
+        )
+        invoice_ids = [int(invoice_id) for invoice_id in await self.redis.zrange(CRYPTO_PENDING_KEY, 0, -1)]
+
+        settled = 0
+        batch_size = min(settings.CRYPTOBOT_POLL_BATCH, 1000)
+        for start in range(0, len(invoice_ids), batch_size):
+            invoices = await self.cryptobot.get_invoices(invoice_ids[start:start + batch_size])
+            if invoices is None:
+                # Ошибка API: остальные пачки проверим в следующий раз
+                break
+
+            for invoice in invoices:
+                try:
+                    if await self.settle_invoice(invoice):
+                        settled += 1
+                except Exception as e:
+                    logger.error("💥 CryptoBot invoice settlement failed", invoice_id=invoice.get("invoice_id"), error=str(e))
+
+        return settled
+
+class CryptoInvoicePoller:
+    """
+    Резервная проверка оплат, если webhook не дошел.
+    Работает в одном процессе; нажатия "Проверить оплату" только ускоряют
+    следующий опрос, а не вызывают API сами
+    """
+
+    def __init__(self, payments: CryptoPaymentService):
+        self.payments = payments
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self.payments.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        last_poll = 0.0
+        redis = self.payments.redis
+
+        while True:
+            try:
+                elapsed = time.monotonic() - last_poll
+                requested = elapsed >= MIN_REQUESTED_POLL_GAP and await redis.getdel(CRYPTO_POLL_REQUEST_KEY)
+                if requested or elapsed >= settings.CRYPTOBOT_POLL_INTERVAL:
+                    last_poll = time.monotonic()
+                    settled = await self.payments.poll_pending()
+                    if settled:
+                        logger.info("💎 CryptoBot invoices settled by poller", count=settled)
+            except Exception as e:
+                logger.error("💥 CryptoBot poller error", error=str(e))
+
+            await asyncio.sleep(1)
@@ -14,7 +14,7 @@ class CryptoBotService:
     def __init__(self):
         self.api_token = settings.CRYPTOBOT_API_TOKEN
         self.webhook_secret = settings.CRYPTOBOT_WEBHOOK_SECRET
-        self.base_url = "https://pay.crypt.bot/api"
+        self.base_url = settings.CRYPTOBOT_API_URL
     
     async def create_invoice(
         self,
@@ -22,7 +22,8 @@ class CryptoBotService:
         currency: str,
         description: str,
         payload: str,
-        return_url: Optional[str] = None
+        return_url: Optional[str] = None,
+        expires_in: Optional[int] = None
     ) -> Optional[Dict[str, Any]]:
         """Создать инвойс в CryptoBot"""
         
@@ -35,6 +36,8 @@ class CryptoBotService:
             "paid_btn_name": "callback",
             "paid_btn_url": return_url or f"https://t.me/{settings.BOT_USERNAME}"
         }
+        if expires_in:
+            data["expires_in"] = expires_in
         
         headers = {
             "Crypto-Pay-API-Token": self.api_token,
@@ -101,6 +104,39 @@ class CryptoBotService:
             logger.error("💥 CryptoBot API error", error=str(e), exc_info=True)
             return None
     
+    async def get_invoices(self, invoice_ids: list[int]) -> Optional[list[Dict[str, Any]]]:
+        """Получить несколько инвойсов одним запросом (до 1000 ID)"""
+        
+        headers = {
+            "Crypto-Pay-API-Token": self.api_token
+        }
+        
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    f"{self.base_url}/getInvoices",
+                    params={
+                        "invoice_ids": ",".join(str(invoice_id) for invoice_id in invoice_ids),
+                        "count": len(invoice_ids)
+                    },
+                    headers=headers
+                ) as response:
+                    result = await response.json()
+                    
+                    if response.status == 200 and result.get("ok"):
+                        return result["result"]["items"]
+                    else:
+                        logger.error(
+                            "❌ CryptoBot get invoices failed",
+                            error=result.get("error"),
+                            count=len(invoice_ids)
+                        )
+                        return None
+                        
+        except Exception as e:
+            logger.error("💥 CryptoBot API error", error=str(e), exc_info=True)
+            return None
+    
     async def get_balance(self) -> Optional[Dict[str, Any]]:
         """Получить баланс кошелька"""
         
@@ -127,12 +163,17 @@ class CryptoBotService:
             return None
     
     def verify_webhook_signature(self, body: str, signature: str) -> bool:
-        """Проверить подпись webhook"""
-        if not self.webhook_secret:
+        """Проверить подпись webhook (заголовок crypto-pay-api-signature)"""
+        # По документации Crypto Pay ключ подписи - SHA256 от токена API
+        if self.webhook_secret:
+            key = self.webhook_secret.encode()
+        elif self.api_token:
+            key = hashlib.sha256(self.api_token.encode()).digest()
+        else:
             return False
         
         expected_signature = hmac.new(
-            self.webhook_secret.encode(),
+            key,
             body.encode(),
             hashlib.sha256
         ).hexdigest()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import structlog
+
+from app.config.settings import settings
+from app.database.redis import redis_client
+
+logger = structlog.get_logger(__name__)
+
+DEDUPE_KEY = "dedupe:{scope}:{key}"
+
+# Состояния ключа
+_PROCESSING = "processing"
+_DONE = "done"
+
+# Перехват метки обработки у упавшего процесса; обработанный ключ не трогаем
+TAKE_OVER_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+class DedupeStore:
+    """
+    Защита от повторной обработки (повторные доставки webhook, повтор
+    очереди после падения, дубли платежей).
+    Ключ сначала занимается с коротким TTL на время обработки: если процесс
+    упадет, повтор станет возможен. После успеха ключ хранится DEDUPE_TTL
+    """
+
+    def __init__(self, redis=None):
+        self.redis = redis or redis_client
+        self._take_over = self.redis.register_script(TAKE_OVER_SCRIPT)
+
+    async def claim(self, scope: str, key: str | int) -> bool:
+        """Занять ключ. False - уже обработан или обрабатывается сейчас"""
+        try:
+            claimed = await self.redis.set(
+                DEDUPE_KEY.format(scope=scope, key=key),
+                _PROCESSING,
+                ex=settings.DEDUPE_PROCESSING_TTL,
+                nx=True
+            )
+        except Exception as e:
+            # Без Redis остаются уникальные ограничения в БД
+            logger.error("💥 Dedupe claim failed", scope=scope, key=key, error=str(e))
+            return True
+
+        return bool(claimed)
+
+    async def take_over(self, scope: str, key: str | int) -> bool:
+        """
+        Занять ключ при повторе брошенной обработки (очередь забрала обновление
+        упавшего процесса): метка "обрабатывается" перехватывается.
+        False - ключ уже обработан
+        """
+        try:
+            claimed = await self._take_over(
+                keys=[DEDUPE_KEY.format(scope=scope, key=key)],
+                args=[_DONE, _PROCESSING, settings.DEDUPE_PROCESSING_TTL]
+            )
+        except Exception as e:
+            logger.error("💥 Dedupe take over failed", scope=scope, key=key, error=str(e))
+            return True
+
+        return bool(claimed)
+
+    async def complete(self, scope: str, key: str | int) -> None:
+        """Отметить ключ обработанным"""
+        try:
+            await self.redis.set(DEDUPE_KEY.format(scope=scope, key=key), _DONE, ex=settings.DEDUPE_TTL)
+        except Exception as e:
+            logger.error("💥 Dedupe complete failed", scope=scope, key=key, error=str(e))
+
+    async def release(self, scope: str, key: str | int) -> None:
+        """Освободить ключ после ошибки, чтобы повтор был обработан"""
+        try:
+            await self.redis.delete(DEDUPE_KEY.format(scope=scope, key=key))
+        except Exception as e:
+            logger.error("💥 Dedupe release failed", scope=scope, key=key, error=str(e))
@@ -0,0 +1,197 @@
+"""
+Метрики Prometheus.
+
+Все метрики процесса объявлены здесь, горячие пути только вызывают
+observe/inc. Без установленного prometheus_client метрики превращаются
+в пустые заглушки, поведение бота не меняется.
+
+В webhook режиме с несколькими процессами используется multiprocess-режим
+prometheus_client (PROMETHEUS_MULTIPROC_DIR): /metrics любого процесса
+отдает сумму по всем процессам.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable
+
+import structlog
+
+from app.config.settings import settings
+
+try:
+    import prometheus_client
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram
+except ImportError:
+    prometheus_client = None
+
+logger = structlog.get_logger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+class _NoopMetric:
+    """Заглушка метрики, когда prometheus_client не установлен или метрики выключены"""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+def _metric(factory_name: str, *args: Any, **kwargs: Any):
+    if prometheus_client is None or not settings.METRICS_ENABLED:
+        return _NoopMetric()
+    factory = getattr(prometheus_client, factory_name)
+    if factory_name != "Gauge":
+        kwargs.pop("multiprocess_mode", None)
+    return factory(*args, **kwargs)
+
+# ==================== МЕТРИКИ ====================
+
+HANDLER_LATENCY = _metric(
+    "Histogram", "bot_handler_duration_seconds", "Время обработки события (с middlewares)",
+    ["router", "handler"], buckets=LATENCY_BUCKETS
+)
+HANDLER_ERRORS = _metric(
+    "Counter", "bot_handler_errors_total", "Необработанные исключения обработчиков",
+    ["router", "handler"]
+)
+
+DB_QUERY_LATENCY = _metric(
+    "Histogram", "db_query_duration_seconds", "Время выполнения SQL запроса",
+    ["operation"], buckets=DB_BUCKETS
+)
+DB_POOL_CHECKED_OUT = _metric(
+    "Gauge", "db_pool_checked_out", "Соединения, выданные из пула",
+    multiprocess_mode="livesum"
+)
+
+TELEGRAM_API_LATENCY = _metric(
+    "Histogram", "telegram_api_duration_seconds", "Время запроса к Bot API",
+    ["method"], buckets=LATENCY_BUCKETS
+)
+TELEGRAM_API_RETRY_AFTER = _metric(
+    "Counter", "telegram_api_retry_after_total", "Ответы 429 (flood control) от Bot API",
+    ["method"]
+)
+TELEGRAM_API_ERRORS = _metric(
+    "Counter", "telegram_api_errors_total", "Ошибки запросов к Bot API",
+    ["method"]
+)
+
+LEDGER_OPERATIONS = _metric(
+    "Counter", "ledger_operations_total", "Записанные транзакции по типу",
+    ["type"]
+)
+
+CACHE_REQUESTS = _metric(
+    "Counter", "cache_requests_total", "Обращения к кэшам (hit/miss)",
+    ["cache", "result"]
+)
+
+QUEUE_DEPTH = _metric(
+    "Gauge", "queue_depth", "Необработанные элементы очередей",
+    ["queue"], multiprocess_mode="max"
+)
+
+# ==================== ХЕЛПЕРЫ ====================
+
+def observe_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+def _registry():
+    """Реестр для выдачи: в multiprocess-режиме собирается из файлов всех процессов"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+async def metrics_handler(request):
+    """GET /metrics для aiohttp приложения"""
+    from aiohttp import web
+
+    if prometheus_client is None or not settings.METRICS_ENABLED:
+        return web.Response(status=404)
+
+    body = prometheus_client.generate_latest(_registry())
+    return web.Response(body=body, headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+def start_metrics_server() -> None:
+    """Отдельный порт с метриками (polling и обработчики очереди)"""
+    if prometheus_client is None or not settings.METRICS_ENABLED:
+        return
+    prometheus_client.start_http_server(settings.PROMETHEUS_PORT, registry=_registry())
+    logger.info("📊 Metrics server started", port=settings.PROMETHEUS_PORT)
+
+def mark_process_dead(pid: int) -> None:
+    """Убрать gauge завершившегося процесса из multiprocess-суммы"""
+    if prometheus_client is not None and "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
+
+def instrument_engine(engine) -> None:
+    """Время запросов и занятость пула движка SQLAlchemy"""
+    if prometheus_client is None or not settings.METRICS_ENABLED:
+        return
+
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start_time = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else "OTHER"
+        DB_QUERY_LATENCY.labels(operation=operation).observe(time.perf_counter() - context._metrics_start_time)
+
+    @event.listens_for(engine.sync_engine.pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine.sync_engine.pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+class QueueDepthCollector:
+    """Периодически снимает длину очередей Redis (в одном процессе)"""
+
+    def __init__(self, probes: dict[str, Callable[[], Awaitable[int]]], interval: float = 15):
+        self.probes = probes
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if prometheus_client is not None and settings.METRICS_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            for queue, probe in self.probes.items():
+                try:
+                    QUEUE_DEPTH.labels(queue=queue).set(await probe())
+                except Exception as e:
+                    logger.error("💥 Queue depth probe failed", queue=queue, error=str(e))
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import structlog
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
+from redis.exceptions import ResponseError
+
+from app.config.settings import settings
+from app.database.redis import redis_client
+from app.services.settings_service import SettingsService
+from app.services.user_service import UserService
+
+logger = structlog.get_logger(__name__)
+
+# Очередь исходящих сообщений (Redis Stream переживает перезапуск)
+NOTIFICATION_STREAM = "notifications:stream"
+NOTIFICATION_GROUP = "notification-senders"
+
+# Сколько раз повторять отправку при сетевых ошибках
+MAX_SEND_ATTEMPTS = 3
+
+class NotificationService:
+    """Постановка уведомлений и рассылок в очередь"""
+
+    def __init__(self, redis=None, settings_service: SettingsService | None = None):
+        self.redis = redis or redis_client
+        self.settings_service = settings_service or SettingsService()
+
+    @staticmethod
+    def _build_entry(
+        chat_id: int,
+        text: str,
+        reply_markup: InlineKeyboardMarkup | None = None
+    ) -> Dict[str, str]:
+        return {
+            'chat_id': str(chat_id),
+            'text': text,
+            'reply_markup': reply_markup.model_dump_json(exclude_none=True) if reply_markup else "",
+            'attempts': "0"
+        }
+
+    async def notify(
+        self,
+        chat_id: int,
+        text: str,
+        reply_markup: InlineKeyboardMarkup | None = None
+    ) -> None:
+        """Поставить одно сообщение в очередь"""
+        await self.redis.xadd(NOTIFICATION_STREAM, self._build_entry(chat_id, text, reply_markup))
+
+    async def enqueue_broadcast(
+        self,
+        text: str,
+        notification_type: str = "admin",
+        reply_markup: InlineKeyboardMarkup | None = None
+    ) -> int:
+        """
+        Поставить рассылку в очередь.
+        Получатели читаются потоком, в Redis пишутся пачками BATCH_NOTIFICATION_SIZE
+        """
+        total = 0
+        pipe = self.redis.pipeline(transaction=False)
+
+        async for user_id in self.settings_service.iter_users_with_notifications_enabled(
+            notification_type,
+            batch_size=settings.BATCH_NOTIFICATION_SIZE
+        ):
+            pipe.xadd(NOTIFICATION_STREAM, self._build_entry(user_id, text, reply_markup))
+            total += 1
+
+            if total % settings.BATCH_NOTIFICATION_SIZE == 0:
+                await pipe.execute()
+
+        await pipe.execute()
+
+        logger.info(
+            "📢 Broadcast enqueued",
+            notification_type=notification_type,
+            recipients=total
+        )
+
+        return total
+
+    async def get_queue_depth(self) -> int:
+        """Количество сообщений в очереди"""
+        return await self.redis.xlen(NOTIFICATION_STREAM)
+
+class _TokenBucket:
+    """Глобальный лимит отправки (сообщений в секунду)"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Остановить отправку (ответ 429 от Telegram)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class NotificationSender:
+    """
+    Пул отправки сообщений из очереди.
+    Соблюдает глобальный лимит Telegram (~30 сообщений/сек) и лимит на чат,
+    сообщения одного чата уходят строго по порядку и по одному за раз.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        redis=None,
+        senders: int | None = None,
+        user_service: UserService | None = None
+    ):
+        self.bot = bot
+        self.redis = redis or redis_client
+        self.senders = senders or settings.NOTIFICATION_SENDERS
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.user_service = user_service or UserService()
+
+        self._bucket = _TokenBucket(settings.NOTIFICATION_GLOBAL_RATE)
+        # Интервал между сообщениями одному чату
+        self._chat_interval = max(1.0, 60 / settings.NOTIFICATION_RATE_LIMIT)
+
+        # Очереди по чатам и чаты, готовые к отправке
+        self._chats: Dict[int, Deque[tuple[str, Dict[str, str]]]] = {}
+        self._next_allowed: Dict[int, float] = {}
+        self._ready: asyncio.Queue[int] = asyncio.Queue()
+        self._buffered = 0
+        self._max_buffered = settings.BATCH_NOTIFICATION_SIZE * 10
+
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Запустить чтение очереди и пул отправителей"""
+        try:
+            await self.redis.xgroup_create(NOTIFICATION_STREAM, NOTIFICATION_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        self._tasks.append(asyncio.create_task(self._read_loop()))
+        self._tasks.extend(asyncio.create_task(self._send_loop()) for _ in range(self.senders))
+
+        logger.info("📬 Notification sender started", consumer=self.consumer, senders=self.senders)
+
+    async def stop(self) -> None:
+        """Остановить отправку. Неподтвержденные сообщения останутся в очереди"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        logger.info("📭 Notification sender stopped", buffered=self._buffered)
+
+    # ==================== ЧТЕНИЕ ОЧЕРЕДИ ====================
+
+    async def _read_loop(self) -> None:
+        # Забираем зависшие сообщения упавших отправителей, затем
+        # дочитываем свои неподтвержденные и только потом новые
+        await self._claim_abandoned()
+        last_id = "0"
+
+        while True:
+            try:
+                if self._buffered >= self._max_buffered:
+                    await asyncio.sleep(0.1)
+                    continue
+
+                reading_pending = last_id != ">"
+                response = await self.redis.xreadgroup(
+                    NOTIFICATION_GROUP,
+                    self.consumer,
+                    {NOTIFICATION_STREAM: last_id},
+                    count=settings.BATCH_NOTIFICATION_SIZE,
+                    block=None if reading_pending else 5000
+                )
+
+                entries = response[0][1] if response else []
+                if reading_pending:
+                    last_id = entries[-1][0] if entries else ">"
+
+                for entry_id, fields in entries:
+                    self._enqueue_local(entry_id, fields)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("💥 Notification queue read failed", error=str(e))
+                await asyncio.sleep(1)
+
+    async def _claim_abandoned(self) -> None:
+        """Перехватить сообщения, которые давно не подтверждены другими отправителями"""
+        start_id = "0-0"
+        try:
+            while True:
+                start_id, claimed, *_ = await self.redis.xautoclaim(
+                    NOTIFICATION_STREAM,
+                    NOTIFICATION_GROUP,
+                    self.consumer,
+                    min_idle_time=60_000,
+                    start_id=start_id,
+                    count=settings.BATCH_NOTIFICATION_SIZE,
+                    justid=True
+                )
+                if claimed:
+                    logger.info("📥 Abandoned notifications claimed", count=len(claimed))
+                if start_id == "0-0":
+                    return
+        except Exception as e:
+            logger.error("💥 Notification claim failed", error=str(e))
+
+    def _enqueue_local(self, entry_id: str, fields: Dict[str, str]) -> None:
+        chat_id = int(fields['chat_id'])
+        self._buffered += 1
+
+        queue = self._chats.get(chat_id)
+        if queue is not None:
+            # Чат уже в работе - сообщение встанет в конец его очереди
+            queue.append((entry_id, fields))
+            return
+
+        self._chats[chat_id] = deque([(entry_id, fields)])
+        delay = self._next_allowed.pop(chat_id, 0) - time.monotonic()
+        self._schedule(chat_id, delay)
+
+    def _schedule(self, chat_id: int, delay: float) -> None:
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._ready.put_nowait, chat_id)
+        else:
+            self._ready.put_nowait(chat_id)
+
+    # ==================== ОТПРАВКА ====================
+
+    async def _send_loop(self) -> None:
+        while True:
+            chat_id = await self._ready.get()
+            queue = self._chats.get(chat_id)
+            if not queue:
+                continue
+
+            entry_id, fields = queue[0]
+            await self._bucket.acquire()
+
+            delay = self._chat_interval
+            try:
+                await self._send(chat_id, fields)
+            except TelegramRetryAfter as e:
+                logger.warning("⏳ Telegram flood limit", chat_id=chat_id, retry_after=e.retry_after)
+                self._bucket.pause(e.retry_after)
+                self._schedule(chat_id, e.retry_after)
+                continue
+            except TelegramForbiddenError:
+                # Бот заблокирован пользователем
+                try:
+                    await self.user_service.deactivate_user(chat_id)
+                except Exception as e:
+                    logger.error("💥 Failed to deactivate user", chat_id=chat_id, error=str(e))
+            except TelegramBadRequest as e:
+                logger.warning("⚠️ Notification rejected", chat_id=chat_id, error=str(e))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                attempts = int(fields.get('attempts', 0)) + 1
+                fields['attempts'] = str(attempts)
+                if attempts < MAX_SEND_ATTEMPTS:
+                    logger.warning("⚠️ Notification send failed, retrying", chat_id=chat_id, error=str(e))
+                    self._schedule(chat_id, delay * attempts)
+                    continue
+                logger.error("💥 Notification dropped", chat_id=chat_id, error=str(e))
+
+            queue.popleft()
+            self._buffered -= 1
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.xack(NOTIFICATION_STREAM, NOTIFICATION_GROUP, entry_id)
+                    pipe.xdel(NOTIFICATION_STREAM, entry_id)
+                    await pipe.execute()
+            except Exception as e:
+                # Отправитель продолжает работу; неподтвержденное сообщение повторится после перезапуска
+                logger.error("💥 Notification ack failed", entry_id=entry_id, error=str(e))
+
+            if queue:
+                self._schedule(chat_id, delay)
+            else:
+                del self._chats[chat_id]
+                self._remember_next_allowed(chat_id, delay)
+
+    def _remember_next_allowed(self, chat_id: int, delay: float) -> None:
+        now = time.monotonic()
+        self._next_allowed[chat_id] = now + delay
+
+        # Не копим записи о давно обслуженных чатах
+        if len(self._next_allowed) > self._max_buffered:
+            self._next_allowed = {
+                cid: until for cid, until in self._next_allowed.items() if until > now
+            }
+
+    async def _send(self, chat_id: int, fields: Dict[str, str]) -> None:
+        reply_markup: Optional[InlineKeyboardMarkup] = None
+        if fields.get('reply_markup'):
+            reply_markup = InlineKeyboardMarkup.model_validate_json(fields['reply_markup'])
+
+        await self.bot.send_message(chat_id, fields['text'], reply_markup=reply_markup)
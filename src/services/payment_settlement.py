@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import structlog
+from sqlalchemy import String, cast, exists, func, literal, select, true, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.database import get_session
+from app.database.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.database.models.user import User
+from app.services.metrics import LEDGER_OPERATIONS
+from app.services.user_service import UserService
+
+logger = structlog.get_logger(__name__)
+
+# Колонки журнала, заполняемые при зачислении
+_LEDGER_COLUMNS = (
+    "user_id", "type", "status", "amount", "description",
+    "stars_amount", "stars_transaction_id", "reference_id", "reference_type",
+    "balance_before", "balance_after",
+)
+
+def _typed(value, column):
+    """Параметр с типом колонки (asyncpg требует явных типов в INSERT ... SELECT)"""
+    return literal(value, column.type)
+
+class PaymentSettlementEngine:
+    """
+    Зачисление внешних платежей (Stars, CryptoBot) одним SQL-запросом.
+
+    Запись депозита, бонусная запись и пополнение баланса выполняются
+    одним оператором с CTE: INSERT ... ON CONFLICT (stars_transaction_id)
+    DO NOTHING RETURNING. Если платеж уже зачислен, конфликт по уникальному
+    внешнему ID не дает вставить запись, а без нее не выполняются ни бонус,
+    ни пополнение баланса. Повторы и параллельные доставки не зачисляются дважды.
+    """
+
+    def __init__(self, user_service: UserService | None = None):
+        self.user_service = user_service or UserService()
+
+    def _build_statement(
+        self,
+        user_id: int,
+        external_id: str,
+        deposit_type: TransactionType,
+        base_amount: Decimal,
+        bonus_amount: Decimal,
+        description: str,
+        stars_amount: int | None,
+        reference_type: str | None
+    ):
+        total = base_amount + bonus_amount
+
+        # Строка пользователя блокируется: balance_before соответствует балансу до зачисления
+        locked = (
+            select(User.telegram_id, User.balance)
+            .where(User.telegram_id == user_id)
+            .with_for_update()
+            .cte("locked")
+        )
+
+        deposit = (
+            insert(Transaction)
+            .from_select(
+                [*_LEDGER_COLUMNS, "created_at"],
+                select(
+                    locked.c.telegram_id,
+                    _typed(deposit_type, Transaction.type),
+                    _typed(TransactionStatus.COMPLETED, Transaction.status),
+                    _typed(base_amount, Transaction.amount),
+                    _typed(description, Transaction.description),
+                    _typed(stars_amount, Transaction.stars_amount),
+                    _typed(external_id, Transaction.stars_transaction_id),
+                    _typed(external_id, Transaction.reference_id),
+                    _typed(reference_type, Transaction.reference_type),
+                    locked.c.balance,
+                    locked.c.balance + _typed(base_amount, Transaction.amount),
+                    func.now(),
+                )
+            )
+            .on_conflict_do_nothing(index_elements=[Transaction.stars_transaction_id])
+            .returning(Transaction.id, Transaction.balance_after)
+            .cte("deposit")
+        )
+
+        credit = (
+            update(User)
+            .where(User.telegram_id == user_id)
+            .where(exists(select(deposit.c.id)))
+            .values(
+                balance=User.balance + total,
+                total_deposited=User.total_deposited + total
+            )
+            .returning(User.balance, User.level, User.is_premium)
+            .cte("credit")
+        )
+
+        statement = select(
+            deposit.c.id,
+            credit.c.balance,
+            credit.c.level,
+            credit.c.is_premium
+        ).join_from(deposit, credit, true())
+
+        if bonus_amount > 0:
+            # Бонус пакета - отдельная запись журнала, ссылающаяся на депозит
+            bonus = (
+                insert(Transaction)
+                .from_select(
+                    [*_LEDGER_COLUMNS, "created_at"],
+                    select(
+                        _typed(user_id, Transaction.user_id),
+                        _typed(TransactionType.DEPOSIT_BONUS, Transaction.type),
+                        _typed(TransactionStatus.COMPLETED, Transaction.status),
+                        _typed(bonus_amount, Transaction.amount),
+                        _typed(f"Бонус к пополнению: +{bonus_amount} GRAM", Transaction.description),
+                        _typed(None, Transaction.stars_amount),
+                        _typed(None, Transaction.stars_transaction_id),
+                        cast(deposit.c.id, String),
+                        _typed("deposit", Transaction.reference_type),
+                        deposit.c.balance_after,
+                        deposit.c.balance_after + _typed(bonus_amount, Transaction.amount),
+                        func.now(),
+                    )
+                )
+                .returning(Transaction.id)
+                .cte("bonus")
+            )
+            # CTE с изменением данных выполняется, даже если на него не ссылаются
+            statement = statement.add_cte(bonus)
+
+        return statement
+
+    async def settle(
+        self,
+        user_id: int,
+        external_id: str,
+        deposit_type: TransactionType,
+        base_amount: Decimal,
+        bonus_amount: Decimal = Decimal("0"),
+        description: str = "",
+        stars_amount: int | None = None,
+        reference_type: str | None = None
+    ) -> dict | None:
+        """
+        Зачислить платеж. Возвращает словарь:
+        transaction_id, created (False - платеж уже был зачислен), balance (после зачисления).
+        None - пользователь не найден
+        """
+        statement = self._build_statement(
+            user_id, external_id, deposit_type, base_amount, bonus_amount,
+            description, stars_amount, reference_type
+        )
+
+        async with get_session() as session:
+            row = (await session.execute(statement)).one_or_none()
+            await session.commit()
+
+        if row is None:
+            return await self._settled_before(user_id, external_id)
+
+        LEDGER_OPERATIONS.labels(type=deposit_type).inc()
+        if bonus_amount > 0:
+            LEDGER_OPERATIONS.labels(type=TransactionType.DEPOSIT_BONUS).inc()
+
+        transaction_id, balance, level, is_premium = row
+        await self._update_level(user_id, balance, level, is_premium)
+
+        logger.info(
+            "💰 Payment settled",
+            user_id=user_id,
+            external_id=external_id,
+            type=deposit_type,
+            amount=float(base_amount),
+            bonus=float(bonus_amount),
+            transaction_id=transaction_id
+        )
+
+        return {"transaction_id": transaction_id, "created": True, "balance": balance}
+
+    async def _settled_before(self, user_id: int, external_id: str) -> dict | None:
+        """Запрос ничего не вставил: повтор уже зачисленного платежа или нет пользователя"""
+        async with get_session() as session:
+            row = (await session.execute(
+                select(Transaction.id, User.balance)
+                .join(User, User.telegram_id == Transaction.user_id)
+                .where(Transaction.stars_transaction_id == external_id)
+            )).one_or_none()
+
+        if row is None:
+            logger.error("❌ User not found for payment", user_id=user_id, external_id=external_id)
+            return None
+
+        logger.warning("⚠️ Duplicate payment ignored", user_id=user_id, external_id=external_id)
+        return {"transaction_id": row[0], "created": False, "balance": row[1]}
+
+    async def _update_level(self, user_id: int, balance: Decimal, level: str, is_premium: bool) -> None:
+        """Пересчет уровня - отдельный запрос только при смене уровня"""
+        new_level = self.user_service._calculate_user_level(balance, is_premium)
+        if new_level == level:
+            return
+
+        async with get_session() as session:
+            await session.execute(
+                update(User).where(User.telegram_id == user_id).values(level=new_level)
+            )
+            await session.commit()
+
+        logger.info("⬆️ User level upgraded", telegram_id=user_id, old_level=level, new_level=new_level)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict
+
+import structlog
+
+from app.config.settings import settings
+from app.database.redis import redis_client
+
+logger = structlog.get_logger(__name__)
+
+RATE_LIMIT_KEY = "ratelimit:{route}:{subject}"
+
+# GCRA: в Redis хранится одно число - теоретическое время следующего запроса (TAT).
+# Время берется из Redis, чтобы реплики не зависели от расхождения часов
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+
+if tat - now > tolerance then
+    return math.max(1, math.ceil(tat - now - tolerance))
+end
+
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return 0
+"""
+
+# Число корзин скользящего окна в локальном лимитере
+WINDOW_SLOTS = 10
+
+class RedisRateLimitBackend:
+    """Общий для всех реплик лимит (GCRA, атомарный Lua-скрипт)"""
+
+    def __init__(self, redis=None):
+        self.redis = redis or redis_client
+        self._script = self.redis.register_script(GCRA_SCRIPT)
+
+    async def hit(self, key: str, limit: int, period: int) -> float:
+        """Зарегистрировать запрос. Возвращает 0 или секунды до следующей попытки"""
+        interval = period * 1000 / limit
+        tolerance = interval * (limit - 1)
+        retry_after_ms = await self._script(keys=[key], args=[interval, tolerance])
+        return float(retry_after_ms) / 1000
+
+class MemoryRateLimitBackend:
+    """
+    Лимит в памяти процесса: счетчик скользящего окна на кольцевом буфере.
+    Каждый ключ - фиксированный набор корзин, давно неактивные ключи вытесняются (LRU)
+    """
+
+    def __init__(self, max_keys: int | None = None):
+        self.max_keys = max_keys or settings.RATE_LIMIT_LOCAL_MAX_KEYS
+        # key -> [корзины, номер последней корзины, сумма по окну]
+        self._windows: OrderedDict[str, list] = OrderedDict()
+
+    async def hit(self, key: str, limit: int, period: int) -> float:
+        slot_width = period / WINDOW_SLOTS
+        slot = int(time.monotonic() / slot_width)
+
+        window = self._windows.get(key)
+        if window is None:
+            window = [[0] * WINDOW_SLOTS, slot, 0]
+            self._windows[key] = window
+            if len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(key)
+            self._advance(window, slot)
+
+        counts = window[0]
+        if window[2] >= limit:
+            # Ждем, пока из окна выпадет самая старая непустая корзина
+            for offset in range(1, WINDOW_SLOTS + 1):
+                if counts[(slot + offset) % WINDOW_SLOTS]:
+                    return offset * slot_width
+            return slot_width
+
+        counts[slot % WINDOW_SLOTS] += 1
+        window[2] += 1
+        return 0.0
+
+    @staticmethod
+    def _advance(window: list, slot: int) -> None:
+        counts, last_slot, _ = window
+        # Обнуляем корзины, вышедшие из окна (не больше WINDOW_SLOTS шагов)
+        for stale in range(last_slot + 1, min(slot, last_slot + WINDOW_SLOTS) + 1):
+            index = stale % WINDOW_SLOTS
+            window[2] -= counts[index]
+            counts[index] = 0
+        window[1] = max(last_slot, slot)
+
+class RateLimiter:
+    """
+    Единый лимитер запросов.
+    Основное хранилище - Redis; при его недоступности лимиты
+    временно считаются в памяти процесса
+    """
+
+    def __init__(self, backend: str | None = None, redis=None):
+        backend = backend or settings.RATE_LIMIT_BACKEND
+        self.memory = MemoryRateLimitBackend()
+        self.redis = RedisRateLimitBackend(redis) if backend == "redis" else None
+
+    async def hit(
+        self,
+        subject: int | str,
+        route: str = "default",
+        limit: int | None = None,
+        period: int | None = None
+    ) -> float:
+        """
+        Проверить и учесть запрос субъекта на маршруте.
+        Возвращает 0, если запрос разрешен, иначе секунды до следующей попытки
+        """
+        if limit is None or period is None:
+            limit, period = settings.get_rate_limit(route)
+
+        key = RATE_LIMIT_KEY.format(route=route, subject=subject)
+
+        if self.redis:
+            try:
+                return await self.redis.hit(key, limit, period)
+            except Exception as e:
+                logger.warning("⚠️ Redis rate limiter unavailable, using local", error=str(e))
+
+        return await self.memory.hit(key, limit, period)
+
+def format_retry_after(seconds: float) -> int:
+    """Округлить время ожидания до целых секунд для сообщений"""
+    return max(1, math.ceil(seconds))
+
+# Один лимитер на процесс - общий для middleware и декораторов
+rate_limiter = RateLimiter()
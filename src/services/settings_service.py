@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from decimal import Decimal
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 
 import structlog
 from sqlalchemy import select
@@ -202,25 +202,45 @@ class SettingsService:
         self,
         notification_type: str
     ) -> list[int]:
-        """Получить список пользователей с включенными уведомлениями"""
+        """
+        Получить список пользователей с включенными уведомлениями.
+        Для массовых задач используйте iter_users_with_notifications_enabled
+        """
+        return [
+            user_id
+            async for user_id in self.iter_users_with_notifications_enabled(notification_type)
+        ]
+    
+    async def iter_users_with_notifications_enabled(
+        self,
+        notification_type: str,
+        batch_size: int = 1000
+    ) -> AsyncIterator[int]:
+        """
+        Потоковая выборка активных пользователей с включенными уведомлениями.
+        Строки читаются серверным курсором пачками по batch_size
+        """
+        columns = {
+            "tasks": UserSettings.task_notifications,
+            "payments": UserSettings.payment_notifications,
+            "referrals": UserSettings.referral_notifications,
+            "admin": UserSettings.admin_notifications,
+        }
+        column = columns.get(notification_type)
+        if column is None:
+            return
+        
         async with get_session() as session:
-            if notification_type == "tasks":
-                column = UserSettings.task_notifications
-            elif notification_type == "payments":
-                column = UserSettings.payment_notifications
-            elif notification_type == "referrals":
-                column = UserSettings.referral_notifications
-            elif notification_type == "admin":
-                column = UserSettings.admin_notifications
-            else:
-                return []
-            
-            result = await session.execute(
+            result = await session.stream(
                 select(UserSettings.user_id)
-                .where(column == True)
+                .join(User, UserSettings.user_id == User.telegram_id)
+                .where(column == True, User.is_active == True)
+                .order_by(UserSettings.user_id)
+                .execution_options(yield_per=batch_size)
             )
             
-            return [row[0] for row in result.fetchall()]
+            async for user_id in result.scalars():
+                yield user_id
     
     async def get_user_language(self, user_id: int) -> str:
         """Получить язык пользователя"""
@@ -243,29 +263,54 @@ class SettingsService:
         return not settings.hide_from_leaderboard
     
     async def get_auto_withdraw_users(self, min_balance: Decimal) -> list[dict]:
-        """Получить пользователей для автовывода"""
+        """
+        Получить пользователей для автовывода.
+        Для обработки всей базы используйте iter_auto_withdraw_users
+        """
+        return [
+            {
+                'user_id': user_id,
+                'balance': balance,
+                'threshold': threshold,
+                'address': address,
+                'method': method
+            }
+            async for user_id, balance, threshold, address, method
+            in self.iter_auto_withdraw_users(min_balance)
+        ]
+    
+    async def iter_auto_withdraw_users(
+        self,
+        min_balance: Decimal,
+        batch_size: int = 1000
+    ) -> AsyncIterator[tuple[int, Decimal, Decimal, Optional[str], Optional[str]]]:
+        """
+        Потоковая выборка пользователей для автовывода.
+        Отдает кортежи (user_id, balance, threshold, address, method)
+        без загрузки ORM-объектов
+        """
         async with get_session() as session:
-            result = await session.execute(
-                select(UserSettings, User)
+            result = await session.stream(
+                select(
+                    User.telegram_id,
+                    User.balance,
+                    UserSettings.auto_withdraw_threshold,
+                    UserSettings.auto_withdraw_address,
+                    UserSettings.auto_withdraw_method
+                )
+                .select_from(UserSettings)
                 .join(User, UserSettings.user_id == User.telegram_id)
                 .where(
                     UserSettings.auto_withdraw_enabled == True,
                     UserSettings.auto_withdraw_threshold <= min_balance,
                     User.balance >= UserSettings.auto_withdraw_threshold
                 )
+                .order_by(User.telegram_id)
+                .execution_options(yield_per=batch_size)
             )
             
-            users = []
-            for settings, user in result:
-                users.append({
-                    'user_id': user.telegram_id,
-                    'balance': user.balance,
-                    'threshold': settings.auto_withdraw_threshold,
-                    'address': settings.auto_withdraw_address,
-                    'method': settings.auto_withdraw_method
-                })
-            
-            return users
+            async for row in result:
+                yield tuple(row)
     
     async def export_user_settings(self, user_id: int) -> dict:
         """Экспортировать настройки пользователя"""
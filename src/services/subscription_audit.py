@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Dict
+
+import structlog
+
+from app.config.settings import settings
+from app.database.redis import redis_client
+
+logger = structlog.get_logger(__name__)
+
+AUDIT_KEY = "subscription:audit:{audit_id}"
+
+# Маркер конца очереди для воркеров
+_DONE = object()
+
+class SubscriptionAuditEngine:
+    """
+    Потоковый аудит подписок.
+    Читает ID пользователей из асинхронного итератора, проверяет их
+    ограниченным пулом воркеров и отдает результаты по мере готовности.
+    Прогресс сохраняется в Redis - прерванный аудит продолжается с места остановки.
+    """
+
+    def __init__(
+        self,
+        telegram_api,
+        workers: int | None = None,
+        request_interval: float | None = None,
+        redis=None
+    ):
+        self.telegram_api = telegram_api
+        self.workers = workers or settings.AUDIT_WORKERS
+        self.request_interval = (
+            settings.AUDIT_REQUEST_INTERVAL if request_interval is None else request_interval
+        )
+        self.redis = redis or redis_client
+        self.stats: Dict[str, Any] = {}
+
+    async def run(
+        self,
+        user_ids: AsyncIterable[int],
+        channel_url: str,
+        audit_id: str | None = None,
+        resume: bool = True
+    ) -> AsyncIterator[tuple[int, bool]]:
+        """
+        Запустить аудит. Отдает пары (user_id, подписан).
+
+        При resume=True и наличии чекпоинта первые обработанные позиции
+        источника пропускаются - источник должен отдавать ID в стабильном порядке.
+        Чекпоинт - непрерывный префикс завершенных позиций, поэтому после
+        обрыва часть пользователей может быть проверена повторно. Счетчики
+        в stats учитывают только этот префикс - повторная проверка их не завышает.
+        """
+        checkpoint: Dict[str, str] = {}
+        if audit_id and resume:
+            checkpoint = await self.get_checkpoint(audit_id) or {}
+            if checkpoint.get('channel') != channel_url:
+                checkpoint = {}
+
+        start_position = int(checkpoint.get('position', 0))
+        if start_position:
+            logger.info("⏯️ Resuming subscription audit", audit_id=audit_id, position=start_position)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+
+        self.stats = {
+            'processed': int(checkpoint.get('processed', 0)),
+            'subscribed': int(checkpoint.get('subscribed', 0)),
+            'failed': int(checkpoint.get('failed', 0)),
+            'position': start_position,
+            'started_at': time.monotonic(),
+            'per_second': 0.0
+        }
+        self._processed_at_start = self.stats['processed']
+
+        producer = asyncio.create_task(self._produce(user_ids, queue, start_position))
+        workers = [
+            asyncio.create_task(self._work(channel_url, queue, results))
+            for _ in range(self.workers)
+        ]
+
+        # Позиции, завершенные вне очереди: позиция -> результат. Чекпоинт и
+        # счетчики - непрерывный префикс: результат учитывается, когда его позиция
+        # входит в префикс, иначе после возобновления он был бы посчитан дважды
+        completed_ahead: Dict[int, bool | None] = {}
+        watermark = start_position
+        last_checkpoint = time.monotonic()
+        since_checkpoint = 0
+        finished_workers = 0
+        completed = False
+
+        try:
+            while finished_workers < self.workers:
+                item = await results.get()
+                if item is _DONE:
+                    finished_workers += 1
+                    continue
+
+                position, user_id, is_subscribed = item
+                since_checkpoint += 1
+
+                completed_ahead[position] = is_subscribed
+                while watermark in completed_ahead:
+                    result = completed_ahead.pop(watermark)
+                    self.stats['processed'] += 1
+                    if result:
+                        self.stats['subscribed'] += 1
+                    elif result is None:
+                        self.stats['failed'] += 1
+                    watermark += 1
+                self.stats['position'] = watermark
+
+                if is_subscribed is not None:
+                    yield user_id, is_subscribed
+
+                if audit_id and (
+                    since_checkpoint >= settings.AUDIT_CHECKPOINT_EVERY
+                    or time.monotonic() - last_checkpoint > 5
+                ):
+                    await self._save_checkpoint(audit_id, channel_url)
+                    last_checkpoint = time.monotonic()
+                    since_checkpoint = 0
+
+            await producer
+            completed = True
+        finally:
+            producer.cancel()
+            for worker in workers:
+                worker.cancel()
+
+            if audit_id:
+                await self._save_checkpoint(audit_id, channel_url, finished=completed)
+            else:
+                self._update_rate()
+
+        logger.info(
+            "📊 Subscription audit completed",
+            audit_id=audit_id,
+            channel=channel_url,
+            processed=self.stats['processed'],
+            subscribed=self.stats['subscribed'],
+            failed=self.stats['failed'],
+            per_second=round(self.stats['per_second'], 1)
+        )
+
+    async def run_for_active_users(
+        self,
+        channel_url: str,
+        audit_id: str | None = None,
+        resume: bool = True
+    ) -> AsyncIterator[tuple[int, bool]]:
+        """Аудит всех активных пользователей (ID читаются из БД потоком)"""
+        from app.services.user_service import UserService
+
+        async for result in self.run(
+            UserService().iter_active_user_ids(),
+            channel_url,
+            audit_id=audit_id,
+            resume=resume
+        ):
+            yield result
+
+    async def _produce(
+        self,
+        user_ids: AsyncIterable[int],
+        queue: asyncio.Queue,
+        start_position: int
+    ) -> None:
+        """Читает источник, пропуская уже проверенные позиции"""
+        position = 0
+        error = None
+        try:
+            async for user_id in user_ids:
+                if position >= start_position:
+                    await queue.put((position, user_id))
+                position += 1
+        except Exception as e:
+            # Воркеры должны завершиться и при ошибке источника, иначе run() ждет их вечно
+            logger.error("💥 Audit source failed", position=position, error=str(e))
+            error = e
+
+        for _ in range(self.workers):
+            await queue.put(_DONE)
+
+        # Ошибка источника поднимается из run() после обработки прочитанного
+        if error is not None:
+            raise error
+
+    async def _work(
+        self,
+        channel_url: str,
+        queue: asyncio.Queue,
+        results: asyncio.Queue
+    ) -> None:
+        """Воркер: проверяет пользователей из очереди"""
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                await results.put(_DONE)
+                return
+
+            position, user_id = item
+            try:
+                is_subscribed = await self.telegram_api.check_user_subscription(user_id, channel_url)
+            except Exception as e:
+                logger.warning("⚠️ Audit check failed", user_id=user_id, error=str(e))
+                is_subscribed = None
+
+            await results.put((position, user_id, is_subscribed))
+
+            # Пауза для соблюдения лимитов Telegram API
+            if self.request_interval:
+                await asyncio.sleep(self.request_interval)
+
+    def _update_rate(self) -> None:
+        elapsed = time.monotonic() - self.stats['started_at']
+        processed = self.stats['processed'] - self._processed_at_start
+        self.stats['per_second'] = processed / elapsed if elapsed > 0 else 0.0
+
+    async def _save_checkpoint(self, audit_id: str, channel_url: str, finished: bool = False) -> None:
+        """Сохранить прогресс аудита"""
+        self._update_rate()
+        key = AUDIT_KEY.format(audit_id=audit_id)
+
+        await self.redis.hset(key, mapping={
+            'channel': channel_url,
+            'position': self.stats['position'],
+            'processed': self.stats['processed'],
+            'subscribed': self.stats['subscribed'],
+            'failed': self.stats['failed'],
+            'per_second': round(self.stats['per_second'], 2),
+            'finished': int(finished)
+        })
+        await self.redis.expire(key, 7 * 86400)
+
+    async def get_checkpoint(self, audit_id: str) -> Dict[str, str] | None:
+        """Получить сохраненный прогресс аудита"""
+        checkpoint = await self.redis.hgetall(AUDIT_KEY.format(audit_id=audit_id))
+        if not checkpoint or checkpoint.get('finished') == "1":
+            return None
+        return checkpoint
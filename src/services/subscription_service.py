@@ -1,38 +1,42 @@
 from __future__ import annotations
 
-import json
-from datetime import datetime, timedelta
+import asyncio
+import time
+from datetime import datetime
 from typing import Optional, Dict, Any, List
 import structlog
 
 from app.services.telegram_api_service import TelegramAPIService
+from app.database.repositories.chat_subscription import ChatSubscriptionRepository
 from app.config.settings import settings
 
 logger = structlog.get_logger(__name__)
 
+# Волны вступлений: chat_id -> {user_id: future}. Вступления в один чат,
+# пришедшие в пределах JOIN_BATCH_WINDOW, проверяются одним проходом
+_join_waves: Dict[int, Dict[int, asyncio.Future]] = {}
+_join_wave_tasks: Dict[int, asyncio.Task] = {}
+
 class SubscriptionService:
     """Сервис для системы обязательной подписки (ОП)"""
     
-    def __init__(self):
-        self.telegram_api = TelegramAPIService()
-        # Храним настройки чатов в памяти (в реальности - в Redis/БД)
-        self.chat_settings: Dict[int, Dict] = {}
+    def __init__(
+        self,
+        telegram_api: TelegramAPIService | None = None,
+        repository: ChatSubscriptionRepository | None = None
+    ):
+        self.telegram_api = telegram_api or TelegramAPIService()
+        # Настройки чатов: БД + кэш в Redis, общие для всех реплик
+        self.repository = repository or ChatSubscriptionRepository()
     
-    def _get_chat_settings(self, chat_id: int) -> Dict[str, Any]:
+    async def _get_chat_settings(self, chat_id: int) -> Dict[str, Any]:
         """Получить настройки чата"""
-        return self.chat_settings.get(chat_id, {
-            'required_channels': [],
-            'check_duration': None,
-            'auto_delete_time': None,
-            'referral_check': False,
-            'referral_user_id': None,
-            'enabled': False
-        })
+        return await self.repository.get(chat_id)
     
-    def _save_chat_settings(self, chat_id: int, settings: Dict[str, Any]):
+    async def _save_chat_settings(self, chat_id: int, chat_settings: Dict[str, Any]):
         """Сохранить настройки чата"""
-        self.chat_settings[chat_id] = settings
-        logger.info("💾 Chat settings saved", chat_id=chat_id, settings=settings)
+        await self.repository.save(chat_id, chat_settings)
+        logger.info("💾 Chat settings saved", chat_id=chat_id, settings=chat_settings)
     
     async def setup_channel_check(
         self,
@@ -53,7 +57,7 @@ class SubscriptionService:
             return False, f"❌ Канал {channel_url} не найден или недоступен"
         
         # Получаем текущие настройки
-        settings = self._get_chat_settings(chat_id)
+        chat_settings = await self._get_chat_settings(chat_id)
         
         # Добавляем канал к проверке
         channel_config = {
@@ -61,23 +65,25 @@ class SubscriptionService:
             'url': channel_url,
             'title': channel_info.get('title', channel_username),
             'duration_hours': duration_hours,
-            'added_at': datetime.utcnow().isoformat()
+            'added_at': datetime.utcnow().isoformat(),
+            # Срок действия считаем один раз, при проверке - только сравнение
+            'expires_at': time.time() + duration_hours * 3600 if duration_hours else None
         }
         
         # Проверяем лимит (максимум 5 каналов)
-        if len(settings['required_channels']) >= 5:
+        if len(chat_settings['required_channels']) >= 5:
             return False, "❌ Максимум 5 каналов для проверки"
         
         # Проверяем, не добавлен ли уже этот канал
-        for existing in settings['required_channels']:
+        for existing in chat_settings['required_channels']:
             if existing['username'] == channel_config['username']:
                 return False, f"❌ Канал {channel_url} уже добавлен в проверку"
         
         # Добавляем канал
-        settings['required_channels'].append(channel_config)
-        settings['enabled'] = True
+        chat_settings['required_channels'].append(channel_config)
+        chat_settings['enabled'] = True
         
-        self._save_chat_settings(chat_id, settings)
+        await self._save_chat_settings(chat_id, chat_settings)
         
         duration_text = ""
         if duration_hours:
@@ -96,36 +102,36 @@ class SubscriptionService:
         /unsetup - убрать все проверки
         """
         
-        settings = self._get_chat_settings(chat_id)
+        chat_settings = await self._get_chat_settings(chat_id)
         
-        if not settings['required_channels']:
+        if not chat_settings['required_channels']:
             return False, "❌ Проверки подписок не настроены"
         
         if channel_username:
             # Убираем конкретный канал
             username = channel_username.lstrip('@')
-            original_count = len(settings['required_channels'])
+            original_count = len(chat_settings['required_channels'])
             
-            settings['required_channels'] = [
-                ch for ch in settings['required_channels']
+            chat_settings['required_channels'] = [
+                ch for ch in chat_settings['required_channels']
                 if ch['username'] != username
             ]
             
-            if len(settings['required_channels']) == original_count:
+            if len(chat_settings['required_channels']) == original_count:
                 return False, f"❌ Канал @{username} не найден в проверках"
             
             # Если каналов не осталось, отключаем проверку
-            if not settings['required_channels']:
-                settings['enabled'] = False
+            if not chat_settings['required_channels']:
+                chat_settings['enabled'] = False
             
-            self._save_chat_settings(chat_id, settings)
+            await self._save_chat_settings(chat_id, chat_settings)
             return True, f"✅ Убрана проверка подписки на @{username}"
         else:
             # Убираем все проверки
-            settings['required_channels'] = []
-            settings['enabled'] = False
+            chat_settings['required_channels'] = []
+            chat_settings['enabled'] = False
             
-            self._save_chat_settings(chat_id, settings)
+            await self._save_chat_settings(chat_id, chat_settings)
             return True, "✅ Все проверки подписок отключены"
     
     async def setup_referral_check(
@@ -139,14 +145,14 @@ class SubscriptionService:
         /setup_bot USER_ID [1d]
         """
         
-        settings = self._get_chat_settings(chat_id)
+        chat_settings = await self._get_chat_settings(chat_id)
         
-        settings['referral_check'] = True
-        settings['referral_user_id'] = referral_user_id
-        settings['check_duration'] = duration_hours
-        settings['enabled'] = True
+        chat_settings['referral_check'] = True
+        chat_settings['referral_user_id'] = referral_user_id
+        chat_settings['check_duration'] = duration_hours
+        chat_settings['enabled'] = True
         
-        self._save_chat_settings(chat_id, settings)
+        await self._save_chat_settings(chat_id, chat_settings)
         
         duration_text = ""
         if duration_hours:
@@ -163,19 +169,19 @@ class SubscriptionService:
     async def remove_referral_check(self, chat_id: int) -> tuple[bool, str]:
         """Убрать реферальную ОП"""
         
-        settings = self._get_chat_settings(chat_id)
+        chat_settings = await self._get_chat_settings(chat_id)
         
-        if not settings['referral_check']:
+        if not chat_settings['referral_check']:
             return False, "❌ Реферальная ОП не настроена"
         
-        settings['referral_check'] = False
-        settings['referral_user_id'] = None
+        chat_settings['referral_check'] = False
+        chat_settings['referral_user_id'] = None
         
         # Если нет других проверок, отключаем ОП
-        if not settings['required_channels']:
-            settings['enabled'] = False
+        if not chat_settings['required_channels']:
+            chat_settings['enabled'] = False
         
-        self._save_chat_settings(chat_id, settings)
+        await self._save_chat_settings(chat_id, chat_settings)
         
         return True, "✅ Реферальная ОП отключена"
     
@@ -192,29 +198,29 @@ class SubscriptionService:
         if delete_time_seconds < 15 or delete_time_seconds > 300:  # 15 сек - 5 мин
             return False, "❌ Время автоудаления: от 15 секунд до 5 минут"
         
-        settings = self._get_chat_settings(chat_id)
-        settings['auto_delete_time'] = delete_time_seconds
+        chat_settings = await self._get_chat_settings(chat_id)
+        chat_settings['auto_delete_time'] = delete_time_seconds
         
-        self._save_chat_settings(chat_id, settings)
+        await self._save_chat_settings(chat_id, chat_settings)
         
         return True, f"✅ Автоудаление сообщений через {delete_time_seconds} сек."
     
     async def disable_auto_delete(self, chat_id: int) -> tuple[bool, str]:
         """Отключить автоудаление"""
         
-        settings = self._get_chat_settings(chat_id)
-        settings['auto_delete_time'] = None
+        chat_settings = await self._get_chat_settings(chat_id)
+        chat_settings['auto_delete_time'] = None
         
-        self._save_chat_settings(chat_id, settings)
+        await self._save_chat_settings(chat_id, chat_settings)
         
         return True, "✅ Автоудаление отключено"
     
     async def get_status(self, chat_id: int) -> str:
         """Получить статус настроек ОП в чате"""
         
-        settings = self._get_chat_settings(chat_id)
+        chat_settings = await self._get_chat_settings(chat_id)
         
-        if not settings['enabled']:
+        if not chat_settings['enabled']:
             return """📋 <b>СТАТУС ПРОВЕРКИ ПОДПИСОК</b>
 
 ❌ Проверка подписок отключена
@@ -227,9 +233,9 @@ class SubscriptionService:
         status_text = "📋 <b>СТАТУС ПРОВЕРКИ ПОДПИСОК</b>\n\n✅ Проверка активна\n"
         
         # Проверка каналов
-        if settings['required_channels']:
-            status_text += f"\n📺 <b>ОБЯЗАТЕЛЬНЫЕ КАНАЛЫ ({len(settings['required_channels'])}):</b>\n"
-            for i, channel in enumerate(settings['required_channels'], 1):
+        if chat_settings['required_channels']:
+            status_text += f"\n📺 <b>ОБЯЗАТЕЛЬНЫЕ КАНАЛЫ ({len(chat_settings['required_channels'])}):</b>\n"
+            for i, channel in enumerate(chat_settings['required_channels'], 1):
                 username = channel['username']
                 title = channel.get('title', username)
                 duration = channel.get('duration_hours')
@@ -238,9 +244,9 @@ class SubscriptionService:
                 status_text += f"{i}. @{username} - {title}{duration_text}\n"
         
         # Реферальная проверка
-        if settings['referral_check']:
-            user_id = settings['referral_user_id']
-            duration = settings.get('check_duration')
+        if chat_settings['referral_check']:
+            user_id = chat_settings['referral_user_id']
+            duration = chat_settings.get('check_duration')
             duration_text = f" ({duration}ч)" if duration else ""
             
             status_text += f"\n🔗 <b>РЕФЕРАЛЬНАЯ ОП:</b>\n"
@@ -248,8 +254,8 @@ class SubscriptionService:
             status_text += f"└ Ссылка: https://t.me/{settings.BOT_USERNAME}?start={user_id}{duration_text}\n"
         
         # Автоудаление
-        if settings['auto_delete_time']:
-            status_text += f"\n⌛ <b>АВТОУДАЛЕНИЕ:</b> {settings['auto_delete_time']} сек.\n"
+        if chat_settings['auto_delete_time']:
+            status_text += f"\n⌛ <b>АВТОУДАЛЕНИЕ:</b> {chat_settings['auto_delete_time']} сек.\n"
         
         status_text += f"\n🔧 <b>Команды:</b>\n"
         status_text += f"• <code>/unsetup</code> - отключить все\n"
@@ -262,43 +268,49 @@ class SubscriptionService:
         self,
         chat_id: int,
         user_id: int,
-        username: str = None
+        username: str = None,
+        fail_fast: bool = False
     ) -> tuple[bool, str, List[str]]:
         """
         Проверить нового участника при входе в группу
         Возвращает: (разрешен_вход, сообщение, нарушения)
+        
+        fail_fast=True - нужен только вердикт: проверка останавливается
+        на первом нарушении, в списке будет одно нарушение
         """
         
-        settings = self._get_chat_settings(chat_id)
+        chat_settings = await self._get_chat_settings(chat_id)
+        return await self._evaluate_member(chat_settings, user_id, fail_fast)
+    
+    async def is_member_allowed(self, chat_id: int, user_id: int) -> bool:
+        """Быстрый вердикт для участника (без полного списка нарушений)"""
+        allowed, _, _ = await self.check_new_member(chat_id, user_id, fail_fast=True)
+        return allowed
+    
+    async def _evaluate_member(
+        self,
+        chat_settings: Dict[str, Any],
+        user_id: int,
+        fail_fast: bool = False
+    ) -> tuple[bool, str, List[str]]:
+        """Проверка участника по уже загруженным настройкам чата"""
         
-        if not settings['enabled']:
+        if not chat_settings['enabled']:
             return True, "", []
         
-        violations = []
+        now = time.time()
+        
+        # Истекшие проверки пропускаем
+        channels = [
+            channel['username'] for channel in chat_settings['required_channels']
+            if not (channel.get('expires_at') and now > channel['expires_at'])
+        ]
         
         # Проверяем подписки на каналы
-        for channel in settings['required_channels']:
-            channel_url = f"@{channel['username']}"
-            
-            # Проверяем срок действия проверки
-            if channel.get('duration_hours'):
-                added_time = datetime.fromisoformat(channel['added_at'])
-                expires_time = added_time + timedelta(hours=channel['duration_hours'])
-                
-                if datetime.utcnow() > expires_time:
-                    # Проверка истекла, пропускаем
-                    continue
-            
-            # Проверяем подписку
-            is_subscribed = await self.telegram_api.check_user_subscription(
-                user_id, channel_url
-            )
-            
-            if not is_subscribed:
-                violations.append(f"@{channel['username']}")
+        violations = await self._find_violations(user_id, channels, fail_fast)
         
         # Проверяем реферальную систему
-        if settings['referral_check']:
+        if chat_settings['referral_check']:
             # Здесь должна быть проверка через базу данных рефералов
             # Пока что пропускаем эту проверку
             pass
@@ -318,6 +330,99 @@ class SubscriptionService:
         
         return True, "✅ Проверка пройдена", []
     
+    async def _find_violations(
+        self,
+        user_id: int,
+        channels: List[str],
+        fail_fast: bool
+    ) -> List[str]:
+        """Параллельная проверка подписок на каналы"""
+        if not channels:
+            return []
+        
+        # Запросы идут одновременно, общий лимит держит TelegramAPIService
+        tasks = {
+            asyncio.create_task(
+                self.telegram_api.check_user_subscription(user_id, f"@{username}")
+            ): username
+            for username in channels
+        }
+        
+        if not fail_fast:
+            results = await asyncio.gather(*tasks)
+            return [
+                f"@{username}"
+                for username, is_subscribed in zip(tasks.values(), results)
+                if not is_subscribed
+            ]
+        
+        # Вердикт известен после первого нарушения - остальные запросы отменяем
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.result():
+                        return [f"@{tasks[task]}"]
+            return []
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _check_in_join_wave(
+        self,
+        chat_id: int,
+        user_id: int
+    ) -> tuple[bool, str, List[str], Dict[str, Any]]:
+        """
+        Проверка участника в составе волны вступлений.
+        Все вступления в чат за окно JOIN_BATCH_WINDOW делят одно чтение
+        настроек и общие запросы к API (повторы одного пользователя схлопываются)
+        """
+        wave = _join_waves.get(chat_id)
+        if wave is None:
+            wave = _join_waves[chat_id] = {}
+            _join_wave_tasks[chat_id] = asyncio.create_task(self._flush_join_wave(chat_id))
+        
+        future = wave.get(user_id)
+        if future is None:
+            future = wave[user_id] = asyncio.get_running_loop().create_future()
+        
+        return await asyncio.shield(future)
+    
+    async def _flush_join_wave(self, chat_id: int) -> None:
+        """Проверить накопленную волну вступлений"""
+        await asyncio.sleep(settings.JOIN_BATCH_WINDOW)
+        
+        wave = _join_waves.pop(chat_id, {})
+        _join_wave_tasks.pop(chat_id, None)
+        user_ids = list(wave)
+        
+        try:
+            chat_settings = await self._get_chat_settings(chat_id)
+            results = await asyncio.gather(
+                *(self._evaluate_member(chat_settings, user_id) for user_id in user_ids),
+                return_exceptions=True
+            )
+        except Exception as e:
+            logger.error("💥 Join wave check failed", chat_id=chat_id, error=str(e))
+            for future in wave.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for user_id, result in zip(user_ids, results):
+            future = wave[user_id]
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result((*result, chat_settings))
+        
+        if len(user_ids) > 1:
+            logger.info("🌊 Join wave checked", chat_id=chat_id, members=len(user_ids))
+    
     async def process_chat_member_update(
         self,
         chat_id: int,
@@ -333,8 +438,8 @@ class SubscriptionService:
         
         # Новый участник (left/kicked -> member)
         if old_status in ['left', 'kicked'] and new_status == 'member':
-            allowed, message, violations = await self.check_new_member(
-                chat_id, user_id, username
+            allowed, message, violations, chat_settings = await self._check_in_join_wave(
+                chat_id, user_id
             )
             
             if not allowed:
@@ -342,7 +447,7 @@ class SubscriptionService:
                     'action': 'restrict',
                     'message': message,
                     'violations': violations,
-                    'auto_delete': self._get_chat_settings(chat_id).get('auto_delete_time')
+                    'auto_delete': chat_settings.get('auto_delete_time')
                 }
         
         return None
@@ -409,41 +514,42 @@ class SubscriptionService:
     async def cleanup_expired_checks(self) -> int:
         """Очистка истекших проверок"""
         cleaned_count = 0
-        current_time = datetime.utcnow()
         
-        for chat_id, settings in list(self.chat_settings.items()):
-            if not settings.get('enabled'):
-                continue
+        # Индекс сроков отдает только чаты с истекшими каналами
+        now = time.time()
+        expired = await self.repository.get_expired_channels(now)
+        
+        for chat_id, usernames in expired.items():
+            chat_settings = await self._get_chat_settings(chat_id)
+            expired_usernames = set(usernames)
             
-            # Проверяем каналы на истечение срока
-            original_channels = settings['required_channels'][:]
             active_channels = []
-            
-            for channel in original_channels:
-                if channel.get('duration_hours'):
-                    added_time = datetime.fromisoformat(channel['added_at'])
-                    expires_time = added_time + timedelta(hours=channel['duration_hours'])
-                    
-                    if current_time <= expires_time:
-                        active_channels.append(channel)
-                    else:
-                        cleaned_count += 1
-                        logger.info(
-                            "🧹 Expired channel check removed",
-                            chat_id=chat_id,
-                            channel=channel['username']
-                        )
+            for channel in chat_settings['required_channels']:
+                # Запись индекса могла остаться от удаленного или переподключенного канала
+                if (
+                    channel['username'] in expired_usernames
+                    and channel.get('expires_at')
+                    and channel['expires_at'] <= now
+                ):
+                    cleaned_count += 1
+                    logger.info(
+                        "🧹 Expired channel check removed",
+                        chat_id=chat_id,
+                        channel=channel['username']
+                    )
                 else:
                     active_channels.append(channel)
             
-            # Обновляем настройки
-            settings['required_channels'] = active_channels
-            
-            # Отключаем ОП если нет активных проверок
-            if not active_channels and not settings.get('referral_check'):
-                settings['enabled'] = False
+            if len(active_channels) != len(chat_settings['required_channels']):
+                chat_settings['required_channels'] = active_channels
+                
+                # Отключаем ОП если нет активных проверок
+                if not active_channels and not chat_settings.get('referral_check'):
+                    chat_settings['enabled'] = False
+                
+                await self._save_chat_settings(chat_id, chat_settings)
             
-            self._save_chat_settings(chat_id, settings)
+            await self.repository.remove_from_expiry_index(chat_id, usernames)
         
         if cleaned_count > 0:
             logger.info("🧹 Cleanup completed", expired_checks=cleaned_count)
@@ -453,18 +559,18 @@ class SubscriptionService:
     async def get_chat_analytics(self, chat_id: int) -> Dict[str, Any]:
         """Получить аналитику ОП для чата"""
         
-        settings = self._get_chat_settings(chat_id)
+        chat_settings = await self._get_chat_settings(chat_id)
         
         analytics = {
-            'enabled': settings['enabled'],
-            'channels_count': len(settings.get('required_channels', [])),
-            'referral_check': settings.get('referral_check', False),
-            'auto_delete_enabled': settings.get('auto_delete_time') is not None,
+            'enabled': chat_settings['enabled'],
+            'channels_count': len(chat_settings.get('required_channels', [])),
+            'referral_check': chat_settings.get('referral_check', False),
+            'auto_delete_enabled': chat_settings.get('auto_delete_time') is not None,
             'channels': []
         }
         
         # Аналитика по каналам
-        for channel in settings.get('required_channels', []):
+        for channel in chat_settings.get('required_channels', []):
             channel_stats = await self.telegram_api.get_channel_stats(f"@{channel['username']}")
             
             channel_analytics = {
@@ -477,10 +583,8 @@ class SubscriptionService:
             }
             
             # Проверяем истечение
-            if channel.get('duration_hours'):
-                added_time = datetime.fromisoformat(channel['added_at'])
-                expires_time = added_time + timedelta(hours=channel['duration_hours'])
-                channel_analytics['is_expired'] = datetime.utcnow() > expires_time
+            if channel.get('expires_at'):
+                channel_analytics['is_expired'] = time.time() > channel['expires_at']
             
             analytics['channels'].append(channel_analytics)
         
@@ -15,6 +15,7 @@ from app.database.models.user import User, UserLevel
 from app.database.models.transaction import Transaction, TransactionType
 from app.services.user_service import UserService
 from app.services.transaction_service import TransactionService
+from app.services.anti_fraud_service import AntiFraudService
 from app.config.settings import settings
 
 logger = structlog.get_logger(__name__)
@@ -22,9 +23,15 @@ logger = structlog.get_logger(__name__)
 class TaskService:
     """Сервис для работы с заданиями"""
     
-    def __init__(self):
-        self.user_service = UserService()
-        self.transaction_service = TransactionService()
+    def __init__(
+        self,
+        user_service: UserService | None = None,
+        transaction_service: TransactionService | None = None,
+        anti_fraud: AntiFraudService | None = None
+    ):
+        self.user_service = user_service or UserService()
+        self.transaction_service = transaction_service or TransactionService()
+        self.anti_fraud = anti_fraud or AntiFraudService()
     
     async def create_task(
         self,
@@ -186,6 +193,11 @@ class TaskService:
     
     async def execute_task(self, task_id: int, user_id: int) -> TaskExecution | None:
         """Начать выполнение задания"""
+        # Слишком частые выполнения - признак фермы аккаунтов
+        if not await self.anti_fraud.record(user_id, "task_executions"):
+            logger.warning("🚫 Task execution blocked by anti-fraud", task_id=task_id, user_id=user_id)
+            return None
+        
         async with get_session() as session:
             # Получаем задание
             task = await self.get_task_by_id(task_id)
@@ -1,45 +1,109 @@
 import aiohttp
 import asyncio
+import time
+from collections import OrderedDict
 from typing import Optional, Dict, Any, List
 import structlog
 from urllib.parse import urlparse
 import re
 
 from app.config.settings import settings
+from app.services.metrics import (
+    TELEGRAM_API_ERRORS,
+    TELEGRAM_API_LATENCY,
+    TELEGRAM_API_RETRY_AFTER,
+    observe_cache,
+)
+from app.services.rate_limiter import rate_limiter
 
 logger = structlog.get_logger(__name__)
 
+# Общий для всех экземпляров бюджет одновременных запросов к API
+_api_semaphore = asyncio.Semaphore(settings.TELEGRAM_API_CONCURRENCY)
+
+# Бюджет запросов в секунду - общий для реплик (GCRA в Redis, без Redis - в памяти процесса)
+API_RATE_ROUTE = "telegram_api"
+
+# Подтвержденные подписки: (chat_id, user_id) -> время истечения
+_subscription_cache: OrderedDict[tuple[str, int], float] = OrderedDict()
+
+# Проверки "в полете": одинаковые запросы во время волны вступлений ждут один ответ
+_inflight_checks: Dict[tuple[str, int], asyncio.Task] = {}
+
 class TelegramAPIService:
     """Сервис для работы с Telegram Bot API для проверки заданий"""
     
     def __init__(self, bot_token: str = None):
         self.bot_token = bot_token or settings.BOT_TOKEN
         self.api_url = f"https://api.telegram.org/bot{self.bot_token}"
+        # Общая HTTP-сессия (создается в startup)
+        self._session: aiohttp.ClientSession | None = None
+    
+    async def startup(self) -> None:
+        """Открыть общую HTTP-сессию с пулом соединений"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=settings.TELEGRAM_API_CONCURRENCY)
+            )
+    
+    async def close(self) -> None:
+        """Закрыть HTTP-сессию"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    @staticmethod
+    async def _wait_rate_budget() -> None:
+        """Дождаться места в бюджете запросов в секунду (слот параллельности при этом не занят)"""
+        while True:
+            retry_after = await rate_limiter.hit(
+                "bot", route=API_RATE_ROUTE, limit=settings.TELEGRAM_API_RATE_LIMIT, period=1
+            )
+            if not retry_after:
+                return
+            await asyncio.sleep(retry_after)
     
     async def _make_request(self, method: str, params: dict = None) -> Optional[dict]:
         """Выполнить запрос к Telegram API"""
         url = f"{self.api_url}/{method}"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=params or {}) as response:
-                    result = await response.json()
-                    
-                    if result.get("ok"):
-                        return result.get("result")
-                    else:
-                        logger.error(
-                            "❌ Telegram API error",
-                            method=method,
-                            error=result.get("description"),
-                            error_code=result.get("error_code")
-                        )
-                        return None
+            await self._wait_rate_budget()
+            async with _api_semaphore:
+                started = time.perf_counter()
+                if self._session is not None:
+                    result = await self._post(self._session, url, params)
+                else:
+                    # Сервис используется вне контейнера - разовая сессия
+                    async with aiohttp.ClientSession() as session:
+                        result = await self._post(session, url, params)
+                TELEGRAM_API_LATENCY.labels(method=method).observe(time.perf_counter() - started)
+            
+            if result.get("ok"):
+                return result.get("result")
+            else:
+                if result.get("error_code") == 429:
+                    TELEGRAM_API_RETRY_AFTER.labels(method=method).inc()
+                else:
+                    TELEGRAM_API_ERRORS.labels(method=method).inc()
+                logger.error(
+                    "❌ Telegram API error",
+                    method=method,
+                    error=result.get("description"),
+                    error_code=result.get("error_code")
+                )
+                return None
                         
         except Exception as e:
+            TELEGRAM_API_ERRORS.labels(method=method).inc()
             logger.error("💥 Telegram API request failed", method=method, error=str(e))
             return None
     
+    @staticmethod
+    async def _post(session: aiohttp.ClientSession, url: str, params: dict | None) -> dict:
+        async with session.post(url, json=params or {}) as response:
+            return await response.json()
+    
     def _parse_telegram_url(self, url: str) -> Dict[str, Any]:
         """Парсинг Telegram URL для извлечения информации"""
         url = url.strip()
@@ -86,7 +150,38 @@ class TelegramAPIService:
             return False
         
         chat_id = f"@{parsed['username']}" if parsed['type'] == 'username' else parsed.get('invite_link')
+        key = (chat_id, user_id)
+        
+        # Подписка недавно подтверждена - повторный запрос не нужен
+        expires_at = _subscription_cache.get(key)
+        if expires_at is not None:
+            if expires_at > time.monotonic():
+                observe_cache("subscription", hit=True)
+                return True
+            _subscription_cache.pop(key, None)
+        observe_cache("subscription", hit=False)
+        
+        task = _inflight_checks.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_subscription(user_id, chat_id))
+            _inflight_checks[key] = task
+            task.add_done_callback(lambda _: _inflight_checks.pop(key, None))
         
+        # shield: отмена одного ожидающего не должна отменять общий запрос
+        is_subscribed = await asyncio.shield(task)
+        
+        # Кэшируем только положительный ответ, чтобы только что
+        # подписавшийся пользователь не ждал истечения кэша
+        if is_subscribed:
+            _subscription_cache[key] = time.monotonic() + settings.SUBSCRIPTION_CACHE_TTL
+            _subscription_cache.move_to_end(key)
+            while len(_subscription_cache) > settings.SUBSCRIPTION_CACHE_SIZE:
+                _subscription_cache.popitem(last=False)
+        
+        return is_subscribed
+    
+    async def _fetch_subscription(self, user_id: int, chat_id: str) -> bool:
+        """Запрос статуса участника через getChatMember"""
         try:
             result = await self._make_request(
                 "getChatMember",
@@ -238,22 +333,22 @@ class TelegramAPIService:
         user_ids: List[int], 
         channel_url: str
     ) -> Dict[int, bool]:
-        """Массовая проверка подписок"""
-        results = {}
-        
-        # Ограничиваем количество одновременных запросов
-        semaphore = asyncio.Semaphore(5)
-        
-        async def check_single_user(user_id: int):
-            async with semaphore:
-                result = await self.check_user_subscription(user_id, channel_url)
-                results[user_id] = result
-                # Добавляем небольшую задержку для избежания rate limiting
-                await asyncio.sleep(0.1)
-        
-        # Запускаем все проверки параллельно
-        tasks = [check_single_user(user_id) for user_id in user_ids]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        """
+        Массовая проверка подписок для небольших списков.
+        Для аудита всей базы используйте SubscriptionAuditEngine напрямую -
+        он не держит результаты в памяти и отдает их по мере готовности
+        """
+        from app.services.subscription_audit import SubscriptionAuditEngine
+        
+        async def iterate_user_ids():
+            for user_id in user_ids:
+                yield user_id
+        
+        engine = SubscriptionAuditEngine(self)
+        results = {
+            user_id: is_subscribed
+            async for user_id, is_subscribed in engine.run(iterate_user_ids(), channel_url)
+        }
         
         logger.info(
             "📊 Bulk subscription check completed",
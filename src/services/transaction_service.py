@@ -5,19 +5,29 @@ from decimal import Decimal
 from typing import Optional
 
 import structlog
-from sqlalchemy import select, func, desc
+from sqlalchemy import event, select, func, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.database import get_session
 from app.database.models.transaction import Transaction, TransactionType, TransactionStatus
 from app.database.models.user import User
 from app.config.settings import settings
+from app.services.metrics import LEDGER_OPERATIONS
+from app.services.payment_settlement import PaymentSettlementEngine
 
 logger = structlog.get_logger(__name__)
 
+@event.listens_for(Transaction, "after_insert")
+def _count_ledger_operation(mapper, connection, target: Transaction) -> None:
+    """Учет всех записей в журнал транзакций, откуда бы они ни создавались"""
+    LEDGER_OPERATIONS.labels(type=target.type).inc()
+
 class TransactionService:
     """Сервис для работы с транзакциями"""
     
+    def __init__(self, settlement: PaymentSettlementEngine | None = None):
+        self.settlement = settlement or PaymentSettlementEngine()
+    
     async def create_transaction(
         self,
         user_id: int,
@@ -213,68 +223,52 @@ class TransactionService:
         stars_amount: int,
         stars_transaction_id: str,
         package_name: str | None = None
-    ) -> Transaction | None:
-        """Обработать платеж через Telegram Stars"""
-        
-        # Проверяем, не обработан ли уже этот платеж
-        existing = await self.get_transaction_by_stars_id(stars_transaction_id)
-        if existing:
-            logger.warning(
-                "⚠️ Duplicate stars payment attempt",
-                user_id=user_id,
-                stars_transaction_id=stars_transaction_id
-            )
-            return existing
-        
-        # Рассчитываем количество GRAM
+    ) -> dict | None:
+        """
+        Обработать платеж через Telegram Stars.
+        Возвращает результат PaymentSettlementEngine.settle (повтор платежа - created=False)
+        """
         base_gram, bonus_gram = settings.calculate_gram_from_stars(stars_amount, package_name)
-        total_gram = base_gram + bonus_gram
         
-        async with get_session() as session:
-            # Создаем основную транзакцию
-            main_transaction = await self.create_transaction(
-                user_id=user_id,
-                amount=base_gram,
-                transaction_type=TransactionType.DEPOSIT_STARS,
-                description=f"Пополнение через Telegram Stars: {stars_amount} ⭐ → {base_gram} GRAM",
-                stars_amount=stars_amount,
-                stars_transaction_id=stars_transaction_id,
-                session=session
-            )
-            
-            # Создаем бонусную транзакцию если есть бонус
-            if bonus_gram > 0:
-                await self.create_transaction(
-                    user_id=user_id,
-                    amount=bonus_gram,
-                    transaction_type=TransactionType.DEPOSIT_BONUS,
-                    description=f"Бонус к пополнению: +{bonus_gram} GRAM",
-                    reference_id=str(main_transaction.id),
-                    reference_type="deposit",
-                    session=session
-                )
-            
-            # Обновляем баланс пользователя
-            result = await session.execute(
-                select(User).where(User.telegram_id == user_id)
-            )
-            user = result.scalar_one_or_none()
-            
-            if user:
-                user.balance += total_gram
-                user.total_deposited += total_gram
-                await session.commit()
-            
+        result = await self.settlement.settle(
+            user_id=user_id,
+            external_id=stars_transaction_id,
+            deposit_type=TransactionType.DEPOSIT_STARS,
+            base_amount=base_gram,
+            bonus_amount=bonus_gram,
+            description=f"Пополнение через Telegram Stars: {stars_amount} ⭐ → {base_gram} GRAM",
+            stars_amount=stars_amount,
+            reference_type="stars"
+        )
+        
+        if result and result["created"]:
             logger.info(
                 "⭐ Stars payment processed",
                 user_id=user_id,
                 stars_amount=stars_amount,
-                gram_amount=float(total_gram),
+                gram_amount=float(base_gram + bonus_gram),
                 bonus_gram=float(bonus_gram),
                 package=package_name
             )
-            
-            return main_transaction
+        
+        return result
+    
+    async def process_crypto_payment(
+        self,
+        user_id: int,
+        payment_id: str,
+        gram_amount: Decimal,
+        description: str
+    ) -> dict | None:
+        """Обработать платеж через CryptoBot (бонус пакета уже входит в сумму)"""
+        return await self.settlement.settle(
+            user_id=user_id,
+            external_id=payment_id,
+            deposit_type=TransactionType.DEPOSIT_CRYPTO,
+            base_amount=gram_amount,
+            description=description,
+            reference_type="cryptobot"
+        )
     
     async def get_daily_transaction_volume(self, date: datetime | None = None) -> dict:
         """Получить дневной объем транзакций"""
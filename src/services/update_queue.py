@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Any, Dict
+
+import structlog
+from aiogram import Bot, Dispatcher
+from redis.exceptions import ResponseError
+
+from app.config.settings import settings
+from app.database.redis import redis_client
+
+logger = structlog.get_logger(__name__)
+
+# Очередь входящих обновлений разбита на разделы по пользователю:
+# обновления одного пользователя всегда попадают в один раздел, а раздел
+# в каждый момент обрабатывает ровно один процесс (аренда в Redis)
+UPDATE_STREAM_KEY = "updates:stream:{partition}"
+UPDATE_LEASE_KEY = "updates:lease:{partition}"
+UPDATE_CONSUMERS_KEY = "updates:consumers"
+UPDATE_GROUP = "update-processors"
+
+# Поля обновления, из которых берется отправитель (в порядке проверки)
+_SENDER_EVENTS = (
+    "message", "callback_query", "inline_query", "chosen_inline_result",
+    "pre_checkout_query", "shipping_query", "edited_message",
+    "my_chat_member", "chat_member", "chat_join_request", "poll_answer",
+)
+
+# Добавление с проверкой переполнения раздела (back-pressure)
+PUSH_SCRIPT = """
+if redis.call('XLEN', KEYS[1]) >= tonumber(ARGV[1]) then
+    return false
+end
+return redis.call('XADD', KEYS[1], '*', 'update', ARGV[2])
+"""
+
+# Захват или продление аренды раздела
+LEASE_SCRIPT = """
+local owner = redis.call('GET', KEYS[1])
+if not owner then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+if owner == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+def _sender_id(update: Dict[str, Any]) -> int:
+    """Пользователь, от которого пришло обновление (или чат, или сам update_id)"""
+    for event_type in _SENDER_EVENTS:
+        event = update.get(event_type)
+        if not event:
+            continue
+        if "from" in event:
+            return event["from"]["id"]
+        if "user" in event:
+            return event["user"]["id"]
+        if "chat" in event:
+            return event["chat"]["id"]
+
+    return update.get("update_id", 0)
+
+class UpdateQueue:
+    """Прием обновлений в очередь Redis"""
+
+    def __init__(self, redis=None, partitions: int | None = None):
+        self.redis = redis or redis_client
+        self.partitions = partitions or settings.UPDATE_QUEUE_PARTITIONS
+        self._push = self.redis.register_script(PUSH_SCRIPT)
+
+    def partition_for(self, update: Dict[str, Any]) -> int:
+        return _sender_id(update) % self.partitions
+
+    async def push(self, update: Dict[str, Any]) -> bool:
+        """
+        Поставить обновление в очередь.
+        False - раздел переполнен, обновление нужно отклонить (Telegram повторит доставку)
+        """
+        stream = UPDATE_STREAM_KEY.format(partition=self.partition_for(update))
+        entry_id = await self._push(
+            keys=[stream],
+            args=[settings.UPDATE_QUEUE_MAX_BACKLOG, json.dumps(update, ensure_ascii=False)]
+        )
+        return entry_id is not None
+
+    async def get_backlog(self) -> int:
+        """Необработанных обновлений во всех разделах"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for partition in range(self.partitions):
+                pipe.xlen(UPDATE_STREAM_KEY.format(partition=partition))
+            return sum(await pipe.execute())
+
+class UpdateConsumer:
+    """
+    Обработчик очереди обновлений.
+    Процессы на любых узлах делят разделы поровну через аренду в Redis.
+    Раздел обрабатывается последовательно, поэтому порядок обновлений
+    одного пользователя сохраняется. Обновление подтверждается после
+    обработки: после падения процесса раздел вместе с неподтвержденными
+    обновлениями переходит к другому процессу
+    """
+
+    def __init__(self, bot: Bot, dispatcher: Dispatcher, redis=None, partitions: int | None = None):
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.redis = redis or redis_client
+        self.partitions = partitions or settings.UPDATE_QUEUE_PARTITIONS
+        # Имя уникально для каждого запуска: после перезапуска контейнера hostname и pid
+        # прежние, а неподтвержденные обновления упавшего запуска - чужие, их нужно переиграть
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._lease_ttl_ms = settings.UPDATE_QUEUE_LEASE_TTL * 1000
+        self._lease = self.redis.register_script(LEASE_SCRIPT)
+        self._release = self.redis.register_script(RELEASE_SCRIPT)
+
+        # раздел -> (задача обработки, сигнал остановки)
+        self._owned: Dict[int, tuple[asyncio.Task, asyncio.Event]] = {}
+        # Отданные разделы, которые дообрабатывают текущее обновление: задача -> раздел
+        self._draining: Dict[asyncio.Task, int] = {}
+        self._lease_task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Создать группы и начать захват разделов"""
+        for partition in range(self.partitions):
+            try:
+                await self.redis.xgroup_create(
+                    UPDATE_STREAM_KEY.format(partition=partition), UPDATE_GROUP, id="0", mkstream=True
+                )
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+        self._lease_task = asyncio.create_task(self._lease_loop())
+        logger.info("📥 Update consumer started", consumer=self.consumer, partitions=self.partitions)
+
+    async def stop(self) -> None:
+        """Дообработать текущие обновления и отдать разделы"""
+        if self._lease_task:
+            self._lease_task.cancel()
+            await asyncio.gather(self._lease_task, return_exceptions=True)
+            self._lease_task = None
+
+        for _, stop in self._owned.values():
+            stop.set()
+
+        tasks = [task for task, _ in self._owned.values()] + list(self._draining)
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=settings.WEBHOOK_SHUTDOWN_TIMEOUT)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._owned.clear()
+        self._draining.clear()
+
+        try:
+            await self.redis.zrem(UPDATE_CONSUMERS_KEY, self.consumer)
+        except Exception:
+            pass
+
+        logger.info("📤 Update consumer stopped", consumer=self.consumer)
+
+    # ==================== АРЕНДА РАЗДЕЛОВ ====================
+
+    async def _lease_loop(self) -> None:
+        while True:
+            try:
+                await self._rebalance()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("💥 Update partition lease failed", error=str(e))
+
+            await asyncio.sleep(self._lease_ttl_ms / 3000)
+
+    async def _rebalance(self) -> None:
+        # Живые обработчики отмечаются в общем списке, доля каждого - поровну
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(UPDATE_CONSUMERS_KEY, {self.consumer: now})
+            pipe.zremrangebyscore(UPDATE_CONSUMERS_KEY, 0, now - self._lease_ttl_ms / 1000)
+            pipe.zcard(UPDATE_CONSUMERS_KEY)
+            *_, alive = await pipe.execute()
+
+        share = math.ceil(self.partitions / max(1, alive))
+
+        # Забываем завершившиеся разделы и продлеваем аренду остальных
+        for partition, (task, stop) in list(self._owned.items()):
+            if task.done():
+                del self._owned[partition]
+            elif not await self._lease(keys=[self._lease_key(partition)], args=[self.consumer, self._lease_ttl_ms]):
+                logger.warning("⚠️ Update partition lease lost", partition=partition)
+                self._drain(partition)
+
+        # Лишние разделы отдаем после обработки текущего обновления
+        while len(self._owned) > share:
+            self._drain(max(self._owned))
+
+        if len(self._owned) >= share:
+            return
+
+        # Раздел, который еще дообрабатывается, заново не берем
+        busy = set(self._owned) | set(self._draining.values())
+        free = [partition for partition in range(self.partitions) if partition not in busy]
+        random.shuffle(free)
+        for partition in free:
+            if await self._lease(keys=[self._lease_key(partition)], args=[self.consumer, self._lease_ttl_ms]):
+                stop = asyncio.Event()
+                task = asyncio.create_task(self._consume(partition, stop))
+                self._owned[partition] = (task, stop)
+                if len(self._owned) >= share:
+                    break
+
+    def _drain(self, partition: int) -> None:
+        task, stop = self._owned.pop(partition)
+        stop.set()
+        self._draining[task] = partition
+        task.add_done_callback(lambda done: self._draining.pop(done, None))
+
+    @staticmethod
+    def _lease_key(partition: int) -> str:
+        return UPDATE_LEASE_KEY.format(partition=partition)
+
+    # ==================== ОБРАБОТКА РАЗДЕЛА ====================
+
+    async def _consume(self, partition: int, stop: asyncio.Event) -> None:
+        stream = UPDATE_STREAM_KEY.format(partition=partition)
+
+        try:
+            # Раздел арендован нами: брошенные обновления прежнего владельца
+            # забираем и обрабатываем первыми
+            replayed = await self._claim_pending(stream)
+            last_id = "0"
+            next_claim = time.monotonic() + settings.UPDATE_QUEUE_CLAIM_IDLE / 2
+
+            while not stop.is_set():
+                try:
+                    # Обновления, которые прежний владелец еще обрабатывал при передаче
+                    # раздела, становятся брошенными позже - проверяем периодически
+                    if time.monotonic() >= next_claim:
+                        next_claim = time.monotonic() + settings.UPDATE_QUEUE_CLAIM_IDLE / 2
+                        claimed = await self._claim_pending(stream)
+                        if claimed:
+                            replayed |= claimed
+                            last_id = "0"
+
+                    reading_pending = last_id != ">"
+                    response = await self.redis.xreadgroup(
+                        UPDATE_GROUP,
+                        self.consumer,
+                        {stream: last_id},
+                        count=settings.UPDATE_QUEUE_BATCH_SIZE,
+                        block=None if reading_pending else 1000
+                    )
+
+                    entries = response[0][1] if response else []
+                    if reading_pending:
+                        last_id = entries[-1][0] if entries else ">"
+
+                    for index, (entry_id, fields) in enumerate(entries):
+                        if stop.is_set():
+                            await self._abandon(stream, [entry for entry, _ in entries[index:]])
+                            break
+                        # Обновление из собственного списка неподтвержденных уже выдавалось
+                        # обработчику - его отметка "в обработке" не означает дубль
+                        await self._process(
+                            stream, entry_id, fields, replay=reading_pending or entry_id in replayed
+                        )
+                        replayed.discard(entry_id)
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("💥 Update queue read failed", partition=partition, error=str(e))
+                    await asyncio.sleep(1)
+        finally:
+            try:
+                await self._release(keys=[self._lease_key(partition)], args=[self.consumer])
+            except Exception:
+                pass
+
+    async def _claim_pending(self, stream: str) -> set[str]:
+        """
+        Забрать брошенные обновления раздела.
+        Обновление без подтверждения дольше UPDATE_QUEUE_CLAIM_IDLE считается
+        брошенным: прежний обработчик упал. Более свежие еще обрабатываются
+        прежним владельцем после передачи раздела - их не трогаем.
+        Возвращает id забранных обновлений
+        """
+        start_id = "0-0"
+        claimed_ids: set[str] = set()
+        while True:
+            start_id, claimed, *_ = await self.redis.xautoclaim(
+                stream,
+                UPDATE_GROUP,
+                self.consumer,
+                min_idle_time=settings.UPDATE_QUEUE_CLAIM_IDLE * 1000,
+                start_id=start_id,
+                count=settings.UPDATE_QUEUE_BATCH_SIZE,
+                justid=True
+            )
+            if claimed:
+                claimed_ids.update(claimed)
+                logger.info("📥 Pending updates claimed", stream=stream, count=len(claimed))
+            if start_id == "0-0":
+                return claimed_ids
+
+    async def _abandon(self, stream: str, entry_ids: list[str]) -> None:
+        """Раздел отдан: непрочитанный остаток пакета новый владелец заберет сразу, не дожидаясь простоя"""
+        try:
+            await self.redis.xclaim(
+                stream, UPDATE_GROUP, self.consumer, 0, entry_ids,
+                idle=settings.UPDATE_QUEUE_CLAIM_IDLE * 1000, justid=True
+            )
+        except Exception as e:
+            logger.error("💥 Update queue abandon failed", stream=stream, error=str(e))
+
+    async def _process(self, stream: str, entry_id: str, fields: Dict[str, str], replay: bool = False) -> None:
+        try:
+            update = json.loads(fields["update"])
+            # Брошенное обновление: метка обработки упавшего процесса переходит к нам (DedupeMiddleware)
+            await self.dispatcher.feed_raw_update(self.bot, update, queue_replay=replay)
+        except Exception as e:
+            # Ошибка обработчика не должна останавливать раздел
+            logger.error("💥 Queued update processing failed", entry_id=entry_id, error=str(e))
+
+        # Обработанное обновление больше не нужно: длина раздела = необработанные
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.xack(stream, UPDATE_GROUP, entry_id)
+            pipe.xdel(stream, entry_id)
+            await pipe.execute()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 import structlog
 from sqlalchemy import select, update, func
@@ -11,13 +11,22 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.database.database import get_session
 from app.database.models.user import User, UserLevel
 from app.database.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.database.redis import redis_client
+from app.services.anti_fraud_service import AntiFraudService
+from app.services.metrics import observe_cache
 from app.config.settings import settings
 
 logger = structlog.get_logger(__name__)
 
+# Флаг бана для обработчиков, которым не нужна строка пользователя ("1" / "0")
+USER_BANNED_KEY = "user:banned:{telegram_id}"
+
 class UserService:
     """Сервис для работы с пользователями"""
     
+    def __init__(self, anti_fraud: AntiFraudService | None = None):
+        self.anti_fraud = anti_fraud or AntiFraudService()
+    
     async def get_user(self, telegram_id: int) -> User | None:
         """Получить пользователя по Telegram ID"""
         async with get_session() as session:
@@ -26,6 +35,37 @@ class UserService:
             )
             return result.scalar_one_or_none()
     
+    async def is_banned(self, telegram_id: int) -> bool:
+        """Заблокирован ли пользователь: флаг из Redis, при промахе - одна колонка из БД"""
+        key = USER_BANNED_KEY.format(telegram_id=telegram_id)
+        try:
+            cached = await redis_client.get(key)
+        except Exception as e:
+            logger.error("💥 Ban flag cache read failed", telegram_id=telegram_id, error=str(e))
+            cached = None
+        
+        observe_cache("user_banned", hit=cached is not None)
+        if cached is not None:
+            return cached == "1"
+        
+        async with get_session() as session:
+            banned = bool((await session.execute(
+                select(User.is_banned).where(User.telegram_id == telegram_id)
+            )).scalar())
+        
+        await self._cache_ban_flag(telegram_id, banned)
+        return banned
+    
+    async def _cache_ban_flag(self, telegram_id: int, banned: bool) -> None:
+        try:
+            await redis_client.set(
+                USER_BANNED_KEY.format(telegram_id=telegram_id),
+                "1" if banned else "0",
+                ex=settings.USER_BAN_CACHE_TTL
+            )
+        except Exception as e:
+            logger.error("💥 Ban flag cache write failed", telegram_id=telegram_id, error=str(e))
+    
     async def get_or_create_user(
         self,
         telegram_id: int,
@@ -115,6 +155,16 @@ class UserService:
         if new_user.is_premium:
             referrer.premium_referrals += 1
         
+        # Массовые регистрации по одной ссылке - бонус не начисляем
+        if not await self.anti_fraud.record(referrer.telegram_id, "referrals"):
+            await session.commit()
+            logger.warning(
+                "🚫 Referral bonus withheld by anti-fraud",
+                referrer_id=referrer.telegram_id,
+                new_user_id=new_user.telegram_id
+            )
+            return
+        
         # Определяем бонус за реферала
         referrer_config = referrer.get_level_config()
         bonus = referrer_config["referral_bonus"]
@@ -339,10 +389,39 @@ class UserService:
             await session.execute(
                 update(User)
                 .where(User.telegram_id == telegram_id)
-                .values(last_activity=datetime.utcnow())
+                # Пользователь снова пишет боту - значит, бот не заблокирован
+                .values(last_activity=datetime.utcnow(), is_active=True)
             )
             await session.commit()
     
+    async def deactivate_user(self, telegram_id: int) -> None:
+        """Пометить пользователя неактивным (бот заблокирован пользователем)"""
+        async with get_session() as session:
+            await session.execute(
+                update(User)
+                .where(User.telegram_id == telegram_id, User.is_banned == False)
+                .values(is_active=False)
+            )
+            await session.commit()
+        
+        logger.info("💤 User marked inactive", telegram_id=telegram_id)
+    
+    async def iter_active_user_ids(self, batch_size: int = 1000) -> AsyncIterator[int]:
+        """
+        Потоковая выборка ID активных пользователей в стабильном порядке.
+        Строки читаются серверным курсором пачками по batch_size
+        """
+        async with get_session() as session:
+            result = await session.stream(
+                select(User.telegram_id)
+                .where(User.is_active == True, User.is_banned == False)
+                .order_by(User.telegram_id)
+                .execution_options(yield_per=batch_size)
+            )
+            
+            async for telegram_id in result.scalars():
+                yield telegram_id
+    
     async def get_user_referrals(self, telegram_id: int, limit: int = 50) -> list[User]:
         """Получить список рефералов пользователя"""
         async with get_session() as session:
@@ -419,6 +498,7 @@ class UserService:
             user.is_active = False
             
             await session.commit()
+            await self._cache_ban_flag(telegram_id, True)
             
             logger.warning(
                 "🚫 User banned",
@@ -445,6 +525,10 @@ class UserService:
             user.is_active = True
             
             await session.commit()
+            await self._cache_ban_flag(telegram_id, False)
+            
+            # Снимаем и временную блокировку антифрода
+            await self.anti_fraud.unblock(telegram_id)
             
             logger.info(
                 "✅ User unbanned",
@@ -0,0 +1,50 @@
+"""
+Узел обработки очереди обновлений (UPDATE_QUEUE_ENABLED).
+
+Не принимает HTTP: только забирает свою долю разделов очереди и обрабатывает
+обновления. Таких процессов можно запустить сколько угодно на любых узлах,
+разделы перераспределяются между ними автоматически.
+
+Запуск:
+    python -m app.update_worker
+"""
+
+import asyncio
+import signal
+
+import structlog
+
+from app.config.settings import settings
+from app.main import create_bot, create_dispatcher
+from app.services.metrics import start_metrics_server
+from app.services.update_queue import UpdateConsumer
+from app.webhook_server import run_event_loop
+
+logger = structlog.get_logger(__name__)
+
+async def run_update_worker() -> None:
+    bot = await create_bot()
+    dp = await create_dispatcher()
+    services = dp["services"]
+
+    start_metrics_server()
+    await services.startup()
+    consumer = UpdateConsumer(bot, dp)
+    await consumer.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info("🚀 Update worker started", partitions=settings.UPDATE_QUEUE_PARTITIONS)
+    await stop.wait()
+
+    # Дообрабатываем текущие обновления, остальные останутся в очереди
+    await consumer.stop()
+    await services.shutdown()
+    await bot.session.close()
+    logger.info("✅ Update worker stopped")
+
+if __name__ == "__main__":
+    run_event_loop(run_update_worker())
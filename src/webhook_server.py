@@ -0,0 +1,232 @@
+"""
+Webhook сервер на нескольких процессах.
+
+Супервизор один раз готовит бота (БД, команды, webhook) и запускает
+WEBHOOK_WORKERS процессов. Каждый процесс - свой event loop, свой Bot
+и Dispatcher с общим RedisStorage; все слушают один порт через SO_REUSEPORT,
+ядро само распределяет соединения. По SIGTERM процессы перестают принимать
+соединения и дожидаются обработки текущих обновлений.
+
+С UPDATE_QUEUE_ENABLED webhook только кладет обновление в очередь Redis
+и сразу отвечает Telegram, а обрабатывают очередь UpdateConsumer'ы
+в этих же процессах и/или на отдельных узлах (app.update_worker).
+"""
+
+import asyncio
+import hmac
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import time
+
+import structlog
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from app.config.settings import settings
+from app.services.crypto_payment_service import CryptoPaymentService
+from app.services.metrics import mark_process_dead, metrics_handler
+from app.services.update_queue import UpdateConsumer, UpdateQueue
+
+logger = structlog.get_logger(__name__)
+
+class QueuedRequestHandler:
+    """Прием обновлений в очередь: ответ Telegram не ждет обработки"""
+
+    def __init__(self, queue: UpdateQueue, secret_token: str | None = None):
+        self.queue = queue
+        self.secret_token = secret_token
+
+    def register(self, app: web.Application, path: str) -> None:
+        app.router.add_post(path, self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret_token:
+            received = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not hmac.compare_digest(received, self.secret_token):
+                return web.Response(status=401, text="Unauthorized")
+
+        update = await request.json()
+        if not await self.queue.push(update):
+            # Очередь переполнена: Telegram повторит доставку позже
+            logger.warning("⚠️ Update queue is full, update rejected", update_id=update.get("update_id"))
+            return web.Response(status=503, text="Queue is full")
+
+        return web.Response()
+
+class CryptoBotWebhookHandler:
+    """Webhook CryptoBot: подтверждение оплаты инвойса (invoice_paid)"""
+
+    def __init__(self, payments: CryptoPaymentService):
+        self.payments = payments
+
+    def register(self, app: web.Application, path: str) -> None:
+        app.router.add_post(path, self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.text()
+        signature = request.headers.get("crypto-pay-api-signature", "")
+        if not self.payments.cryptobot.verify_webhook_signature(body, signature):
+            return web.Response(status=401, text="Unauthorized")
+
+        update = json.loads(body)
+        if update.get("update_type") != "invoice_paid":
+            return web.Response()
+
+        try:
+            await self.payments.settle_invoice(update["payload"])
+        except Exception as e:
+            # CryptoBot повторит доставку, повтор зачисления исключен
+            logger.error("💥 CryptoBot webhook settlement failed", error=str(e))
+            return web.Response(status=500)
+
+        return web.Response()
+
+def run_event_loop(coro) -> None:
+    """Запуск корутины в новом event loop (uvloop, если доступен)"""
+    if settings.USE_UVLOOP:
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
+
+    asyncio.run(coro)
+
+async def prepare_webhook() -> None:
+    """Однократная подготовка перед запуском процессов"""
+    from app.main import create_bot, prepare_bot
+
+    bot = await create_bot()
+    try:
+        await prepare_bot(bot)
+        await bot.set_webhook(
+            url=f"{settings.WEBHOOK_URL}/webhook",
+            secret_token=settings.WEBHOOK_SECRET,
+            max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            drop_pending_updates=settings.DROP_PENDING_UPDATES
+        )
+        logger.info("🌐 Webhook set", webhook_url=settings.WEBHOOK_URL)
+    finally:
+        await bot.session.close()
+
+async def run_webhook_worker(worker_index: int) -> None:
+    """Процесс-обработчик webhook"""
+    from app.main import create_bot, create_dispatcher, on_startup, on_shutdown
+
+    bot = await create_bot()
+    dp = await create_dispatcher()
+    dp["worker_index"] = worker_index
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+    app = web.Application()
+    if settings.UPDATE_QUEUE_ENABLED:
+        QueuedRequestHandler(
+            UpdateQueue(),
+            secret_token=settings.WEBHOOK_SECRET
+        ).register(app, path="/webhook")
+    else:
+        # Обновление обрабатывается внутри запроса: при остановке сервер
+        # дожидается незавершенных запросов, и ни одно обновление не теряется
+        SimpleRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            secret_token=settings.WEBHOOK_SECRET,
+            handle_in_background=False
+        ).register(app, path="/webhook")
+    app.router.add_get("/metrics", metrics_handler)
+    CryptoBotWebhookHandler(dp["services"].crypto_payments).register(app, path="/cryptobot/webhook")
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app, shutdown_timeout=settings.WEBHOOK_SHUTDOWN_TIMEOUT)
+    await runner.setup()
+
+    site = web.TCPSite(
+        runner,
+        host=settings.WEBHOOK_HOST,
+        port=settings.WEBHOOK_PORT,
+        reuse_port=True
+    )
+    await site.start()
+    logger.info("✅ Webhook worker started", worker=worker_index, port=settings.WEBHOOK_PORT)
+
+    consumer = None
+    if settings.UPDATE_QUEUE_ENABLED and settings.UPDATE_CONSUMER_ENABLED:
+        consumer = UpdateConsumer(bot, dp)
+        await consumer.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    await stop.wait()
+
+    logger.info("🛑 Webhook worker draining", worker=worker_index)
+    if consumer:
+        await consumer.stop()
+
+    # Закрывает сокет, ждет текущие запросы и вызывает shutdown диспетчера
+    await runner.cleanup()
+    await bot.session.close()
+
+def _worker_main(worker_index: int) -> None:
+    run_event_loop(run_webhook_worker(worker_index))
+
+def serve_webhook() -> None:
+    """Супервизор: подготовка, запуск и перезапуск процессов"""
+    run_event_loop(prepare_webhook())
+
+    # Метрики процессов складываются в общий каталог, /metrics любого процесса отдает сумму
+    metrics_dir = None
+    if settings.METRICS_ENABLED and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        metrics_dir = tempfile.mkdtemp(prefix="prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+    # spawn: процессы не наследуют потоки и соединения родителя
+    context = multiprocessing.get_context("spawn")
+    workers: dict[int, multiprocessing.Process] = {}
+    stopping = False
+
+    def start_worker(index: int) -> None:
+        process = context.Process(target=_worker_main, args=(index,), name=f"webhook-worker-{index}")
+        process.start()
+        workers[index] = process
+
+    def request_stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for process in workers.values():
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    for index in range(settings.WEBHOOK_WORKERS):
+        start_worker(index)
+
+    logger.info("🚀 Webhook server started", workers=settings.WEBHOOK_WORKERS, port=settings.WEBHOOK_PORT)
+
+    while workers:
+        for index, process in list(workers.items()):
+            process.join(timeout=0.5)
+            if process.is_alive():
+                continue
+
+            del workers[index]
+            mark_process_dead(process.pid)
+            if not stopping:
+                logger.error("💥 Webhook worker died, restarting", worker=index, exitcode=process.exitcode)
+                time.sleep(1)
+                start_worker(index)
+
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+    logger.info("✅ Webhook server stopped")